@@ -0,0 +1,31 @@
+"""
+Зависимости маршрутов: singleton объекты из app.state и разбор тела запроса
+"""
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from models.transaction import Transaction
+from services.transaction_service import TransactionService
+
+
+def get_transaction_service(request: Request) -> TransactionService:
+    """Сервис транзакций, созданный при старте приложения (см. api.lifecycle)"""
+    return request.app.state.services.transaction_service
+
+
+async def parse_transaction(request: Request) -> Transaction:
+    """
+    Разобрать тело запроса в транзакцию за один проход
+
+    JSON разбирается и валидируется парсером pydantic-core напрямую из байтов,
+    без промежуточного dict из json.loads. Ошибки возвращаются в стандартном
+    формате FastAPI (422).
+    """
+    body = await request.body()
+    try:
+        return Transaction.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)],
+            body=body
+        )
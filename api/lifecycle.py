@@ -0,0 +1,142 @@
+"""
+Жизненный цикл приложения: создание, прогрев и закрытие зависимостей
+
+Все singleton объекты создаются при старте и кладутся в app.state.
+Перед тем как сервис сообщит о готовности, открываются соединения пула
+Redis, загружаются Lua скрипты и модель и выполняется пробная оценка,
+поэтому первые реальные запросы не платят за холодный старт.
+"""
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+import redis.asyncio as redis
+from fastapi import FastAPI
+from models.transaction import Transaction
+from monitoring.runtime import RuntimeMonitor
+from repositories.redis_transaction_repository import RedisTransactionRepository
+from repositories.cached_transaction_repository import CachedTransactionRepository
+from repositories.transaction_repository import TransactionRepository
+from services.batching_scoring_service import MicroBatchingScoringService
+from services.model_backend import ModelBackend, create_model_backend
+from services.scoring_service import ScoringService
+from services.scoring_service_impl import ScoringServiceImpl
+from services.transaction_service import TransactionService
+from services.transaction_service_impl import TransactionServiceImpl
+from config.settings import settings
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Транзакция для пробной оценки при старте; в Redis не записывается
+_WARMUP_TRANSACTION = Transaction(
+    customer_id="warmup",
+    transaction_id="warmup",
+    amount=100.0,
+    currency="USD",
+    type=78,
+    merchant_id="warmup",
+    card_bin="000000",
+    ip_address="127.0.0.1",
+    device_id="warmup",
+    location="US-NY",
+    channel="online",
+    timestamp="2023-01-01T00:00:00Z"
+)
+
+
+@dataclass
+class ServiceContainer:
+    """Singleton зависимости приложения"""
+
+    redis_repository: RedisTransactionRepository
+    repository: TransactionRepository
+    model_backend: Optional[ModelBackend]
+    scoring_service: ScoringService
+    transaction_service: TransactionService
+
+    @classmethod
+    def create(cls, redis_client: Optional[redis.Redis] = None) -> "ServiceContainer":
+        """
+        Собрать зависимости по настройкам
+
+        Args:
+            redis_client: Готовый клиент Redis (по умолчанию создается пул по настройкам)
+
+        Returns:
+            Контейнер с еще не прогретыми зависимостями
+        """
+        redis_repository = RedisTransactionRepository(client=redis_client)
+
+        repository: TransactionRepository = redis_repository
+        if settings.L1_CACHE_ENABLED:
+            repository = CachedTransactionRepository(
+                repository=redis_repository,
+                redis_client=redis_repository.client
+            )
+
+        model_backend = create_model_backend()
+        scoring_service: ScoringService = ScoringServiceImpl(model_backend=model_backend)
+        if settings.SCORING_BATCH_ENABLED:
+            scoring_service = MicroBatchingScoringService(scoring_service)
+
+        return cls(
+            redis_repository=redis_repository,
+            repository=repository,
+            model_backend=model_backend,
+            scoring_service=scoring_service,
+            transaction_service=TransactionServiceImpl(
+                repository=repository,
+                scoring_service=scoring_service
+            )
+        )
+
+    async def warm_up(self) -> None:
+        """Открыть соединения, загрузить скрипты и модель, выполнить пробную оценку"""
+        await self.redis_repository.warm_up()
+        if settings.INGEST_MODE == "script":
+            await self.redis_repository.load_scripts()
+
+        if isinstance(self.repository, CachedTransactionRepository):
+            await self.repository.start()
+
+        if self.model_backend is not None:
+            await self.model_backend.start()
+
+        # Пробная оценка прогревает импорт модели в воркерах и векторные пути
+        await self.scoring_service.score_batch([_WARMUP_TRANSACTION])
+        await self.scoring_service.score_transaction(_WARMUP_TRANSACTION)
+        logger.info("Зависимости приложения прогреты")
+
+    async def close(self) -> None:
+        """Закрыть пул процессов модели и соединения с Redis"""
+        if self.model_backend is not None:
+            await self.model_backend.close()
+        # Кэширующий репозиторий закрывает и нижележащий Redis репозиторий
+        await self.repository.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Создать и прогреть зависимости при старте, закрыть при остановке"""
+    logger.info("Запуск микросервиса оценки транзакций")
+    app.state.ready = False
+
+    container = ServiceContainer.create()
+    app.state.services = container
+    await container.warm_up()
+
+    runtime_monitor = RuntimeMonitor() if settings.RUNTIME_METRICS_ENABLED else None
+    if runtime_monitor is not None:
+        await runtime_monitor.start()
+    app.state.ready = True
+
+    try:
+        yield
+    finally:
+        logger.info("Остановка микросервиса оценки транзакций")
+        app.state.ready = False
+        if runtime_monitor is not None:
+            await runtime_monitor.close()
+        await container.close()
+        # Дописать записи, оставшиеся в очереди логгера
+        await logger.complete()
@@ -1,9 +1,20 @@
 """
 API маршруты для работы с транзакциями
 """
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import time
+import orjson
+from collections import deque
+from typing import Any, AsyncIterator, Deque, List
+from fastapi import APIRouter, HTTPException, Depends, Body, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import ValidationError
 from models.transaction import Transaction
-from models.scoring import ScoringResult
+from models.scoring import ScoringResult, BatchScoringItem, BatchScoringResponse
+from services.transaction_service import TransactionService
+from api.dependencies import get_transaction_service, parse_transaction
+from config.settings import settings
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -11,9 +22,20 @@ logger = setup_logger(__name__)
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 
-@router.post("/", response_model=ScoringResult, status_code=200)
+@router.post(
+    "/",
+    response_model=ScoringResult,
+    status_code=200,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": Transaction.model_json_schema()}}
+        }
+    }
+)
 async def process_transaction(
-    transaction: Transaction
+    transaction: Transaction = Depends(parse_transaction),
+    transaction_service: TransactionService = Depends(get_transaction_service)
 ):
     """
     Обработать транзакцию и вернуть оценку риска
@@ -27,17 +49,222 @@ async def process_transaction(
     Raises:
         HTTPException: Если произошла ошибка обработки
     """
-    # Получаем сервис из app state
-    from main import get_transaction_service
-    transaction_service = get_transaction_service()
-    
-    logger.info(f"Получена транзакция: {transaction.transaction_id} от клиента: {transaction.customer_id}")
+    logger.debug("Получена транзакция: {} от клиента: {}", transaction.transaction_id, transaction.customer_id)
 
     try:
         # Обработка транзакции
         result = await transaction_service.process_transaction(transaction)
-        logger.info(f"Оценка транзакции {transaction.transaction_id} завершена. Результат: {result.scoring}")
-        return result
     except Exception as e:
         logger.error(f"Ошибка обработки транзакции {transaction.transaction_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Ошибка обработки транзакции: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ошибка обработки транзакции: {str(e)}")
+
+    if settings.FAST_JSON_ENABLED:
+        # Результат собран сервисом из проверенных данных: повторная
+        # валидация response_model не нужна, кодируем сразу orjson
+        return Response(content=_dump_result(result), media_type="application/json")
+    return result
+
+
+def _dump_result(result: ScoringResult) -> bytes:
+    """
+    Закодировать результат оценки в JSON
+
+    Все поля ScoringResult - примитивы, поэтому словарь атрибутов модели
+    кодируется orjson напрямую, без model_dump.
+    """
+    return orjson.dumps(result.__dict__)
+
+
+@router.post("/batch", response_model=BatchScoringResponse, status_code=200)
+async def process_transactions_batch(
+    items: List[Any] = Body(..., description="Список транзакций"),
+    transaction_service: TransactionService = Depends(get_transaction_service)
+):
+    """
+    Обработать пакет транзакций и вернуть оценки в том же порядке
+
+    Каждая транзакция валидируется отдельно: невалидные элементы получают
+    ошибку, остальные обрабатываются одним проходом.
+
+    Args:
+        items: Список транзакций
+
+    Returns:
+        Результаты оценки с ошибками по отдельным элементам
+
+    Raises:
+        HTTPException: Если пакет слишком большой или произошла ошибка обработки
+    """
+    if len(items) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Размер пакета {len(items)} превышает максимум {settings.MAX_BATCH_SIZE}"
+        )
+
+    start_time = time.time()
+    results: List[BatchScoringItem] = []
+    valid: List[tuple] = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append(BatchScoringItem(
+                index=index, error=f"Ошибка валидации: элемент должен быть объектом, получено {type(item).__name__}"
+            ))
+            continue
+        try:
+            valid.append((index, Transaction.model_validate(item)))
+        except ValidationError as e:
+            results.append(BatchScoringItem(index=index, error=f"Ошибка валидации: {e.errors()}"))
+
+    logger.debug("Получен пакет из {} транзакций, валидных: {}", len(items), len(valid))
+
+    if valid:
+        try:
+            scored = await transaction_service.process_batch([transaction for _, transaction in valid])
+        except Exception as e:
+            logger.error(f"Ошибка обработки пакета транзакций: {str(e)}")
+            scored = None
+            error = f"Ошибка обработки транзакции: {str(e)}"
+            results.extend(BatchScoringItem(index=index, error=error) for index, _ in valid)
+
+        if scored is not None:
+            results.extend(
+                BatchScoringItem(index=index, result=result)
+                for (index, _), result in zip(valid, scored)
+            )
+
+    results.sort(key=lambda item: item.index)
+    error_count = sum(1 for item in results if item.error is not None)
+
+    return BatchScoringResponse(
+        results=results,
+        processed_count=len(results) - error_count,
+        error_count=error_count,
+        processing_time_ms=int((time.time() - start_time) * 1000)
+    )
+
+
+@router.post("/stream", status_code=200)
+async def process_transactions_stream(
+    request: Request,
+    transaction_service: TransactionService = Depends(get_transaction_service)
+):
+    """
+    Обработать поток транзакций в формате NDJSON (для бэкфиллов и повторов)
+
+    Тело запроса читается построчно, одновременно обрабатывается не более
+    STREAM_MAX_CONCURRENCY транзакций. Результаты отдаются NDJSON в порядке
+    строк запроса по мере готовности. Пока окно обработки заполнено, тело
+    запроса не читается дальше, поэтому замедление Redis или модели
+    передается клиенту через TCP backpressure. Ни входные данные, ни
+    результаты целиком в памяти не хранятся.
+
+    Args:
+        request: HTTP запрос с телом application/x-ndjson
+
+    Returns:
+        Поток BatchScoringItem в формате NDJSON
+    """
+    logger.debug("Начало обработки NDJSON потока транзакций")
+
+    return _BodyStreamingResponse(
+        _stream_results(_iter_ndjson_lines(request), transaction_service),
+        media_type="application/x-ndjson"
+    )
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """
+    Потоковый ответ, который читает тело запроса во время отправки
+
+    Стандартный StreamingResponse на серверах с ASGI spec < 2.4 параллельно
+    слушает receive() в ожидании отключения клиента и забирает сообщения
+    с телом запроса. Здесь receive() читает только генератор ответа:
+    отключение клиента приходит в него как ClientDisconnect из request.stream().
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+
+async def _iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """
+    Разбить тело запроса на непустые строки, не загружая его целиком
+
+    Строка длиннее STREAM_MAX_LINE_BYTES отдается один раз (обработка вернет
+    для нее ошибку длины), а ее остаток до перевода строки отбрасывается,
+    чтобы нумерация следующих строк не сдвигалась.
+    """
+    buffer = b""
+    discarding = False
+    async for chunk in request.stream():
+        if discarding:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            chunk = chunk[newline + 1:]
+            discarding = False
+        buffer += chunk
+        if b"\n" not in buffer:
+            if len(buffer) > settings.STREAM_MAX_LINE_BYTES:
+                yield buffer
+                buffer = b""
+                discarding = True
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def _stream_results(lines: AsyncIterator[bytes], transaction_service) -> AsyncIterator[bytes]:
+    """Обработать строки с ограниченной конкурентностью и отдать результаты по порядку"""
+    in_flight: Deque[asyncio.Task] = deque()
+    processed = 0
+
+    try:
+        index = 0
+        async for line in lines:
+            in_flight.append(asyncio.create_task(_process_line(index, line, transaction_service)))
+            index += 1
+            if len(in_flight) >= settings.STREAM_MAX_CONCURRENCY:
+                yield await in_flight.popleft()
+                processed += 1
+
+        while in_flight:
+            yield await in_flight.popleft()
+            processed += 1
+    finally:
+        # Клиент отключился или произошла ошибка - отменяем незавершенную обработку
+        for task in in_flight:
+            task.cancel()
+        logger.debug("NDJSON поток завершен, отдано результатов: {}", processed)
+
+
+async def _process_line(index: int, line: bytes, transaction_service) -> bytes:
+    """Обработать одну строку NDJSON и сериализовать результат"""
+    if len(line) > settings.STREAM_MAX_LINE_BYTES:
+        item = BatchScoringItem(index=index, error="Превышена максимальная длина строки")
+        return item.model_dump_json().encode() + b"\n"
+
+    try:
+        transaction = Transaction.model_validate_json(line)
+    except ValidationError as e:
+        item = BatchScoringItem(index=index, error=f"Ошибка валидации: {e.errors()}")
+        return item.model_dump_json().encode() + b"\n"
+
+    try:
+        result = await transaction_service.process_transaction(transaction)
+    except Exception as e:
+        logger.error(f"Ошибка обработки транзакции {transaction.transaction_id}: {str(e)}")
+        item = BatchScoringItem(index=index, error=f"Ошибка обработки транзакции: {str(e)}")
+        return item.model_dump_json().encode() + b"\n"
+
+    if settings.FAST_JSON_ENABLED:
+        return orjson.dumps({"index": index, "result": result.__dict__, "error": None}) + b"\n"
+    return BatchScoringItem(index=index, result=result).model_dump_json().encode() + b"\n"
@@ -0,0 +1,141 @@
+"""
+Микробенчмарк чтения истории: pydantic Transaction и TransactionRecord
+
+Для JSON и бинарного кодека сравниваются:
+    - время декодирования одной записи истории;
+    - память на одну декодированную запись (tracemalloc по списку записей).
+
+Прежний путь: Transaction(**json.loads(...)) для JSON и
+Transaction.model_construct(...) для бинарного формата.
+
+Запуск:
+    python -m benchmarks.history_decode [--records N]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Union
+from models.transaction import Transaction
+from repositories.codecs import (
+    BinaryTransactionCodec,
+    JsonTransactionCodec,
+    _FLAG_FIELDS,
+    _HEADER_V1,
+    _STRING_FIELDS,
+    _STRING_LENGTH_V2,
+)
+from utils.time_windows import format_timestamp_ms
+
+ROUNDS = 5
+
+
+def _make_transaction(index: int) -> Transaction:
+    return Transaction(
+        customer_id="customer_123",
+        transaction_id=f"txn_{index}",
+        amount=100.50 + index,
+        currency="USD",
+        type=78,
+        merchant_id="merchant_789",
+        card_bin="411111",
+        ip_address="192.168.1.1",
+        device_id="device_001",
+        location="US-NY",
+        channel="online",
+        timestamp="2023-01-01T10:00:00Z",
+        is_velocity_alert=True,
+        transaction_category="ecommerce",
+        merchant_risk_score=0.2,
+    )
+
+
+def _legacy_json_decode(payload: Union[bytes, str], customer_id: str = "") -> Transaction:
+    return Transaction(**json.loads(payload))
+
+
+def _legacy_binary_decode(payload: bytes, customer_id: str = "") -> Transaction:
+    _, timestamp_ms, amount, txn_type, present, values = _HEADER_V1.unpack_from(payload)
+    offset = _HEADER_V1.size
+    strings = {}
+    for field in _STRING_FIELDS:
+        (length,) = _STRING_LENGTH_V2.unpack_from(payload, offset)
+        offset += _STRING_LENGTH_V2.size
+        strings[field] = payload[offset:offset + length].decode("utf-8")
+        offset += length
+    flags = {
+        field: bool(values & (1 << bit)) if present & (1 << bit) else None
+        for bit, field in enumerate(_FLAG_FIELDS)
+    }
+    return Transaction.model_construct(
+        customer_id=customer_id,
+        amount=amount,
+        type=txn_type,
+        merchant_id="",
+        card_bin="",
+        ip_address="",
+        device_id="",
+        timestamp=format_timestamp_ms(timestamp_ms),
+        transaction_category=strings.pop("transaction_category") or None,
+        **strings,
+        **flags,
+    )
+
+
+def measure_time(decode: Callable, payloads: List[bytes]) -> float:
+    """Лучшее CPU время декодирования одной записи в микросекундах"""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.process_time()
+        for payload in payloads:
+            decode(payload, "customer_123")
+        best = min(best, time.process_time() - started)
+    return best / len(payloads) * 1_000_000
+
+
+def measure_memory(decode: Callable, payloads: List[bytes]) -> float:
+    """Память на одну декодированную запись в байтах"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = [decode(payload, "customer_123") for payload in payloads]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del records
+    return (after - before) / len(payloads)
+
+
+def run(records: int) -> Dict[str, Dict[str, float]]:
+    transactions = [_make_transaction(index) for index in range(records)]
+    cases = {
+        "json": (JsonTransactionCodec(), _legacy_json_decode),
+        "binary": (BinaryTransactionCodec(), _legacy_binary_decode),
+    }
+
+    report = {}
+    for name, (codec, legacy_decode) in cases.items():
+        payloads = [codec.encode(transaction) for transaction in transactions]
+        report[name] = {
+            "pydantic_us": measure_time(legacy_decode, payloads),
+            "record_us": measure_time(codec.decode, payloads),
+            "pydantic_bytes": measure_memory(legacy_decode, payloads),
+            "record_bytes": measure_memory(codec.decode, payloads),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Микробенчмарк чтения истории")
+    parser.add_argument("--records", type=int, default=10000)
+    args = parser.parse_args()
+
+    for name, result in run(args.records).items():
+        print(
+            f"{name:6} время: {result['pydantic_us']:.2f} -> {result['record_us']:.2f} мкс/запись, "
+            f"память: {result['pydantic_bytes']:.0f} -> {result['record_bytes']:.0f} байт/запись"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Микробенчмарк JSON пути одного запроса: стандартный и быстрый (FAST_JSON_ENABLED)
+
+Сравнивается CPU на запрос без обращения к Redis и модели:
+    - разбор тела запроса в Transaction;
+    - оценка модели сервисом оценки (ModelScore);
+    - создание результата со статистикой клиента сервисом транзакций;
+    - кодирование ответа.
+
+Стандартный путь повторяет то, что делает FastAPI для параметра-модели
+и response_model: json.loads + валидация запроса, валидация и кодирование
+ответа через поле response_model.
+
+Запуск:
+    python -m benchmarks.json_path [--iterations N]
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict
+import orjson
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from api.routes.transaction import _dump_result
+from models.scoring import ScoringResult
+from models.transaction import Transaction
+from services.scoring_service_impl import ScoringServiceImpl
+from services.transaction_service_impl import TransactionServiceImpl
+from config.settings import settings
+
+REQUEST_BODY = orjson.dumps({
+    "customer_id": "customer_123",
+    "transaction_id": "txn_456",
+    "amount": 100.50,
+    "currency": "USD",
+    "type": 78,
+    "merchant_id": "merchant_789",
+    "card_bin": "411111",
+    "ip_address": "192.168.1.1",
+    "device_id": "device_001",
+    "location": "US-NY",
+    "channel": "online",
+    "timestamp": "2023-01-01T10:00:00Z",
+    "is_velocity_alert": True,
+    "transaction_category": "ecommerce",
+    "merchant_risk_score": 0.2,
+})
+
+CUSTOMER_STATS = {
+    f"{prefix}_{hours}h": value
+    for hours in (3, 6, 12, 24)
+    for prefix, value in (("transaction_count", 4), ("avg_amount", 87.5))
+}
+
+ROUNDS = 5
+
+RESPONSE_FIELD = create_model_field(name="Response", type_=ScoringResult, mode="serialization")
+
+
+def _make_services():
+    scoring_service = ScoringServiceImpl()
+    transaction_service = TransactionServiceImpl(repository=None, scoring_service=scoring_service)
+    return scoring_service, transaction_service
+
+
+async def standard_path(scoring_service, transaction_service) -> bytes:
+    """Путь с валидацией на каждом шаге и кодированием через response_model"""
+    transaction = Transaction.model_validate(json.loads(REQUEST_BODY))
+    model_score = scoring_service._build_score(0.42)
+    result = transaction_service._build_result(transaction, model_score, CUSTOMER_STATS, 3)
+    return await serialize_response(field=RESPONSE_FIELD, response_content=result, dump_json=True)
+
+
+async def fast_path(scoring_service, transaction_service) -> bytes:
+    """Путь с разбором pydantic-core и кодированием orjson без повторной валидации ответа"""
+    transaction = Transaction.model_validate_json(REQUEST_BODY)
+    model_score = scoring_service._build_score(0.42)
+    result = transaction_service._build_result(transaction, model_score, CUSTOMER_STATS, 3)
+    return _dump_result(result)
+
+
+async def measure(path: Callable, fast_json: bool, iterations: int) -> float:
+    """CPU время на запрос в микросекундах"""
+    settings.FAST_JSON_ENABLED = fast_json
+    services = _make_services()
+
+    # Прогрев
+    for _ in range(min(iterations, 1000)):
+        await path(*services)
+
+    # Лучший из нескольких прогонов, чтобы снизить влияние шума
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.process_time()
+        for _ in range(iterations):
+            await path(*services)
+        best = min(best, time.process_time() - started)
+    return best / iterations * 1_000_000
+
+
+async def run(iterations: int) -> Dict[str, float]:
+    original = settings.FAST_JSON_ENABLED
+    try:
+        standard_us = await measure(standard_path, False, iterations)
+        fast_us = await measure(fast_path, True, iterations)
+    finally:
+        settings.FAST_JSON_ENABLED = original
+
+    # Оба пути должны давать одинаковый ответ (кроме времени processed_at)
+    settings.FAST_JSON_ENABLED = False
+    standard = orjson.loads(await standard_path(*_make_services()))
+    settings.FAST_JSON_ENABLED = True
+    fast = orjson.loads(await fast_path(*_make_services()))
+    settings.FAST_JSON_ENABLED = original
+    standard.pop("processed_at")
+    fast.pop("processed_at")
+    assert standard == fast, (standard, fast)
+
+    return {"standard_us": standard_us, "fast_us": fast_us, "saved_us": standard_us - fast_us}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Микробенчмарк JSON пути запроса")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.iterations))
+    print(f"Стандартный путь: {result['standard_us']:.1f} мкс/запрос")
+    print(f"Быстрый путь:     {result['fast_us']:.1f} мкс/запрос")
+    print(
+        f"Экономия:         {result['saved_us']:.1f} мкс/запрос "
+        f"({result['saved_us'] / result['standard_us'] * 100:.0f}%)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Измерение, хранение и сравнение результатов бенчмарков
+
+Каждая операция выполняется многократно с замером времени каждого вызова;
+по выборке считаются ops/sec и перцентили задержки. Отчет сохраняется в
+JSON (baseline), два отчета сравниваются по выбранной метрике с допуском.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+
+# Метрики, для которых рост значения - ухудшение, и для которых ухудшение - падение
+LOWER_IS_BETTER = ("mean_us", "p50_us", "p90_us", "p99_us")
+HIGHER_IS_BETTER = ("ops_per_sec",)
+
+
+@dataclass
+class BenchmarkResult:
+    """Результат одного бенчмарка"""
+
+    name: str
+    iterations: int
+    ops_per_sec: float
+    mean_us: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    max_us: float
+
+    @classmethod
+    def from_samples(cls, name: str, samples_ns: List[int]) -> "BenchmarkResult":
+        """
+        Посчитать метрики по времени вызовов
+
+        Args:
+            name: Имя бенчмарка
+            samples_ns: Время каждого вызова в наносекундах
+
+        Returns:
+            Результат бенчмарка
+        """
+        samples_us = np.asarray(samples_ns, dtype=np.float64) / 1000
+        p50, p90, p99 = np.percentile(samples_us, (50, 90, 99))
+        total_s = samples_us.sum() / 1_000_000
+        return cls(
+            name=name,
+            iterations=len(samples_us),
+            ops_per_sec=len(samples_us) / total_s if total_s > 0 else float("inf"),
+            mean_us=float(samples_us.mean()),
+            p50_us=float(p50),
+            p90_us=float(p90),
+            p99_us=float(p99),
+            max_us=float(samples_us.max()),
+        )
+
+
+@dataclass
+class MeasureConfig:
+    """
+    Параметры измерения
+
+    Attributes:
+        min_time_s: Минимальное суммарное время измерения
+        min_iterations: Минимальное число вызовов
+        max_iterations: Максимальное число вызовов
+        warmup_iterations: Вызовы до начала измерения (не учитываются)
+    """
+
+    min_time_s: float = 1.0
+    min_iterations: int = 20
+    max_iterations: int = 100_000
+    warmup_iterations: int = 10
+
+
+QUICK_CONFIG = MeasureConfig(min_time_s=0.05, min_iterations=3, max_iterations=1000, warmup_iterations=1)
+
+
+async def measure(name: str, operation: Callable[[], Awaitable], config: MeasureConfig) -> BenchmarkResult:
+    """
+    Измерить асинхронную операцию
+
+    Args:
+        name: Имя бенчмарка
+        operation: Функция без аргументов, возвращающая корутину одного вызова
+        config: Параметры измерения
+
+    Returns:
+        Результат бенчмарка
+    """
+    for _ in range(config.warmup_iterations):
+        await operation()
+
+    clock = time.perf_counter_ns
+    samples: List[int] = []
+    deadline = clock() + int(config.min_time_s * 1e9)
+    while len(samples) < config.max_iterations:
+        started = clock()
+        await operation()
+        finished = clock()
+        samples.append(finished - started)
+        if finished >= deadline and len(samples) >= config.min_iterations:
+            break
+
+    return BenchmarkResult.from_samples(name, samples)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results: List[BenchmarkResult], environment: Dict) -> Dict:
+    """Собрать отчет с описанием окружения и результатами"""
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            **environment,
+        },
+        "results": {result.name: asdict(result) for result in results},
+    }
+
+
+def save_report(report: Dict, path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False, sort_keys=True)
+        file.write("\n")
+
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+@dataclass
+class Comparison:
+    """Сравнение одного бенчмарка с baseline"""
+
+    name: str
+    baseline: float
+    current: float
+    change: float
+    regression: bool
+
+
+def compare_reports(baseline: Dict, current: Dict, metric: str = "p50_us", threshold: float = 0.15) -> List[Comparison]:
+    """
+    Сравнить отчеты по общим бенчмаркам
+
+    Args:
+        baseline: Отчет baseline
+        current: Текущий отчет
+        metric: Метрика сравнения (p50_us, p99_us, ops_per_sec, ...)
+        threshold: Допустимое относительное ухудшение (0.15 - 15%)
+
+    Returns:
+        Сравнения по бенчмаркам, присутствующим в обоих отчетах
+
+    Raises:
+        ValueError: Если метрика неизвестна
+    """
+    if metric not in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        raise ValueError(f"Неизвестная метрика сравнения: {metric}")
+
+    comparisons = []
+    for name, baseline_result in sorted(baseline["results"].items()):
+        current_result = current["results"].get(name)
+        if current_result is None:
+            continue
+        old, new = baseline_result[metric], current_result[metric]
+        change = (new - old) / old if old else 0.0
+        # Положительное изменение всегда означает ухудшение
+        if metric in HIGHER_IS_BETTER:
+            change = -change
+        comparisons.append(Comparison(name, old, new, change, change > threshold))
+    return comparisons
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    lines = [f"{'benchmark':<48} {'ops/sec':>12} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'n':>7}"]
+    for result in results:
+        lines.append(
+            f"{result.name:<48} {result.ops_per_sec:>12.1f} {result.p50_us:>10.1f} "
+            f"{result.p90_us:>10.1f} {result.p99_us:>10.1f} {result.iterations:>7}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparisons(comparisons: List[Comparison], metric: str) -> str:
+    lines = [f"{'benchmark':<48} {'baseline':>12} {'current':>12} {'change':>9}  ({metric})"]
+    for item in comparisons:
+        marker = "  REGRESSION" if item.regression else ""
+        lines.append(
+            f"{item.name:<48} {item.baseline:>12.1f} {item.current:>12.1f} {item.change * 100:>+8.1f}%{marker}"
+        )
+    return "\n".join(lines)
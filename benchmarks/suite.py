@@ -0,0 +1,442 @@
+"""
+Набор бенчмарков сервиса оценки транзакций
+
+Бенчмарки выполняются поверх in-process заглушки Redis (fakeredis с Lua)
+или, с --redis-url, поверх локального Redis (выбранная база очищается).
+
+Группы:
+    repository.*    - запись и чтение RedisTransactionRepository
+    statistics.*    - _calculate_statistics по режимам и размерам истории 10/1k/10k
+    scoring.*       - score_transaction
+                      (без симулированной 10 мс задержки вызова ML сервиса)
+    serialization.* - кодеки истории, разбор запроса и кодирование ответа
+    service.*       - полный путь process_transaction
+    workload.*      - полный путь на потоке профиля нагрузки load_generator.workload
+
+Запуск:
+    python -m benchmarks.suite run [--filter PREFIX] [--quick] [--output PATH]
+    python -m benchmarks.suite compare BASELINE CURRENT [--metric p50_us] [--threshold 0.15]
+
+compare завершается с кодом 1, если хотя бы один бенчмарк ухудшился сильнее порога.
+"""
+import argparse
+import asyncio
+import itertools
+import sys
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import fakeredis
+import orjson
+import redis.asyncio as redis
+from models.scoring import ScoringResult
+from models.transaction import Transaction
+from repositories.codecs import BinaryTransactionCodec, JsonTransactionCodec
+from repositories.packed_history import pack_record
+from repositories.redis_transaction_repository import RedisTransactionRepository
+from services.scoring_service_impl import ScoringServiceImpl
+from services.transaction_service_impl import TransactionServiceImpl
+from config.settings import settings
+from utils.time_windows import parse_timestamp_ms
+from load_generator.workload import PROFILES, Workload
+from benchmarks.runner import (
+    QUICK_CONFIG,
+    BenchmarkResult,
+    MeasureConfig,
+    build_report,
+    compare_reports,
+    format_comparisons,
+    format_results,
+    load_report,
+    measure,
+    save_report,
+)
+
+HISTORY_SIZES = (10, 1_000, 10_000)
+STATISTICS_MODES = ("incremental", "packed", "recompute")
+
+DEFAULT_OUTPUT = "benchmarks/results/latest.json"
+BASE_TIME = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+Operation = Callable[[], Awaitable]
+
+
+def _timestamp(offset: timedelta) -> str:
+    return (BASE_TIME + offset).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def make_transaction(index: int, customer_id: str = "customer_bench", timestamp: str = None) -> Transaction:
+    """Транзакция бенчмарка с детерминированными полями"""
+    return Transaction(
+        customer_id=customer_id,
+        transaction_id=f"txn_{index}",
+        amount=10.0 + (index * 37) % 990,
+        currency="USD",
+        type=55 + index % 36,
+        merchant_id="merchant_789",
+        card_bin="411111",
+        ip_address="192.168.1.1",
+        device_id="device_001",
+        location="US-NY",
+        channel="online",
+        timestamp=timestamp or _timestamp(timedelta(seconds=index)),
+        is_velocity_alert=index % 7 == 0,
+        transaction_category="ecommerce",
+        merchant_risk_score=0.2,
+    )
+
+
+class LocalScoringService(ScoringServiceImpl):
+    """
+    Оценка правилами без симуляции сетевого вызова ML сервиса
+
+    Симулированная задержка 10 мс (asyncio.sleep) закрывала бы в измерениях
+    собственные затраты CPU на оценку и на весь путь обработки.
+    """
+
+    async def _get_ml_model_score(self, transaction: Transaction, customer_stats: Optional[Dict] = None) -> float:
+        return self._rule_based_score(transaction)
+
+
+class RedisStandIn:
+    """Фабрика клиентов Redis: общая in-process заглушка или локальный Redis"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self._redis_url = redis_url
+        self._server = fakeredis.FakeServer()
+
+    @property
+    def description(self) -> str:
+        return self._redis_url or f"fakeredis {fakeredis.__version__}"
+
+    def client(self) -> redis.Redis:
+        if self._redis_url:
+            return redis.Redis.from_url(self._redis_url)
+        return fakeredis.FakeAsyncRedis(server=self._server)
+
+    async def reset(self) -> None:
+        await self.client().flushdb()
+
+
+async def write_history(repository: RedisTransactionRepository, transactions: Iterable[Transaction]) -> None:
+    """Записать транзакции во все представления истории (история, агрегаты, упакованная)"""
+    codec = BinaryTransactionCodec()
+    iterator = iter(transactions)
+    while chunk := list(itertools.islice(iterator, 500)):
+        async with repository.client.pipeline(transaction=False) as pipe:
+            for transaction in chunk:
+                repository._queue_history_write(pipe, transaction, codec.encode(transaction))
+                repository._queue_aggregates_update(pipe, transaction)
+                pipe.append(repository._packed_key(transaction.customer_id), pack_record(transaction))
+            await pipe.execute()
+
+
+async def seed_history(repository: RedisTransactionRepository, customer_id: str, size: int) -> int:
+    """
+    Записать историю клиента во все представления
+
+    Транзакции равномерно распределены по 24 часам до момента расчета.
+
+    Returns:
+        Момент расчета статистики (epoch ms)
+    """
+    step = timedelta(hours=24) / size
+    await write_history(
+        repository,
+        (make_transaction(index, customer_id, _timestamp(step * index)) for index in range(size))
+    )
+    return parse_timestamp_ms(_timestamp(timedelta(hours=24)))
+
+
+@dataclass
+class Benchmark:
+    """
+    Описание бенчмарка
+
+    Attributes:
+        name: Имя (группа.операция[параметры])
+        setup: Подготовка данных; возвращает операцию одного вызова
+    """
+
+    name: str
+    setup: Callable[[RedisStandIn], Awaitable[Operation]]
+
+
+def _repository(stand_in: RedisStandIn, **kwargs) -> RedisTransactionRepository:
+    return RedisTransactionRepository(client=stand_in.client(), codec=BinaryTransactionCodec(), **kwargs)
+
+
+def _counter_transactions(customer_id: str = "customer_bench"):
+    """Бесконечный поток новых транзакций одного клиента с растущим временем"""
+    counter = itertools.count()
+    return lambda: make_transaction(next(counter), customer_id)
+
+
+async def _repository_add(stand_in: RedisStandIn) -> Operation:
+    repository = _repository(stand_in, statistics_mode="incremental")
+    next_transaction = _counter_transactions()
+    return lambda: repository.add_transaction(next_transaction())
+
+
+def _repository_ingest(ingest_mode: str):
+    async def setup(stand_in: RedisStandIn) -> Operation:
+        repository = _repository(stand_in, statistics_mode="incremental", ingest_mode=ingest_mode)
+        await repository.load_scripts()
+        next_transaction = _counter_transactions()
+        return lambda: repository.ingest_transaction(next_transaction())
+    return setup
+
+
+async def _repository_read_history(stand_in: RedisStandIn) -> Operation:
+    repository = _repository(stand_in)
+    await seed_history(repository, "customer_read", 1_000)
+    return lambda: repository.get_transactions_by_customer("customer_read")
+
+
+async def _repository_read_windows(stand_in: RedisStandIn) -> Operation:
+    repository = _repository(stand_in, statistics_mode="incremental")
+    reference_ms = await seed_history(repository, "customer_read", 1_000)
+    return lambda: repository.get_window_statistics("customer_read", reference_ms)
+
+
+def _statistics(mode: str, size: int):
+    async def setup(stand_in: RedisStandIn) -> Operation:
+        repository = _repository(stand_in, statistics_mode=mode)
+        customer_id = f"customer_{mode}_{size}"
+        reference_ms = await seed_history(repository, customer_id, size)
+        service = TransactionServiceImpl(
+            repository=repository,
+            scoring_service=LocalScoringService(),
+            statistics_mode=mode
+        )
+        return lambda: service._calculate_statistics(customer_id, reference_ms)
+    return setup
+
+
+async def _score_transaction(stand_in: RedisStandIn) -> Operation:
+    scoring_service = LocalScoringService()
+    transaction = make_transaction(0)
+    return lambda: scoring_service.score_transaction(transaction)
+
+
+def _sync(function: Callable[[], object]) -> Operation:
+    """Обернуть синхронную операцию в корутину для общего измерителя"""
+    async def operation():
+        return function()
+    return operation
+
+
+async def _codec_encode_binary(stand_in: RedisStandIn) -> Operation:
+    codec, transaction = BinaryTransactionCodec(), make_transaction(0)
+    return _sync(lambda: codec.encode(transaction))
+
+
+async def _codec_decode_binary(stand_in: RedisStandIn) -> Operation:
+    codec = BinaryTransactionCodec()
+    payload = codec.encode(make_transaction(0))
+    return _sync(lambda: codec.decode(payload, "customer_bench"))
+
+
+async def _codec_decode_json(stand_in: RedisStandIn) -> Operation:
+    codec = JsonTransactionCodec()
+    payload = codec.encode(make_transaction(0))
+    return _sync(lambda: codec.decode(payload, "customer_bench"))
+
+
+async def _parse_request(stand_in: RedisStandIn) -> Operation:
+    body = orjson.dumps(make_transaction(0).model_dump())
+    return _sync(lambda: Transaction.model_validate_json(body))
+
+
+def _result() -> ScoringResult:
+    return ScoringResult(
+        customer_id="customer_bench",
+        transaction_id="txn_0",
+        scoring=0.42,
+        is_fraud=False,
+        processing_time_ms=3,
+        customer_transaction_count_24h=12,
+        customer_avg_amount_24h=87.5,
+        processed_at=datetime.now(timezone.utc).isoformat(),
+    )
+
+
+async def _dump_result_orjson(stand_in: RedisStandIn) -> Operation:
+    result = _result()
+    return _sync(lambda: orjson.dumps(result.__dict__))
+
+
+async def _dump_result_pydantic(stand_in: RedisStandIn) -> Operation:
+    result = _result()
+    return _sync(result.model_dump_json)
+
+
+def _process_transaction(mode: str):
+    async def setup(stand_in: RedisStandIn) -> Operation:
+        repository = _repository(stand_in, statistics_mode=mode)
+        await repository.load_scripts()
+        service = TransactionServiceImpl(
+            repository=repository,
+            scoring_service=LocalScoringService(),
+            statistics_mode=mode
+        )
+        next_transaction = _counter_transactions(f"customer_process_{mode}")
+        return lambda: service.process_transaction(next_transaction())
+    return setup
+
+
+def _process_workload(mode: str, profile: str = "realistic", customers: int = 10_000, preseed: int = 100):
+    """
+    Полный путь на потоке профиля нагрузки: Zipf клиенты, всплески и
+    предзаполненная история самых активных клиентов
+    """
+    async def setup(stand_in: RedisStandIn) -> Operation:
+        repository = _repository(stand_in, statistics_mode=mode)
+        await repository.load_scripts()
+        workload = Workload(replace(PROFILES[profile], customers=customers), seed=1)
+        history_end = BASE_TIME + timedelta(hours=24)
+        await write_history(repository, (
+            Transaction(**data)
+            for index in range(preseed)
+            for data in workload.history_transactions(index, history_end)
+        ))
+        service = TransactionServiceImpl(
+            repository=repository,
+            scoring_service=LocalScoringService(),
+            statistics_mode=mode
+        )
+        counter = itertools.count()
+        return lambda: service.process_transaction(
+            Transaction(**workload.next_transaction(history_end + timedelta(milliseconds=next(counter))))
+        )
+    return setup
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("repository.add_transaction", _repository_add),
+    Benchmark("repository.ingest_transaction[script]", _repository_ingest("script")),
+    Benchmark("repository.ingest_transaction[pipeline]", _repository_ingest("pipeline")),
+    Benchmark("repository.get_transactions_by_customer[1000]", _repository_read_history),
+    Benchmark("repository.get_window_statistics[1000]", _repository_read_windows),
+    *(
+        Benchmark(f"statistics.{mode}[{size}]", _statistics(mode, size))
+        for mode in STATISTICS_MODES
+        for size in HISTORY_SIZES
+    ),
+    Benchmark("scoring.score_transaction[rules]", _score_transaction),
+    Benchmark("serialization.codec_encode[binary]", _codec_encode_binary),
+    Benchmark("serialization.codec_decode[binary]", _codec_decode_binary),
+    Benchmark("serialization.codec_decode[json]", _codec_decode_json),
+    Benchmark("serialization.parse_request", _parse_request),
+    Benchmark("serialization.dump_result[orjson]", _dump_result_orjson),
+    Benchmark("serialization.dump_result[pydantic]", _dump_result_pydantic),
+    *(
+        Benchmark(f"service.process_transaction[{mode}]", _process_transaction(mode))
+        for mode in STATISTICS_MODES
+    ),
+    *(
+        Benchmark(f"workload.realistic[{mode}]", _process_workload(mode))
+        for mode in STATISTICS_MODES
+    ),
+]
+
+
+def select_benchmarks(prefixes: Optional[List[str]] = None) -> List[Benchmark]:
+    """Бенчмарки, имена которых начинаются с одного из префиксов"""
+    if not prefixes:
+        return list(BENCHMARKS)
+    return [benchmark for benchmark in BENCHMARKS if benchmark.name.startswith(tuple(prefixes))]
+
+
+async def run_benchmarks(
+    benchmarks: List[Benchmark],
+    config: MeasureConfig,
+    redis_url: Optional[str] = None
+) -> Tuple[List[BenchmarkResult], Dict]:
+    """
+    Выполнить бенчмарки; перед каждым заглушка Redis очищается
+
+    Returns:
+        (результаты, описание окружения для отчета)
+    """
+    stand_in = RedisStandIn(redis_url)
+    # Логи запросов не должны попадать в измерения
+    original_sample_rate = settings.LOG_SUCCESS_SAMPLE_RATE
+    original_slow_ms = settings.LOG_SLOW_REQUEST_MS
+    settings.LOG_SUCCESS_SAMPLE_RATE = 0.0
+    settings.LOG_SLOW_REQUEST_MS = float("inf")
+    try:
+        results = []
+        for benchmark in benchmarks:
+            await stand_in.reset()
+            operation = await benchmark.setup(stand_in)
+            results.append(await measure(benchmark.name, operation, config))
+    finally:
+        settings.LOG_SUCCESS_SAMPLE_RATE = original_sample_rate
+        settings.LOG_SLOW_REQUEST_MS = original_slow_ms
+
+    environment = {
+        "redis": stand_in.description,
+        "min_time_s": config.min_time_s,
+        "min_iterations": config.min_iterations,
+    }
+    return results, environment
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    benchmarks = select_benchmarks(args.filter)
+    if not benchmarks:
+        print(f"Нет бенчмарков с префиксами {args.filter}", file=sys.stderr)
+        return 2
+
+    config = QUICK_CONFIG if args.quick else MeasureConfig(min_time_s=args.min_time)
+    results, environment = asyncio.run(run_benchmarks(benchmarks, config, args.redis_url))
+    print(format_results(results))
+
+    save_report(build_report(results, environment), args.output)
+    print(f"\nОтчет сохранен в {args.output}")
+    return 0
+
+
+def _compare_command(args: argparse.Namespace) -> int:
+    comparisons = compare_reports(
+        load_report(args.baseline),
+        load_report(args.current),
+        metric=args.metric,
+        threshold=args.threshold
+    )
+    print(format_comparisons(comparisons, args.metric))
+
+    regressions = [item.name for item in comparisons if item.regression]
+    if regressions:
+        print(f"\nУхудшение больше {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nУхудшений больше {args.threshold:.0%} нет")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки сервиса оценки транзакций")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Выполнить бенчмарки и сохранить отчет")
+    run_parser.add_argument("--filter", action="append", help="Префикс имени бенчмарка (можно повторять)")
+    run_parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Путь JSON отчета")
+    run_parser.add_argument("--min-time", type=float, default=1.0, help="Время измерения бенчмарка, с")
+    run_parser.add_argument("--quick", action="store_true", help="Короткий прогон для проверки набора")
+    run_parser.add_argument("--redis-url", help="Локальный Redis вместо fakeredis (база очищается!)")
+    run_parser.set_defaults(handler=_run_command)
+
+    compare_parser = commands.add_parser("compare", help="Сравнить отчет с baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--metric", default="p50_us")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="Допустимое ухудшение (доля)")
+    compare_parser.set_defaults(handler=_compare_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
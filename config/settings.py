@@ -10,22 +10,90 @@ class Settings:
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_PASSWORD: Optional[str] = os.getenv("REDIS_PASSWORD")
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_WARM_CONNECTIONS: int = int(os.getenv("REDIS_WARM_CONNECTIONS", "10"))  # Соединений, открываемых при старте
 
     # Время жизни кэша в секундах (24 часа)
     CACHE_TTL: int = 24 * 60 * 60
 
+    # Хранилище истории клиента
+    # zset - sorted set по времени транзакции с обрезкой старше CACHE_TTL, list - список без обрезки
+    HISTORY_STORAGE: str = os.getenv("HISTORY_STORAGE", "zset")
+
+    # Формат записей истории: binary - компактный бинарный формат с версией, json - полный JSON
+    # Бинарный кодек читает и старые JSON записи, что позволяет мигрировать без очистки Redis
+    TRANSACTION_CODEC: str = os.getenv("TRANSACTION_CODEC", "binary")
+
     # Настройки логирования
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # text - читаемые строки, json - одна JSON запись на строку (поля запроса в extra)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    # Запись в stdout из фонового потока через очередь, без блокировки event loop
+    LOG_ENQUEUE: bool = os.getenv("LOG_ENQUEUE", "true").lower() == "true"
+    # Доля успешных запросов, для которых пишется итоговая строка (ошибки и медленные - всегда)
+    LOG_SUCCESS_SAMPLE_RATE: float = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+    # Порог медленного запроса; такие запросы логируются всегда с уровнем WARNING
+    LOG_SLOW_REQUEST_MS: float = float(os.getenv("LOG_SLOW_REQUEST_MS", "100"))
 
     # Настройки производительности
     MAX_PROCESSING_TIME_MS: int = 200  # Максимальное время обработки в миллисекундах
 
+    # Настройки расчета статистики по клиенту
+    # incremental - агрегаты обновляются при записи транзакции, recompute - пересчет по всей истории,
+    # packed - векторный расчет по упакованной числовой истории (numpy)
+    STATISTICS_MODE: str = os.getenv("STATISTICS_MODE", "incremental")
+
+    # Доля устаревших записей упакованной истории, при которой ключ перезаписывается без них
+    PACKED_COMPACTION_RATIO: float = float(os.getenv("PACKED_COMPACTION_RATIO", "0.25"))
+
+    # Способ записи транзакции и чтения статистики в инкрементальном режиме
+    # script - один атомарный Lua скрипт (EVALSHA)
+    # pipeline - один MULTI/EXEC без Lua (для окружений, где скрипты запрещены)
+    # sequential - последовательные команды
+    INGEST_MODE: str = os.getenv("INGEST_MODE", "script")
+
+    # Скользящие окна статистики (часы) и длина временного бакета в секундах
+    STATISTICS_WINDOWS_HOURS: tuple = (3, 6, 12, 24)
+    WINDOW_BUCKET_SECONDS: int = int(os.getenv("WINDOW_BUCKET_SECONDS", "300"))
+
+    # Локальный L1 кэш статистики клиентов перед Redis (в памяти процесса)
+    # Значения могут отставать от Redis не более чем на L1_CACHE_TTL_MS; при нескольких
+    # воркерах для сброса записей после чужих записей задается pub/sub канал
+    L1_CACHE_ENABLED: bool = os.getenv("L1_CACHE_ENABLED", "false").lower() == "true"
+    L1_CACHE_MAX_SIZE: int = int(os.getenv("L1_CACHE_MAX_SIZE", "10000"))
+    L1_CACHE_TTL_MS: int = int(os.getenv("L1_CACHE_TTL_MS", "1000"))
+    L1_CACHE_INVALIDATION_CHANNEL: Optional[str] = os.getenv("L1_CACHE_INVALIDATION_CHANNEL")
+
     # Настройки ML модели
     ML_MODEL_TIMEOUT_MS: int = 100  # Таймаут для модели в миллисекундах
     DEFAULT_SCORING_VALUE: float = 0.5  # Значение по умолчанию в случае таймаута
+    # Бэкенд модели: rules - эвристические правила в процессе сервиса,
+    # process_pool - артефакт MODEL_PATH в пуле из MODEL_WORKERS процессов.
+    # Артефакт создается командой python -m services.model_export (эталонная
+    # модель по эвристическим правилам); без него сервис не стартует
+    MODEL_BACKEND: str = os.getenv("MODEL_BACKEND", "rules")
+    MODEL_PATH: str = os.getenv("MODEL_PATH", "models/artifacts/model.npz")
+    MODEL_WORKERS: int = int(os.getenv("MODEL_WORKERS", "2"))
+
+    # Микро-пакетная оценка: конкурентные запросы собираются в пакет до
+    # SCORING_BATCH_MAX_SIZE транзакций или SCORING_BATCH_MAX_WAIT_MS миллисекунд
+    SCORING_BATCH_ENABLED: bool = os.getenv("SCORING_BATCH_ENABLED", "false").lower() == "true"
+    SCORING_BATCH_MAX_SIZE: int = int(os.getenv("SCORING_BATCH_MAX_SIZE", "32"))
+    SCORING_BATCH_MAX_WAIT_MS: float = float(os.getenv("SCORING_BATCH_MAX_WAIT_MS", "2"))
 
     # Настройки API
     API_V1_STR: str = "/api/v1"
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "1000"))  # Максимум транзакций в пакетном запросе
+    STREAM_MAX_CONCURRENCY: int = int(os.getenv("STREAM_MAX_CONCURRENCY", "64"))  # Транзакций в обработке на один NDJSON поток
+    STREAM_MAX_LINE_BYTES: int = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))  # Максимальная длина строки NDJSON
+    # Быстрый путь JSON: результат собирается один раз без повторной валидации,
+    # ответ кодируется orjson
+    FAST_JSON_ENABLED: bool = os.getenv("FAST_JSON_ENABLED", "true").lower() == "true"
+
+    # Настройки мониторинга
+    # Метрики event loop и GC; интервал задает частоту измерения задержки event loop
+    RUNTIME_METRICS_ENABLED: bool = os.getenv("RUNTIME_METRICS_ENABLED", "true").lower() == "true"
+    METRICS_LOOP_LAG_INTERVAL_MS: float = float(os.getenv("METRICS_LOOP_LAG_INTERVAL_MS", "500"))
 
     # Настройки безопасности
     SECRET_KEY: Optional[str] = os.getenv("SECRET_KEY")
@@ -0,0 +1,42 @@
+"""
+Конфигурация gunicorn: несколько воркеров uvicorn с общими метриками Prometheus
+
+Запуск:
+    PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus gunicorn -c gunicorn.conf.py main:app
+
+Каждый воркер пишет метрики в файлы PROMETHEUS_MULTIPROC_DIR, и /metrics
+любого воркера отдает сумму по всем воркерам. Каталог очищается при
+старте мастера, файлы live метрик завершившегося воркера удаляются в child_exit.
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+
+def on_starting(server):
+    """Очистить файлы метрик предыдущего запуска"""
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not multiproc_dir:
+        server.log.warning(
+            "PROMETHEUS_MULTIPROC_DIR не задан: /metrics будет отдавать метрики только одного воркера"
+        )
+        return
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """
+    Удалить live метрики завершившегося воркера
+
+    monitoring.metrics здесь не импортируется: определения метрик приложения
+    в мастере создали бы файлы метрик с его pid, которые никто не удалит.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,119 @@
+"""
+Гистограмма задержек в стиле HdrHistogram
+
+Значения (целые микросекунды) хранятся в лог-линейных бакетах: до
+2 * SUB_BUCKET_HALF_COUNT каждое значение имеет свой счетчик, дальше
+каждая степень двойки делится на SUB_BUCKET_HALF_COUNT равных частей.
+Относительная погрешность не превышает 1 / SUB_BUCKET_HALF_COUNT (~0.1%,
+три значащие цифры), память не зависит от числа записанных значений.
+"""
+from typing import Dict, Iterable, List
+
+SUB_BUCKET_BITS = 11
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF_COUNT = SUB_BUCKET_COUNT // 2
+
+REPORT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def _index_of(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF_COUNT + (value >> shift) - SUB_BUCKET_HALF_COUNT
+
+
+def _highest_equivalent_value(index: int) -> int:
+    """Наибольшее значение, попадающее в тот же бакет"""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    offset = index - SUB_BUCKET_COUNT
+    shift = offset // SUB_BUCKET_HALF_COUNT + 1
+    lowest = (offset % SUB_BUCKET_HALF_COUNT + SUB_BUCKET_HALF_COUNT) << shift
+    return lowest + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """Гистограмма задержек в микросекундах с фиксированной относительной точностью"""
+
+    def __init__(self, highest_trackable_us: int = 3_600_000_000):
+        """
+        Args:
+            highest_trackable_us: Наибольшее хранимое значение; большие значения
+                записываются как оно
+        """
+        self.highest_trackable_us = highest_trackable_us
+        self._counts: List[int] = [0] * (_index_of(highest_trackable_us) + 1)
+        self.total_count = 0
+        self._total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def record(self, value_us: int, count: int = 1) -> None:
+        """
+        Записать значение
+
+        Args:
+            value_us: Задержка в микросекундах
+            count: Сколько раз записать значение
+        """
+        value_us = min(max(int(value_us), 0), self.highest_trackable_us)
+        self._counts[_index_of(value_us)] += count
+        self.total_count += count
+        self._total_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Добавить значения другой гистограммы с тем же диапазоном"""
+        if other.highest_trackable_us != self.highest_trackable_us:
+            raise ValueError("Гистограммы с разным диапазоном значений не объединяются")
+        for index, count in enumerate(other._counts):
+            if count:
+                self._counts[index] += count
+        self.total_count += other.total_count
+        self._total_us += other._total_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    @property
+    def mean_us(self) -> float:
+        return self._total_us / self.total_count if self.total_count else 0.0
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """
+        Значение перцентиля
+
+        Args:
+            percentile: Перцентиль от 0 до 100
+
+        Returns:
+            Наибольшее значение бакета, в котором достигается перцентиль
+            (0 для пустой гистограммы)
+        """
+        if self.total_count == 0:
+            return 0
+        target = max(1, round(percentile / 100 * self.total_count))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return min(_highest_equivalent_value(index), self.max_us)
+        return self.max_us
+
+    def percentiles(self, percentiles: Iterable[float] = REPORT_PERCENTILES) -> Dict[str, int]:
+        """Значения перцентилей по ключам p50, p90, p99, p99.9"""
+        return {f"p{percentile:g}": self.value_at_percentile(percentile) for percentile in percentiles}
+
+    def to_dict(self) -> Dict:
+        """Сводка для JSON отчета (значения в микросекундах)"""
+        return {
+            "count": self.total_count,
+            "min_us": self.min_us or 0,
+            "mean_us": round(self.mean_us, 1),
+            "max_us": self.max_us,
+            **{f"{key}_us": value for key, value in self.percentiles().items()},
+        }
@@ -0,0 +1,242 @@
+"""
+Генерация нагрузки в открытом цикле (open-loop)
+
+Моменты отправки запросов рассчитываются заранее по профилю нагрузки и не
+зависят от того, как быстро отвечает сервис: каждый запрос запускается
+отдельной задачей в свой момент. Задержка считается от запланированного
+момента отправки, поэтому время, которое запрос провел бы в очереди у
+перегруженного сервиса, попадает в перцентили (поправка на coordinated
+omission). Дополнительно отдельно пишется время обслуживания (от фактической
+отправки) и отставание планировщика от расписания.
+
+Запросы сверх max_in_flight не отправляются: ожидание свободного места
+превратило бы генератор в закрытый цикл. У таких запросов нет задержки,
+поэтому они не попадают в гистограммы, а их доля выводится рядом с
+перцентилями; при доле больше max_drop_rate прогон помечается невалидным,
+так как перцентили занижены.
+"""
+import asyncio
+import json
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List
+from loguru import logger
+from load_generator.histogram import LatencyHistogram
+
+
+@dataclass
+class RateStage:
+    """
+    Этап профиля нагрузки: скорость линейно меняется от скорости предыдущего
+    этапа до target_rps за duration_s секунд
+
+    Attributes:
+        target_rps: Скорость в конце этапа, запросов в секунду
+        duration_s: Длительность этапа в секундах
+    """
+
+    target_rps: float
+    duration_s: float
+
+
+def parse_profile(profile: str) -> List[RateStage]:
+    """
+    Разобрать профиль вида "100:10,500:30,500:60"
+
+    Каждый элемент - "скорость:секунды". Нагрузка начинается с нуля, так что
+    пример выше - разгон до 100 rps за 10 секунд, до 500 rps за 30 секунд и
+    60 секунд на 500 rps.
+
+    Raises:
+        ValueError: Если профиль некорректен
+    """
+    stages = []
+    for item in profile.split(","):
+        try:
+            rps, duration = item.split(":")
+            stage = RateStage(float(rps), float(duration))
+        except ValueError:
+            raise ValueError(f"Некорректный этап профиля нагрузки: {item!r}, ожидается 'rps:секунды'")
+        if stage.target_rps < 0 or stage.duration_s <= 0:
+            raise ValueError(f"Некорректный этап профиля нагрузки: {item!r}")
+        stages.append(stage)
+    return stages
+
+
+def send_offsets(stages: List[RateStage], start_rps: float = 0.0) -> Iterator[float]:
+    """
+    Моменты отправки запросов относительно начала теста
+
+    k-й запрос (с нуля) отправляется в момент, когда интеграл скорости
+    достигает k. На этапе с линейно меняющейся скоростью r(t) = r0 + 2at
+    интеграл квадратичен, и момент отправки - корень квадратного уравнения.
+
+    Args:
+        stages: Этапы профиля нагрузки
+        start_rps: Скорость в начале первого этапа
+
+    Yields:
+        Смещения моментов отправки в секундах, по возрастанию
+    """
+    stage_start = 0.0
+    sent = 0.0  # Ожидаемое число запросов к началу этапа
+    rate = start_rps
+    for stage in stages:
+        accel = (stage.target_rps - rate) / (2 * stage.duration_s)
+        stage_total = (rate + stage.target_rps) / 2 * stage.duration_s
+        k = math.ceil(sent)
+        while k < sent + stage_total:
+            n = k - sent
+            if abs(accel) < 1e-12:
+                t = n / rate
+            else:
+                t = (-rate + math.sqrt(max(rate * rate + 4 * accel * n, 0.0))) / (2 * accel)
+            yield stage_start + t
+            k += 1
+        stage_start += stage.duration_s
+        sent += stage_total
+        rate = stage.target_rps
+
+
+class OpenLoopRunner:
+    """Запуск запросов по расписанию с записью задержек в гистограммы"""
+
+    def __init__(
+        self,
+        send: Callable[[Dict[str, Any]], Awaitable[int]],
+        payload_factory: Callable[[], Dict[str, Any]],
+        stages: List[RateStage],
+        start_rps: float = 0.0,
+        timeout_s: float = 5.0,
+        max_in_flight: int = 10_000,
+        max_drop_rate: float = 0.001
+    ):
+        """
+        Args:
+            send: Корутина отправки одного запроса, возвращает HTTP статус
+            payload_factory: Генератор тела запроса
+            stages: Этапы профиля нагрузки
+            start_rps: Скорость в начале первого этапа
+            timeout_s: Таймаут одного запроса
+            max_in_flight: Предел одновременных запросов; запросы сверх него
+                не отправляются и учитываются как dropped, чтобы генератор
+                не превращался в закрытый цикл
+            max_drop_rate: Допустимая доля dropped запросов, выше которой
+                прогон помечается невалидным
+        """
+        self.send = send
+        self.payload_factory = payload_factory
+        self.stages = stages
+        self.start_rps = start_rps
+        self.timeout_s = timeout_s
+        self.max_in_flight = max_in_flight
+        self.max_drop_rate = max_drop_rate
+
+        self.latency = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.send_lag = LatencyHistogram()
+        self.statuses: Counter = Counter()
+        self.in_flight = 0
+        self.elapsed_s = 0.0
+
+    async def _fire(self, intended: float) -> None:
+        loop = asyncio.get_running_loop()
+        payload = self.payload_factory()
+        sent = loop.time()
+        try:
+            status = str(await asyncio.wait_for(self.send(payload), self.timeout_s))
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except Exception as e:
+            logger.debug("Ошибка отправки запроса: {}", e)
+            status = "error"
+        finally:
+            self.in_flight -= 1
+        finished = loop.time()
+        self.statuses[status] += 1
+        self.latency.record((finished - intended) * 1_000_000)
+        self.service_time.record((finished - sent) * 1_000_000)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Выполнить тест
+
+        Returns:
+            Отчет (см. build_report)
+        """
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        start = loop.time()
+        for offset in send_offsets(self.stages, self.start_rps):
+            intended = start + offset
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.send_lag.record((loop.time() - intended) * 1_000_000)
+            if self.in_flight >= self.max_in_flight:
+                self.statuses["dropped"] += 1
+                continue
+            self.in_flight += 1
+            task = asyncio.create_task(self._fire(intended))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        self.elapsed_s = loop.time() - start
+        return self.build_report()
+
+    def build_report(self) -> Dict[str, Any]:
+        """Отчет: целевая и достигнутая скорость, статусы, перцентили задержек"""
+        duration_s = sum(stage.duration_s for stage in self.stages)
+        planned = sum(self.statuses.values())
+        dropped = self.statuses["dropped"]
+        completed = planned - dropped
+        drop_rate = dropped / planned if planned else 0.0
+        return {
+            "duration_s": duration_s,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "target_rps": round(planned / duration_s, 1) if duration_s else 0.0,
+            "achieved_rps": round(completed / self.elapsed_s, 1) if self.elapsed_s else 0.0,
+            "requests": planned,
+            "ok": self.statuses["200"],
+            "errors": planned - self.statuses["200"],
+            "statuses": dict(sorted(self.statuses.items())),
+            "dropped": dropped,
+            "drop_rate": round(drop_rate, 6),
+            # Перцентили не учитывают dropped запросы и при их заметной доле занижены
+            "valid": drop_rate <= self.max_drop_rate,
+            "latency": self.latency.to_dict(),
+            "service_time": self.service_time.to_dict(),
+            "send_lag": self.send_lag.to_dict(),
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Текстовый отчет с перцентилями в миллисекундах"""
+    lines = [
+        f"target {report['target_rps']} rps, achieved {report['achieved_rps']} rps, "
+        f"requests {report['requests']}, errors {report['errors']} {report['statuses']}",
+        f"dropped {report['dropped']} ({report['drop_rate'] * 100:.2f}%), не учтены в перцентилях",
+        f"{'':<14} {'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'max':>9} {'mean':>9}  (ms)",
+    ]
+    for name in ("latency", "service_time", "send_lag"):
+        summary = report[name]
+        values = [summary[key] for key in ("p50_us", "p90_us", "p99_us", "p99.9_us", "max_us", "mean_us")]
+        lines.append(f"{name:<14} " + " ".join(f"{value / 1000:>9.2f}" for value in values))
+    if not report["valid"]:
+        lines.append(
+            "INVALID: доля dropped запросов выше допустимой, перцентили занижены; "
+            "увеличьте --max-in-flight или снизьте скорость"
+        )
+    return "\n".join(lines)
+
+
+def save_report(report: Dict[str, Any], path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+        file.write("\n")
@@ -1,30 +1,60 @@
 """
 Генератор трафика для микросервиса антифрод оценки транзакций
 Использует asyncio для асинхронной генерации нагрузки
+
+Режимы:
+    closed - пачки запросов через asyncio.gather с паузой в секунду
+    open - запросы с заданной скоростью по расписанию, с перцентилями задержки
+
+    python -m load_generator.traffic_generator --mode open --rps 500 --duration 60
+    python -m load_generator.traffic_generator --mode open --profile 100:10,500:30,500:60 --report report.json
+
+Профили нагрузки (--workload) описаны в load_generator/workload.py; --seed
+повторяет сценарий, --preseed N заполняет историю N самых активных клиентов.
 """
+import argparse
 import asyncio
+import os
 import random
-import json
+import sys
 import time
-from datetime import datetime, timedelta
 import aiohttp
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from loguru import logger
+from load_generator.open_loop import OpenLoopRunner, RateStage, format_report, parse_profile, save_report
+from load_generator.workload import PROFILES, Workload
+
+TRANSACTIONS_PATH = "/api/v1/transactions/"
 
 
 class TrafficGenerator:
     """Класс для генерации трафика"""
 
-    def __init__(self, base_url: str = "http://localhost:8000", max_transactions: int = 1000):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        max_transactions: int = 1000,
+        max_connections: int = 100,
+        workload: str = "uniform",
+        seed: Optional[int] = None
+    ):
         """
         Инициализация генератора трафика
 
         Args:
             base_url: Базовый URL сервиса
             max_transactions: Максимальное количество транзакций в секунду
+            max_connections: Предел одновременных HTTP соединений
+            workload: Имя профиля нагрузки из PROFILES
+            seed: Seed потока транзакций (по умолчанию случайный, пишется в лог)
         """
         self.base_url = base_url
         self.max_transactions = max_transactions
+        self.max_connections = max_connections
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.workload_name = workload
+        self.workload = Workload(PROFILES[workload], seed)
         self.session = None
         self.running = False
         self.total_transactions = 0
@@ -32,7 +62,7 @@ class TrafficGenerator:
 
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession()
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections))
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -42,48 +72,12 @@ class TrafficGenerator:
 
     def _generate_random_transaction(self) -> Dict[str, Any]:
         """
-        Генерация случайной транзакции
+        Генерация случайной транзакции по профилю нагрузки
 
         Returns:
             Словарь с данными транзакции
         """
-        # Список возможных типов транзакций
-        transaction_types = [55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 65, 66, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 90]
-
-        # Список возможных валют
-        currencies = ['USD', 'EUR', 'RUB', 'GBP', 'JPY', 'CAD', 'AUD', 'CHF']
-
-        # Список возможных каналов
-        channels = ['online', 'mobile', 'pos', 'atm']
-
-        # Список возможных локаций
-        locations = ['US-NY', 'US-CA', 'US-TX', 'US-FL', 'US-WA', 'GB-LON', 'DE-BER', 'FR-PAR', 'JP-TOK', 'CN-BEI']
-
-        # Генерация случайных данных
-        transaction = {
-            "customer_id": f"customer_{random.randint(1, 100000)}",
-            "transaction_id": f"txn_{int(time.time() * 1000)}_{random.randint(1000, 9999)}",
-            "amount": round(random.uniform(1.0, 10000.0), 2),
-            "type": random.choice(transaction_types),
-            "currency": random.choice(currencies),
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "merchant_id": f"merchant_{random.randint(1, 10000)}",
-            "card_bin": f"{random.randint(100000, 999999)}",
-            "ip_address": f"{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            "device_id": f"device_{random.randint(1, 1000000)}",
-            "location": random.choice(locations),
-            "channel": random.choice(channels),
-            "merchant_risk_score": round(random.uniform(0.0, 1.0), 3),
-            "card_risk_score": round(random.uniform(0.0, 1.0), 3),
-            "customer_risk_score": round(random.uniform(0.0, 1.0), 3),
-            "is_velocity_alert": random.choice([True, False]),
-            "is_location_alert": random.choice([True, False]),
-            "is_device_alert": random.choice([True, False]),
-            "transaction_category": random.choice(['ecommerce', 'retail', 'atm', 'card', 'mobile', 'wire']),
-            "is_high_value": random.choice([True, False])
-        }
-
-        return transaction
+        return self.workload.next_transaction()
 
     async def send_transaction(self, transaction_data: Dict[str, Any]) -> bool:
         """
@@ -96,7 +90,7 @@ class TrafficGenerator:
             True если успешно, False в случае ошибки
         """
         try:
-            url = f"{self.base_url}/api/v1/transactions"
+            url = f"{self.base_url}{TRANSACTIONS_PATH}"
             async with self.session.post(url, json=transaction_data, timeout=5) as response:
                 if response.status == 200:
                     result = await response.json()
@@ -116,7 +110,10 @@ class TrafficGenerator:
         Args:
             duration_seconds: Длительность генерации в секундах
         """
-        logger.info(f"Запуск генератора трафика на {duration_seconds} секунд")
+        logger.info(
+            f"Запуск генератора трафика на {duration_seconds} секунд, "
+            f"профиль {self.workload_name}, seed {self.workload.seed}"
+        )
 
         start_time = time.time()
         self.running = True
@@ -158,6 +155,95 @@ class TrafficGenerator:
             self.running = False
             logger.info(f"Генерация трафика завершена. Всего: {self.total_transactions} транзакций, ошибок: {self.errors}")
 
+    async def preseed_history(self, customers: int, batch_size: int = 1000) -> int:
+        """
+        Предзаполнить историю самых активных клиентов через пакетный endpoint
+
+        Глубина истории каждого клиента задается профилем нагрузки.
+
+        Args:
+            customers: Число клиентов (по убыванию активности)
+            batch_size: Размер пакета (не больше MAX_BATCH_SIZE сервиса)
+
+        Returns:
+            Число записанных транзакций
+        """
+        url = f"{self.base_url}{TRANSACTIONS_PATH}batch"
+        batch: List[Dict[str, Any]] = []
+        written = 0
+
+        async def flush():
+            nonlocal written
+            async with self.session.post(url, json=batch) as response:
+                response.raise_for_status()
+                await response.read()
+            written += len(batch)
+            batch.clear()
+
+        for index in range(min(customers, self.workload.profile.customers)):
+            for transaction in self.workload.history_transactions(index):
+                batch.append(transaction)
+                if len(batch) >= batch_size:
+                    await flush()
+        if batch:
+            await flush()
+        logger.info(f"Предзаполнена история {customers} клиентов: {written} транзакций")
+        return written
+
+    async def post_transaction(self, transaction_data: Dict[str, Any]) -> int:
+        """
+        Отправка одной транзакции без обработки ошибок
+
+        Args:
+            transaction_data: Данные транзакции
+
+        Returns:
+            HTTP статус ответа
+        """
+        async with self.session.post(f"{self.base_url}{TRANSACTIONS_PATH}", json=transaction_data) as response:
+            await response.read()
+            return response.status
+
+    async def generate_open_loop(
+        self,
+        stages: List[RateStage],
+        start_rps: float = 0.0,
+        timeout_s: float = 5.0,
+        max_in_flight: int = 10_000,
+        max_drop_rate: float = 0.001
+    ) -> Dict[str, Any]:
+        """
+        Генерация трафика в открытом цикле по профилю нагрузки
+
+        Args:
+            stages: Этапы профиля нагрузки
+            start_rps: Скорость в начале первого этапа
+            timeout_s: Таймаут одного запроса
+            max_in_flight: Предел одновременных запросов
+            max_drop_rate: Доля dropped запросов, выше которой прогон невалиден
+
+        Returns:
+            Отчет с достигнутой скоростью и перцентилями задержки
+        """
+        logger.info(
+            f"Запуск генератора в открытом цикле: {stages}, "
+            f"профиль {self.workload_name}, seed {self.workload.seed}"
+        )
+        runner = OpenLoopRunner(
+            send=self.post_transaction,
+            payload_factory=self._generate_random_transaction,
+            stages=stages,
+            start_rps=start_rps,
+            timeout_s=timeout_s,
+            max_in_flight=max_in_flight,
+            max_drop_rate=max_drop_rate
+        )
+        report = await runner.run()
+        report["workload"] = {"profile": self.workload_name, "seed": self.workload.seed}
+        self.total_transactions += report["ok"]
+        self.errors += report["errors"]
+        return report
+
     def stop(self):
         """Остановка генерации трафика"""
         self.running = False
@@ -176,11 +262,65 @@ class TrafficGenerator:
         }
 
 
-async def main():
-    """Основная функция для запуска генератора трафика"""
-    async with TrafficGenerator(max_transactions=1000) as generator:
-        await generator.generate_traffic(duration_seconds=60)
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Генератор трафика антифрод сервиса")
+    parser.add_argument("--url", default=os.getenv("BASE_URL", "http://localhost:8000"), help="Базовый URL сервиса")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed", help="Режим генерации")
+    parser.add_argument("--duration", type=float, default=60, help="Длительность в секундах")
+    parser.add_argument(
+        "--rps", type=float, default=float(os.getenv("MAX_TRANSACTIONS", "1000")),
+        help="Скорость, запросов в секунду"
+    )
+    parser.add_argument(
+        "--profile",
+        help="Профиль нагрузки open режима 'rps:секунды,...' с разгоном от нуля (вместо --rps/--duration)"
+    )
+    parser.add_argument("--timeout", type=float, default=5.0, help="Таймаут запроса в секундах")
+    parser.add_argument("--max-in-flight", type=int, default=10_000, help="Предел одновременных запросов (open)")
+    parser.add_argument(
+        "--max-drop-rate", type=float, default=0.001,
+        help="Доля запросов сверх --max-in-flight, выше которой прогон невалиден (open)"
+    )
+    parser.add_argument("--connections", type=int, default=100, help="Предел HTTP соединений")
+    parser.add_argument("--report", help="Путь для JSON отчета (open)")
+    parser.add_argument("--workload", choices=sorted(PROFILES), default="uniform", help="Профиль нагрузки")
+    parser.add_argument("--seed", type=int, help="Seed потока транзакций для воспроизведения сценария")
+    parser.add_argument(
+        "--preseed", type=int, default=0,
+        help="Предзаполнить историю N самых активных клиентов перед тестом"
+    )
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Основная функция для запуска генератора трафика
+
+    Returns:
+        Код выхода: 1, если прогон в открытом цикле невалиден
+    """
+    args = parse_args(argv)
+    async with TrafficGenerator(
+        args.url, int(args.rps), args.connections, workload=args.workload, seed=args.seed
+    ) as generator:
+        if args.preseed:
+            await generator.preseed_history(args.preseed)
+        if args.mode == "closed":
+            await generator.generate_traffic(duration_seconds=args.duration)
+            return 0
+
+        if args.profile:
+            stages, start_rps = parse_profile(args.profile), 0.0
+        else:
+            stages, start_rps = [RateStage(args.rps, args.duration)], args.rps
+        report = await generator.generate_open_loop(
+            stages, start_rps, args.timeout, args.max_in_flight, args.max_drop_rate
+        )
+        print(format_report(report))
+        if args.report:
+            save_report(report, args.report)
+        return 0 if report["valid"] else 1
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""
+Профили нагрузки для генератора трафика
+
+Профиль задает форму трафика, от которой зависит стоимость обработки:
+    - распределение клиентов: равномерное или Zipf (небольшое число
+      "горячих" клиентов дает большую часть транзакций);
+    - всплески: клиент делает серию транзакций подряд (срабатывание velocity);
+    - глубина истории клиентов перед тестом (логнормальное распределение);
+    - устройства и IP: у клиента несколько постоянных, изредка новые и
+      общие для нескольких клиентов.
+
+Поток транзакций полностью определяется профилем и seed: при одном seed
+последовательность клиентов, сумм, устройств и истории повторяется.
+Атрибуты клиента (устройства, IP, локация, типичная сумма) выводятся из
+seed и номера клиента и не зависят от порядка обращений.
+"""
+import bisect
+import itertools
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+TRANSACTION_TYPES = list(range(55, 91))
+CURRENCIES = ['USD', 'EUR', 'RUB', 'GBP', 'JPY', 'CAD', 'AUD', 'CHF']
+CHANNELS = ['online', 'mobile', 'pos', 'atm']
+LOCATIONS = ['US-NY', 'US-CA', 'US-TX', 'US-FL', 'US-WA', 'GB-LON', 'DE-BER', 'FR-PAR', 'JP-TOK', 'CN-BEI']
+CATEGORIES = ['ecommerce', 'retail', 'atm', 'card', 'mobile', 'wire']
+
+# Общие устройства/IP (семейные, офисные NAT, фермы мошенников)
+SHARED_POOL_SIZE = 100
+
+
+@dataclass(frozen=True)
+class WorkloadProfile:
+    """
+    Параметры профиля нагрузки
+
+    Attributes:
+        customers: Число клиентов
+        zipf_exponent: Показатель Zipf для выбора клиента (0 - равномерно)
+        burst_probability: Вероятность, что транзакция начинает всплеск
+        burst_size: Диапазон длины всплеска (включая первую транзакцию)
+        devices_per_customer: Постоянных устройств у клиента
+            (0 - новое случайное устройство в каждой транзакции)
+        ips_per_customer: Постоянных IP у клиента (0 - новый случайный IP)
+        new_device_probability: Вероятность нового устройства/IP
+        shared_probability: Вероятность устройства/IP из общего пула
+        history_depth_median: Медиана глубины предзаполненной истории
+        history_depth_sigma: Сигма логнормального распределения глубины
+        history_depth_max: Максимальная глубина истории клиента
+        history_span_hours: Период, по которому распределена история
+    """
+
+    customers: int = 100_000
+    zipf_exponent: float = 0.0
+    burst_probability: float = 0.0
+    burst_size: Tuple[int, int] = (2, 6)
+    devices_per_customer: int = 0
+    ips_per_customer: int = 0
+    new_device_probability: float = 0.0
+    shared_probability: float = 0.0
+    history_depth_median: int = 0
+    history_depth_sigma: float = 1.0
+    history_depth_max: int = 10_000
+    history_span_hours: float = 24.0
+
+
+PROFILES: Dict[str, WorkloadProfile] = {
+    # Прежнее поведение генератора: равномерные клиенты, без истории и повторов
+    "uniform": WorkloadProfile(),
+    # Умеренная концентрация клиентов, редкие всплески, повторяющиеся устройства
+    "realistic": WorkloadProfile(
+        zipf_exponent=1.0,
+        burst_probability=0.02,
+        devices_per_customer=2,
+        ips_per_customer=3,
+        new_device_probability=0.03,
+        shared_probability=0.01,
+        history_depth_median=50,
+        history_depth_sigma=1.2,
+        history_depth_max=5_000,
+    ),
+    # Худший случай для статистики: немного очень активных клиентов с глубокой историей
+    "hot": WorkloadProfile(
+        customers=10_000,
+        zipf_exponent=1.3,
+        burst_probability=0.1,
+        burst_size=(3, 20),
+        devices_per_customer=3,
+        ips_per_customer=5,
+        new_device_probability=0.05,
+        shared_probability=0.05,
+        history_depth_median=1_000,
+        history_depth_sigma=0.8,
+        history_depth_max=10_000,
+    ),
+}
+
+
+def format_timestamp(moment: datetime) -> str:
+    """Временная метка ISO 8601 с миллисекундами и суффиксом Z"""
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+@dataclass
+class Customer:
+    """Постоянные атрибуты клиента"""
+
+    customer_id: str
+    devices: List[str]
+    ips: List[str]
+    location: str
+    currency: str
+    channel: str
+    card_bin: str
+    typical_amount: float
+    history_depth: int
+
+
+def _random_ip(rng: random.Random) -> str:
+    return f"{rng.randint(1, 255)}.{rng.randint(1, 255)}.{rng.randint(1, 255)}.{rng.randint(1, 255)}"
+
+
+class Workload:
+    """Воспроизводимый поток транзакций по профилю нагрузки"""
+
+    def __init__(self, profile: WorkloadProfile, seed: int = 0):
+        """
+        Args:
+            profile: Профиль нагрузки
+            seed: Seed генератора случайных чисел
+        """
+        self.profile = profile
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._counter = itertools.count()
+        self._customers: Dict[int, Customer] = {}
+        self._burst_customer: Optional[int] = None
+        self._burst_remaining = 0
+
+        self._cum_weights: Optional[List[float]] = None
+        if profile.zipf_exponent > 0:
+            self._cum_weights = list(itertools.accumulate(
+                1.0 / rank ** profile.zipf_exponent for rank in range(1, profile.customers + 1)
+            ))
+
+    def _draw_customer(self) -> int:
+        """Номер клиента с нуля; меньший номер - более активный клиент"""
+        if self._cum_weights is None:
+            return self._rng.randrange(self.profile.customers)
+        point = self._rng.random() * self._cum_weights[-1]
+        return min(bisect.bisect_right(self._cum_weights, point), self.profile.customers - 1)
+
+    def next_customer(self) -> Tuple[int, bool]:
+        """
+        Выбрать клиента следующей транзакции
+
+        Returns:
+            (номер клиента, признак продолжения всплеска)
+        """
+        if self._burst_remaining > 0:
+            self._burst_remaining -= 1
+            return self._burst_customer, True
+
+        index = self._draw_customer()
+        if self.profile.burst_probability and self._rng.random() < self.profile.burst_probability:
+            self._burst_customer = index
+            self._burst_remaining = self._rng.randint(*self.profile.burst_size) - 1
+        return index, False
+
+    def customer(self, index: int) -> Customer:
+        """Атрибуты клиента, детерминированные по seed и номеру"""
+        customer = self._customers.get(index)
+        if customer is None:
+            rng = random.Random(f"{self.seed}:customer:{index}")
+            profile = self.profile
+            depth = 0
+            if profile.history_depth_median:
+                depth = min(
+                    int(rng.lognormvariate(math.log(profile.history_depth_median), profile.history_depth_sigma)),
+                    profile.history_depth_max
+                )
+            customer = Customer(
+                customer_id=f"customer_{index + 1}",
+                devices=[f"device_{index + 1}_{n}" for n in range(profile.devices_per_customer)],
+                ips=[_random_ip(rng) for _ in range(profile.ips_per_customer)],
+                location=rng.choice(LOCATIONS),
+                currency=rng.choice(CURRENCIES),
+                channel=rng.choice(CHANNELS),
+                card_bin=f"{rng.randint(100000, 999999)}",
+                typical_amount=rng.lognormvariate(4.0, 1.0),
+                history_depth=depth,
+            )
+            self._customers[index] = customer
+        return customer
+
+    def _pick(self, rng: random.Random, own: List[str], shared_prefix: str, fresh) -> Tuple[str, bool]:
+        """
+        Выбрать устройство или IP клиента
+
+        Returns:
+            (значение, признак нового для клиента значения)
+        """
+        profile = self.profile
+        if not own:
+            return fresh(), True
+        roll = rng.random()
+        if roll < profile.shared_probability:
+            return f"{shared_prefix}{rng.randrange(SHARED_POOL_SIZE)}", True
+        if roll < profile.shared_probability + profile.new_device_probability:
+            return fresh(), True
+        return rng.choice(own), False
+
+    def _transaction(
+        self,
+        rng: random.Random,
+        customer: Customer,
+        transaction_id: str,
+        moment: datetime,
+        in_burst: bool
+    ) -> Dict[str, Any]:
+        device_id, new_device = self._pick(
+            rng, customer.devices, "device_shared_", lambda: f"device_{rng.randint(1, 1000000)}"
+        )
+        ip_address, _ = self._pick(rng, customer.ips, "10.0.0.", lambda: _random_ip(rng))
+        if self.profile.devices_per_customer:
+            location = customer.location if rng.random() < 0.95 else rng.choice(LOCATIONS)
+            currency = customer.currency if rng.random() < 0.9 else rng.choice(CURRENCIES)
+            channel = customer.channel if rng.random() < 0.7 else rng.choice(CHANNELS)
+            amount = min(max(rng.lognormvariate(math.log(customer.typical_amount), 0.8), 1.0), 10000.0)
+            is_velocity_alert = in_burst
+            is_location_alert = location != customer.location
+            is_device_alert = new_device
+        else:
+            location, currency, channel = rng.choice(LOCATIONS), rng.choice(CURRENCIES), rng.choice(CHANNELS)
+            amount = rng.uniform(1.0, 10000.0)
+            is_velocity_alert = rng.random() < 0.5
+            is_location_alert = rng.random() < 0.5
+            is_device_alert = rng.random() < 0.5
+
+        return {
+            "customer_id": customer.customer_id,
+            "transaction_id": transaction_id,
+            "amount": round(amount, 2),
+            "type": rng.choice(TRANSACTION_TYPES),
+            "currency": currency,
+            "timestamp": format_timestamp(moment),
+            "merchant_id": f"merchant_{rng.randint(1, 10000)}",
+            "card_bin": customer.card_bin if self.profile.devices_per_customer else f"{rng.randint(100000, 999999)}",
+            "ip_address": ip_address,
+            "device_id": device_id,
+            "location": location,
+            "channel": channel,
+            "merchant_risk_score": round(rng.uniform(0.0, 1.0), 3),
+            "card_risk_score": round(rng.uniform(0.0, 1.0), 3),
+            "customer_risk_score": round(rng.uniform(0.0, 1.0), 3),
+            "is_velocity_alert": is_velocity_alert,
+            "is_location_alert": is_location_alert,
+            "is_device_alert": is_device_alert,
+            "transaction_category": rng.choice(CATEGORIES),
+            "is_high_value": amount > 1000.0,
+        }
+
+    def next_transaction(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Следующая транзакция потока
+
+        Args:
+            now: Момент транзакции (по умолчанию текущее время)
+
+        Returns:
+            Тело запроса POST /api/v1/transactions/
+        """
+        index, in_burst = self.next_customer()
+        return self._transaction(
+            self._rng,
+            self.customer(index),
+            f"txn_{self.seed}_{next(self._counter)}",
+            now or datetime.now(timezone.utc),
+            in_burst
+        )
+
+    def history_transactions(self, index: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Предзаполненная история клиента
+
+        Транзакции равномерно распределены по history_span_hours до now,
+        глубина задается профилем. История клиента не зависит от потока
+        next_transaction и от порядка вызова.
+
+        Args:
+            index: Номер клиента
+            now: Момент окончания истории (по умолчанию текущее время)
+
+        Returns:
+            Транзакции по возрастанию времени
+        """
+        customer = self.customer(index)
+        depth = customer.history_depth
+        if not depth:
+            return []
+        rng = random.Random(f"{self.seed}:history:{index}")
+        now = now or datetime.now(timezone.utc)
+        step = timedelta(hours=self.profile.history_span_hours) / depth
+        start = now - step * depth
+        return [
+            self._transaction(rng, customer, f"txn_{self.seed}_h{index}_{n}", start + step * n, False)
+            for n in range(depth)
+        ]
@@ -0,0 +1,78 @@
+"""
+Внутреннее представление сохраненной истории транзакций
+
+История в Redis записывается только после валидации входящей транзакции,
+поэтому при чтении повторная валидация pydantic не нужна. Запись истории -
+легкий dataclass со слотами: без __dict__ на каждый объект и без
+проверок типов при создании. Pydantic модели используются только на границе HTTP.
+
+Время хранится в записи как epoch ms: статистике нужны миллисекунды, а
+строка ISO 8601 форматируется только при обращении к timestamp.
+"""
+from dataclasses import dataclass, fields
+from typing import Dict, Optional
+from models.transaction import Transaction
+from utils.time_windows import parse_timestamp_ms, format_timestamp_ms
+
+
+@dataclass(slots=True)
+class TransactionRecord:
+    """Транзакция из истории клиента (поля, нужные для статистики и признаков)"""
+
+    customer_id: str
+    transaction_id: str
+    amount: float
+    type: int
+    timestamp_ms: int
+    currency: str = ""
+    channel: str = ""
+    location: str = ""
+    transaction_category: Optional[str] = None
+    is_velocity_alert: Optional[bool] = None
+    is_location_alert: Optional[bool] = None
+    is_device_alert: Optional[bool] = None
+    is_high_value: Optional[bool] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict, customer_id: str = "") -> "TransactionRecord":
+        """
+        Создать запись из словаря сохраненной транзакции без валидации
+
+        Args:
+            data: Словарь с полями транзакции (лишние поля игнорируются)
+            customer_id: ID клиента, если его нет в словаре
+
+        Returns:
+            Запись истории
+        """
+        get = data.get
+        return cls(
+            customer_id=get("customer_id") or customer_id,
+            transaction_id=data["transaction_id"],
+            amount=data["amount"],
+            type=data["type"],
+            timestamp_ms=parse_timestamp_ms(data["timestamp"]),
+            currency=get("currency", ""),
+            channel=get("channel", ""),
+            location=get("location", ""),
+            transaction_category=get("transaction_category"),
+            is_velocity_alert=get("is_velocity_alert"),
+            is_location_alert=get("is_location_alert"),
+            is_device_alert=get("is_device_alert"),
+            is_high_value=get("is_high_value"),
+        )
+
+    @classmethod
+    def from_transaction(cls, transaction: Transaction) -> "TransactionRecord":
+        """Создать запись истории из провалидированной транзакции"""
+        values = {
+            field.name: getattr(transaction, field.name)
+            for field in fields(cls)
+            if field.name != "timestamp_ms"
+        }
+        return cls(timestamp_ms=parse_timestamp_ms(transaction.timestamp), **values)
+
+    @property
+    def timestamp(self) -> str:
+        """Временная метка ISO 8601 с суффиксом Z"""
+        return format_timestamp_ms(self.timestamp_ms)
@@ -1,10 +1,25 @@
 """
 Модели результатов оценки
 """
+from dataclasses import dataclass
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
+
+@dataclass(slots=True)
+class ModelScore:
+    """
+    Оценка модели для одной транзакции
+
+    Сервис оценки возвращает только оценку и флаг; ScoringResult со
+    статистикой клиента один раз собирает сервис транзакций.
+    """
+
+    scoring: float
+    is_fraud: bool
+
+
 class ScoringResult(BaseModel):
     """Результат оценки транзакции"""
 
@@ -51,4 +66,21 @@ class ScoringResult(BaseModel):
                 "customer_avg_amount_12h": 85.75,
                 "processed_at": "2023-01-01T10:00:00Z"
             }
-        }
\ No newline at end of file
+        }
+
+
+class BatchScoringItem(BaseModel):
+    """Результат обработки одной транзакции из пакета"""
+
+    index: int = Field(..., description="Позиция транзакции в пакете")
+    result: Optional[ScoringResult] = Field(None, description="Результат оценки")
+    error: Optional[str] = Field(None, description="Ошибка валидации или обработки")
+
+
+class BatchScoringResponse(BaseModel):
+    """Результат обработки пакета транзакций"""
+
+    results: List[BatchScoringItem] = Field(..., description="Результаты в порядке транзакций запроса")
+    processed_count: int = Field(..., description="Количество успешно обработанных транзакций")
+    error_count: int = Field(..., description="Количество транзакций с ошибками")
+    processing_time_ms: Optional[int] = Field(None, description="Время обработки пакета в миллисекундах")
@@ -15,7 +15,8 @@ class Transaction(BaseModel):
     # Основные финансовые данные
     amount: float = Field(..., description="Сумма транзакции")
     currency: str = Field(..., description="Валюта транзакции")
-    type: int = Field(..., description="Тип транзакции")
+    # Тип хранится в истории как int32 (бинарный кодек, упакованная история)
+    type: int = Field(..., ge=-2**31, le=2**31 - 1, description="Тип транзакции")
 
     # Дополнительные поля для анализа
     merchant_id: str = Field(..., description="ID мерчанта")
@@ -1,9 +1,35 @@
 """
 Модуль для настройки метрик мониторинга
+
+При нескольких рабочих процессах (gunicorn, uvicorn --workers) задайте
+переменную окружения PROMETHEUS_MULTIPROC_DIR до запуска: каждый процесс
+пишет значения метрик в файлы этого каталога, а /metrics любого процесса
+отдает сумму по всем процессам (см. gunicorn.conf.py). Для Gauge задан
+multiprocess_mode - способ объединения значений процессов.
 """
-from prometheus_client import Counter, Histogram, Gauge
+import asyncio
+import os
+import time
+from typing import Awaitable, Optional, TypeVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
 from fastapi import FastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_fastapi_instrumentator.routing import get_route_name
+from starlette.requests import HTTPConnection
+
+T = TypeVar("T")
+
+# Границы гистограмм задержек внутри запроса (секунды): от 0.5 мс до бюджета запроса и выше
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.5, 1.0)
 
 # Создание метрик
 REQUEST_COUNT = Counter(
@@ -20,9 +46,227 @@ REQUEST_LATENCY = Histogram(
 
 ACTIVE_REQUESTS = Gauge(
     'antifraud_active_requests',
-    'Активные запросы'
+    'Активные запросы',
+    multiprocess_mode='livesum'
+)
+
+# Метрики локального L1 кэша статистики клиентов
+L1_CACHE_REQUESTS = Counter(
+    'antifraud_l1_cache_requests_total',
+    'Обращения к локальному кэшу статистики клиентов',
+    ['result']
+)
+
+L1_CACHE_EVICTIONS = Counter(
+    'antifraud_l1_cache_evictions_total',
+    'Вытеснения из локального кэша статистики клиентов',
+    ['reason']
+)
+
+L1_CACHE_SIZE = Gauge(
+    'antifraud_l1_cache_size',
+    'Количество клиентов в локальном кэше статистики',
+    multiprocess_mode='livesum'
+)
+
+# Метрики микро-пакетной оценки
+SCORING_BATCH_SIZE = Histogram(
+    'antifraud_scoring_batch_size',
+    'Размер пакета транзакций, оцененного одним вызовом модели',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+SCORING_BATCH_WAIT = Histogram(
+    'antifraud_scoring_batch_wait_seconds',
+    'Время ожидания транзакции в очереди до отправки пакета в модель',
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05)
+)
+
+# Метрики бюджета времени запроса
+STAGE_TIMEOUTS = Counter(
+    'antifraud_stage_timeouts_total',
+    'Этапы обработки, не уложившиеся в бюджет времени',
+    ['stage']
+)
+
+STAGE_FALLBACKS = Counter(
+    'antifraud_stage_fallbacks_total',
+    'Этапы обработки, результат которых заменен значением по умолчанию',
+    ['stage']
+)
+
+# Задержки этапов обработки транзакции (этапы конвейера и вызов модели)
+STAGE_LATENCY = Histogram(
+    'antifraud_stage_duration_seconds',
+    'Время выполнения этапа обработки транзакции',
+    ['stage'],
+    buckets=LATENCY_BUCKETS
+)
+
+# Метрики обращений к Redis (команда или pipeline/скрипт как один round trip)
+REDIS_COMMANDS = Counter(
+    'antifraud_redis_commands_total',
+    'Обращения к Redis (status: ok, error, cancelled)',
+    ['command', 'status']
+)
+
+REDIS_LATENCY = Histogram(
+    'antifraud_redis_command_duration_seconds',
+    'Время обращения к Redis',
+    ['command'],
+    buckets=LATENCY_BUCKETS
+)
+
+HISTORY_LENGTH = Histogram(
+    'antifraud_customer_history_length',
+    'Количество транзакций в истории клиента при расчете статистики',
+    ['source'],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+)
+
+# Метрики среды выполнения
+EVENT_LOOP_LAG = Gauge(
+    'antifraud_event_loop_lag_seconds',
+    'Задержка пробуждения периодической задачи event loop относительно расписания',
+    multiprocess_mode='livemax'
+)
+
+GC_PAUSE = Gauge(
+    'antifraud_gc_last_pause_seconds',
+    'Длительность последней сборки мусора',
+    ['generation'],
+    multiprocess_mode='livemax'
+)
+
+GC_PAUSE_TOTAL = Counter(
+    'antifraud_gc_pause_seconds_total',
+    'Суммарное время сборок мусора',
+    ['generation']
 )
 
+
+# Дочерние метрики по командам; labels() при каждом обращении дороже самого учета
+_redis_metrics = {}
+
+
+def _redis_children(command: str):
+    children = _redis_metrics.get(command)
+    if children is None:
+        children = (
+            REDIS_LATENCY.labels(command=command),
+            REDIS_COMMANDS.labels(command=command, status="ok"),
+            REDIS_COMMANDS.labels(command=command, status="error"),
+            REDIS_COMMANDS.labels(command=command, status="cancelled"),
+        )
+        _redis_metrics[command] = children
+    return children
+
+
+async def observe_redis(command: str, awaitable: Awaitable[T]) -> T:
+    """
+    Выполнить обращение к Redis с учетом количества и задержки
+
+    Args:
+        command: Имя команды для метки (zrangebyscore, evalsha, multi_write, ...)
+        awaitable: Обращение к клиенту Redis
+
+    Returns:
+        Результат обращения
+    """
+    latency, ok, error, cancelled = _redis_children(command)
+    started = time.perf_counter()
+    try:
+        result = await awaitable
+    except asyncio.CancelledError:
+        # Отмена по дедлайну запроса - не ошибка Redis
+        cancelled.inc()
+        raise
+    except Exception:
+        error.inc()
+        raise
+    latency.observe(time.perf_counter() - started)
+    ok.inc()
+    return result
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware, заполняющее REQUEST_COUNT, REQUEST_LATENCY и ACTIVE_REQUESTS
+
+    Эндпоинт берется из шаблона маршрута, поэтому число меток не зависит
+    от параметров пути. Шаблон с префиксами роутеров вычисляется один раз
+    на маршрут и кэшируется. Время считается до конца отправки ответа,
+    включая потоковые ответы.
+    """
+
+    def __init__(self, app, excluded_paths=("/metrics",)):
+        self.app = app
+        self._excluded_paths = frozenset(excluded_paths)
+        self._endpoints = {}
+
+    def _endpoint(self, scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            return "unmatched"
+        # Объекты маршрутов живут все время работы приложения и не всегда
+        # хэшируемы, поэтому ключ - id вместе со ссылкой на сам маршрут
+        cached = self._endpoints.get(id(route))
+        if cached is None or cached[0] is not route:
+            cached = (route, get_route_name(HTTPConnection(scope), False) or "unmatched")
+            self._endpoints[id(route)] = cached
+        return cached[1]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self._excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        ACTIVE_REQUESTS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            ACTIVE_REQUESTS.dec()
+            endpoint = self._endpoint(scope)
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(time.perf_counter() - started)
+            REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=str(status_code)).inc()
+
+
+def metrics_registry(multiproc_dir: Optional[str] = None) -> CollectorRegistry:
+    """
+    Реестр, из которого отдаются метрики
+
+    Args:
+        multiproc_dir: Каталог файлов метрик процессов
+            (по умолчанию PROMETHEUS_MULTIPROC_DIR)
+
+    Returns:
+        Реестр с суммой метрик всех процессов в многопроцессном режиме,
+        иначе глобальный реестр процесса
+    """
+    multiproc_dir = multiproc_dir or os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not multiproc_dir:
+        return REGISTRY
+    # Реестр создается на каждый запрос: файлы процессов читаются заново
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=multiproc_dir)
+    return registry
+
+
+def generate_metrics() -> bytes:
+    """Экспозиция метрик в текстовом формате Prometheus (CONTENT_TYPE_LATEST)"""
+    return generate_latest(metrics_registry())
+
+
 def setup_metrics(app: FastAPI):
     """
     Настройка метрик для FastAPI приложения
@@ -37,7 +281,7 @@ def setup_metrics(app: FastAPI):
     instrumentator.instrument(app)
 
     # Добавление пользовательских метрик
-    # (в реальном приложении могли бы быть дополнительные метрики в зависимости от бизнес-логики)
+    app.add_middleware(RequestMetricsMiddleware)
 
     return app
 
@@ -48,5 +292,19 @@ def register_custom_metrics():
     return {
         'request_count': REQUEST_COUNT,
         'request_latency': REQUEST_LATENCY,
-        'active_requests': ACTIVE_REQUESTS
+        'active_requests': ACTIVE_REQUESTS,
+        'l1_cache_requests': L1_CACHE_REQUESTS,
+        'l1_cache_evictions': L1_CACHE_EVICTIONS,
+        'l1_cache_size': L1_CACHE_SIZE,
+        'scoring_batch_size': SCORING_BATCH_SIZE,
+        'scoring_batch_wait': SCORING_BATCH_WAIT,
+        'stage_timeouts': STAGE_TIMEOUTS,
+        'stage_fallbacks': STAGE_FALLBACKS,
+        'stage_latency': STAGE_LATENCY,
+        'redis_commands': REDIS_COMMANDS,
+        'redis_latency': REDIS_LATENCY,
+        'history_length': HISTORY_LENGTH,
+        'event_loop_lag': EVENT_LOOP_LAG,
+        'gc_pause': GC_PAUSE,
+        'gc_pause_total': GC_PAUSE_TOTAL
     }
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Метрики среды выполнения: задержка event loop и паузы сборщика мусора
+
+Задержка event loop измеряется периодической задачей: она засыпает на
+интервал и записывает, насколько позже запланированного проснулась. Рост
+задержки означает, что обработчики блокируют loop (CPU работа, синхронный
+ввод-вывод). Паузы GC измеряются через gc.callbacks без опроса.
+"""
+import asyncio
+import gc
+import time
+from typing import Dict, Optional
+from monitoring.metrics import EVENT_LOOP_LAG, GC_PAUSE, GC_PAUSE_TOTAL
+from config.settings import settings
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class EventLoopLagMonitor:
+    """Периодическое измерение задержки event loop"""
+
+    def __init__(self, interval_ms: float = None):
+        """
+        Args:
+            interval_ms: Интервал измерения (по умолчанию из настроек)
+        """
+        self._interval = (interval_ms or settings.METRICS_LOOP_LAG_INTERVAL_MS) / 1000
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            EVENT_LOOP_LAG.set(max(loop.time() - scheduled, 0.0))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class GCPauseMonitor:
+    """Измерение пауз сборщика мусора по поколениям"""
+
+    def __init__(self):
+        self._started: Dict[int, float] = {}
+        # Дочерние метрики создаются заранее, чтобы не искать их в callback
+        self._last_pause = {generation: GC_PAUSE.labels(generation=str(generation)) for generation in range(3)}
+        self._total_pause = {generation: GC_PAUSE_TOTAL.labels(generation=str(generation)) for generation in range(3)}
+
+    def _callback(self, phase: str, info: Dict) -> None:
+        generation = info["generation"]
+        if phase == "start":
+            self._started[generation] = time.perf_counter()
+            return
+        started = self._started.pop(generation, None)
+        if started is not None:
+            pause = time.perf_counter() - started
+            self._last_pause[generation].set(pause)
+            self._total_pause[generation].inc(pause)
+
+    def start(self) -> None:
+        if self._callback not in gc.callbacks:
+            gc.callbacks.append(self._callback)
+
+    def close(self) -> None:
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+
+class RuntimeMonitor:
+    """Задержка event loop и паузы GC, запускаемые вместе с приложением"""
+
+    def __init__(self, interval_ms: float = None):
+        self.loop_lag = EventLoopLagMonitor(interval_ms)
+        self.gc_pauses = GCPauseMonitor()
+
+    async def start(self) -> None:
+        await self.loop_lag.start()
+        self.gc_pauses.start()
+        logger.info("Мониторинг event loop и сборщика мусора запущен")
+
+    async def close(self) -> None:
+        self.gc_pauses.close()
+        await self.loop_lag.close()
@@ -0,0 +1,243 @@
+"""
+Репозиторий транзакций с локальным L1 кэшем статистики клиентов
+
+Правила согласованности:
+    - Запись всегда идет в нижележащий репозиторий (write-through), затем
+      закэшированная статистика клиента обновляется локально.
+    - Запись кэша живет не дольше L1_CACHE_TTL_MS. В течение TTL окна не
+      сдвигаются во времени, поэтому транзакции, выпавшие из окна, и записи
+      других воркеров становятся видны не позже чем через TTL.
+    - При нескольких воркерах можно задать L1_CACHE_INVALIDATION_CHANNEL:
+      каждый воркер публикует ID клиента после записи, остальные удаляют
+      его из своего кэша.
+"""
+import asyncio
+import os
+import uuid
+from typing import Dict, List, Optional, Set
+import numpy as np
+import redis.asyncio as redis
+from models.history import TransactionRecord
+from models.transaction import Transaction
+from repositories.transaction_repository import TransactionRepository
+from monitoring.metrics import L1_CACHE_REQUESTS, L1_CACHE_EVICTIONS, L1_CACHE_SIZE
+from config.settings import settings
+from utils.lru_cache import TTLLRUCache
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class CachedTransactionRepository(TransactionRepository):
+    """Декоратор репозитория с ограниченным in-memory кэшем статистики клиентов"""
+
+    def __init__(
+        self,
+        repository: TransactionRepository,
+        max_size: int = None,
+        ttl_ms: int = None,
+        redis_client: Optional[redis.Redis] = None,
+        invalidation_channel: str = None
+    ):
+        self._repository = repository
+        self._cache = TTLLRUCache(
+            max_size=max_size or settings.L1_CACHE_MAX_SIZE,
+            ttl_seconds=(ttl_ms or settings.L1_CACHE_TTL_MS) / 1000,
+            on_evict=self._on_evict
+        )
+        self._redis_client = redis_client
+        self._invalidation_channel = invalidation_channel or settings.L1_CACHE_INVALIDATION_CHANNEL
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._listener: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _on_evict(reason: str) -> None:
+        L1_CACHE_EVICTIONS.labels(reason=reason).inc()
+
+    def _get_cached(self, customer_id: str) -> Optional[Dict]:
+        """
+        Получить закэшированную статистику клиента
+
+        Возвращается сама запись кэша: изменения в ней не продлевают TTL,
+        наружу отдаются только копии.
+        """
+        stats = self._cache.get(customer_id)
+        L1_CACHE_REQUESTS.labels(result="hit" if stats is not None else "miss").inc()
+        return stats
+
+    def _put(self, customer_id: str, stats: Dict) -> None:
+        self._cache.set(customer_id, self._copy(stats))
+        L1_CACHE_SIZE.set(len(self._cache))
+
+    @staticmethod
+    def _copy(stats: Dict) -> Dict:
+        copied = dict(stats)
+        copied["transaction_count_by_type"] = dict(stats.get("transaction_count_by_type", {}))
+        return copied
+
+    @staticmethod
+    def _apply_transaction(stats: Dict, transaction: Transaction) -> None:
+        """Учесть новую транзакцию в закэшированной статистике"""
+        stats["total_transactions"] = stats.get("total_transactions", 0) + 1
+        stats["total_amount"] = stats.get("total_amount", 0.0) + transaction.amount
+        stats["avg_amount"] = stats["total_amount"] / stats["total_transactions"]
+        type_counts = stats["transaction_count_by_type"]
+        type_counts[transaction.type] = type_counts.get(transaction.type, 0) + 1
+        stats["last_transaction_time"] = transaction.timestamp
+
+        for hours in settings.STATISTICS_WINDOWS_HOURS:
+            count_key = f"transaction_count_{hours}h"
+            if count_key not in stats:
+                continue
+            count = stats[count_key] + 1
+            total = stats[f"total_amount_{hours}h"] + transaction.amount
+            stats[count_key] = count
+            stats[f"total_amount_{hours}h"] = total
+            stats[f"avg_amount_{hours}h"] = total / count
+
+    @staticmethod
+    def _window_keys() -> List[str]:
+        return [
+            f"{prefix}_{hours}h"
+            for hours in settings.STATISTICS_WINDOWS_HOURS
+            for prefix in ("transaction_count", "total_amount", "avg_amount")
+        ]
+
+    def _has_windows(self, stats: Dict) -> bool:
+        return all(key in stats for key in self._window_keys())
+
+    async def add_transaction(self, transaction: Transaction) -> None:
+        """Добавить транзакцию (write-through)"""
+        await self._repository.add_transaction(transaction)
+
+        stats = self._cache.get(transaction.customer_id)
+        if stats is not None:
+            self._apply_transaction(stats, transaction)
+        self._publish_invalidation(transaction.customer_id)
+
+    async def ingest_transaction(self, transaction: Transaction) -> Dict:
+        """
+        Добавить транзакцию и вернуть статистику клиента
+
+        Для закэшированного клиента в Redis уходит только запись, статистика
+        обновляется локально.
+        """
+        stats = self._get_cached(transaction.customer_id)
+        if stats is None or not self._has_windows(stats):
+            stats = await self._repository.ingest_transaction(transaction)
+            self._put(transaction.customer_id, stats)
+            self._publish_invalidation(transaction.customer_id)
+            return stats
+
+        await self._repository.add_transaction(transaction)
+        self._apply_transaction(stats, transaction)
+        self._publish_invalidation(transaction.customer_id)
+        return self._copy(stats)
+
+    async def ingest_batch(self, transactions: List[Transaction]) -> List[Dict]:
+        """Добавить пакет транзакций; в кэш попадает статистика после последней транзакции клиента"""
+        snapshots = await self._repository.ingest_batch(transactions)
+        for transaction, stats in zip(transactions, snapshots):
+            self._put(transaction.customer_id, stats)
+        for customer_id in {transaction.customer_id for transaction in transactions}:
+            self._publish_invalidation(customer_id)
+        return snapshots
+
+    async def get_transactions_by_customer(
+        self,
+        customer_id: str,
+        since_ms: Optional[int] = None
+    ) -> List[TransactionRecord]:
+        return await self._repository.get_transactions_by_customer(customer_id, since_ms=since_ms)
+
+    async def get_packed_history(self, customer_id: str) -> np.ndarray:
+        return await self._repository.get_packed_history(customer_id)
+
+    async def get_statistics_by_customer(self, customer_id: str) -> Dict:
+        """Получить статистику клиента, из кэша при наличии"""
+        stats = self._get_cached(customer_id)
+        if stats is not None:
+            return self._copy(stats)
+
+        stats = await self._repository.get_statistics_by_customer(customer_id)
+        self._put(customer_id, stats)
+        return stats
+
+    async def get_window_statistics(self, customer_id: str, reference_ms: int) -> Dict:
+        """Получить статистику по окнам, из кэша при наличии"""
+        stats = self._get_cached(customer_id)
+        if stats is not None and self._has_windows(stats):
+            return {key: stats[key] for key in self._window_keys()}
+
+        windows = await self._repository.get_window_statistics(customer_id, reference_ms)
+        if stats is not None:
+            stats.update(windows)
+        return windows
+
+    def get_cached_statistics(self, customer_id: str) -> Optional[Dict]:
+        """Получить статистику клиента только из кэша"""
+        stats = self._cache.get(customer_id)
+        return self._copy(stats) if stats is not None else None
+
+    async def update_statistics(self, customer_id: str, stats: Dict) -> None:
+        await self._repository.update_statistics(customer_id, stats)
+        self._cache.invalidate(customer_id)
+        self._publish_invalidation(customer_id)
+
+    async def get_cached_transaction(self, customer_id: str) -> Optional[TransactionRecord]:
+        return await self._repository.get_cached_transaction(customer_id)
+
+    async def delete_expired_transactions(self) -> None:
+        await self._repository.delete_expired_transactions()
+
+    def _publish_invalidation(self, customer_id: str) -> None:
+        """Отправить другим воркерам сообщение о записи, не блокируя запрос"""
+        if not self._invalidation_channel or self._redis_client is None:
+            return
+
+        task = asyncio.create_task(
+            self._redis_client.publish(
+                self._invalidation_channel,
+                f"{self._worker_id}:{customer_id}"
+            )
+        )
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def start(self) -> None:
+        """Подписаться на канал инвалидации (если он настроен)"""
+        if not self._invalidation_channel or self._redis_client is None or self._listener:
+            return
+        pubsub = self._redis_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._invalidation_channel)
+        self._listener = asyncio.create_task(self._listen(pubsub))
+        logger.info(f"L1 кэш подписан на канал инвалидации {self._invalidation_channel}")
+
+    async def _listen(self, pubsub) -> None:
+        """Удалять из кэша клиентов, для которых записали другие воркеры"""
+        try:
+            async for message in pubsub.listen():
+                data = message.get("data")
+                if isinstance(data, bytes):
+                    data = data.decode()
+                if not isinstance(data, str):
+                    continue
+                worker_id, _, customer_id = data.partition(":")
+                if worker_id != self._worker_id:
+                    self._cache.invalidate(customer_id)
+        finally:
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        """Остановить подписку и закрыть нижележащий репозиторий"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        close = getattr(self._repository, "close", None)
+        if close is not None:
+            await close()
@@ -0,0 +1,182 @@
+"""
+Кодеки сериализации транзакций для хранения истории в Redis
+"""
+import json
+import struct
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+import orjson
+from models.history import TransactionRecord
+from models.transaction import Transaction
+from config.settings import settings
+from utils.time_windows import parse_timestamp_ms
+
+# Версия бинарного формата записывается первым байтом записи.
+# JSON записи всегда начинаются с "{", поэтому форматы различимы по первому байту.
+# v1 - строки с префиксом длины в 1 байт (обрезались до 255 байт, только чтение),
+# v2 - строки с префиксом длины в 2 байта.
+BINARY_FORMAT_V1 = 0x01
+BINARY_FORMAT_V2 = 0x02
+JSON_FORMAT_MARKER = ord("{")
+
+# Заголовок: версия, время (epoch ms), сумма, тип, маска наличия флагов, значения флагов
+_HEADER_V1 = struct.Struct("<BqdiBB")
+_STRING_LENGTH_V2 = struct.Struct("<H")
+
+# Флаги риска, которые используются при оценке транзакции
+_FLAG_FIELDS = ("is_velocity_alert", "is_location_alert", "is_device_alert", "is_high_value")
+
+# Строковые поля, необходимые для признаков, в порядке записи
+_STRING_FIELDS = ("transaction_id", "currency", "channel", "location", "transaction_category")
+
+
+class TransactionCodec(ABC):
+    """Абстрактный кодек транзакций"""
+
+    @abstractmethod
+    def encode(self, transaction: Transaction) -> bytes:
+        """
+        Сериализовать транзакцию для хранения
+
+        Args:
+            transaction: Транзакция
+
+        Returns:
+            Сериализованная запись
+        """
+        ...
+
+    @abstractmethod
+    def decode(self, payload: Union[bytes, str], customer_id: str = "") -> TransactionRecord:
+        """
+        Восстановить запись истории без повторной валидации
+
+        Args:
+            payload: Сериализованная запись
+            customer_id: ID клиента (для форматов, которые не хранят его в записи)
+
+        Returns:
+            Запись истории
+        """
+        ...
+
+
+class JsonTransactionCodec(TransactionCodec):
+    """Исходный формат: полный JSON дамп модели"""
+
+    def encode(self, transaction: Transaction) -> bytes:
+        return json.dumps(transaction.model_dump()).encode("utf-8")
+
+    def decode(self, payload: Union[bytes, str], customer_id: str = "") -> TransactionRecord:
+        return TransactionRecord.from_dict(orjson.loads(payload), customer_id)
+
+
+class BinaryTransactionCodec(TransactionCodec):
+    """
+    Компактный бинарный формат с заголовком версии
+
+    Хранит только поля, нужные для статистики и признаков: время, сумму, тип,
+    флаги риска и строковые поля (строки с префиксом длины в 2 байта).
+    Записи в старом JSON формате и в бинарном формате v1 читаются прозрачно.
+    """
+
+    def __init__(self):
+        self._json_codec = JsonTransactionCodec()
+
+    def encode(self, transaction: Transaction) -> bytes:
+        present = 0
+        values = 0
+        for bit, field in enumerate(_FLAG_FIELDS):
+            value = getattr(transaction, field)
+            if value is not None:
+                present |= 1 << bit
+                if value:
+                    values |= 1 << bit
+
+        parts = [
+            _HEADER_V1.pack(
+                BINARY_FORMAT_V2,
+                parse_timestamp_ms(transaction.timestamp),
+                transaction.amount,
+                transaction.type,
+                present,
+                values,
+            )
+        ]
+        for field in _STRING_FIELDS:
+            encoded = (getattr(transaction, field) or "").encode("utf-8")
+            if len(encoded) > 0xFFFF:
+                # Обрезка изменила бы transaction_id, по которому идентифицируются записи истории
+                raise ValueError(f"Поле {field} длиннее {0xFFFF} байт и не может быть сохранено")
+            parts.append(_STRING_LENGTH_V2.pack(len(encoded)))
+            parts.append(encoded)
+
+        return b"".join(parts)
+
+    def decode(self, payload: Union[bytes, str], customer_id: str = "") -> TransactionRecord:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+
+        version = payload[0]
+        if version == JSON_FORMAT_MARKER:
+            return self._json_codec.decode(payload, customer_id)
+        if version not in (BINARY_FORMAT_V1, BINARY_FORMAT_V2):
+            raise ValueError(f"Неизвестная версия формата записи: {version}")
+
+        _, timestamp_ms, amount, txn_type, present, values = _HEADER_V1.unpack_from(payload)
+
+        offset = _HEADER_V1.size
+        strings = {}
+        if version == BINARY_FORMAT_V2:
+            for field in _STRING_FIELDS:
+                (length,) = _STRING_LENGTH_V2.unpack_from(payload, offset)
+                offset += _STRING_LENGTH_V2.size
+                strings[field] = payload[offset:offset + length].decode("utf-8")
+                offset += length
+        else:
+            # v1 обрезал строки по границе байта и мог разрезать многобайтовый символ
+            for field in _STRING_FIELDS:
+                length = payload[offset]
+                strings[field] = payload[offset + 1:offset + 1 + length].decode("utf-8", errors="replace")
+                offset += 1 + length
+
+        flags = {
+            field: bool(values & (1 << bit)) if present & (1 << bit) else None
+            for bit, field in enumerate(_FLAG_FIELDS)
+        }
+
+        # Поля, которые не хранятся в бинарном формате, в записи истории не нужны
+        return TransactionRecord(
+            customer_id=customer_id,
+            transaction_id=strings["transaction_id"],
+            amount=amount,
+            type=txn_type,
+            timestamp_ms=timestamp_ms,
+            currency=strings["currency"],
+            channel=strings["channel"],
+            location=strings["location"],
+            transaction_category=strings["transaction_category"] or None,
+            **flags,
+        )
+
+
+_CODECS = {
+    "json": JsonTransactionCodec,
+    "binary": BinaryTransactionCodec,
+}
+
+
+def get_codec(name: Optional[str] = None) -> TransactionCodec:
+    """
+    Получить кодек по имени
+
+    Args:
+        name: Имя кодека (json, binary)
+
+    Returns:
+        Экземпляр кодека
+    """
+    name = name or settings.TRANSACTION_CODEC
+    if name not in _CODECS:
+        raise ValueError(f"Неизвестный кодек транзакций: {name}")
+    return _CODECS[name]()
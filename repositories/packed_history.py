@@ -0,0 +1,55 @@
+"""
+Упакованная числовая история клиента
+
+История хранится в Redis строкой из записей фиксированной длины
+(время, сумма, тип). Новая запись дописывается командой APPEND, а чтение
+возвращает один blob, который оборачивается numpy.frombuffer без копирования
+и без создания Python объекта на каждую транзакцию.
+"""
+import numpy as np
+from models.transaction import Transaction
+from utils.time_windows import parse_timestamp_ms
+
+# Формат записи: время (epoch ms), сумма, тип транзакции; little-endian, без выравнивания
+PACKED_RECORD_DTYPE = np.dtype([
+    ("timestamp_ms", "<i8"),
+    ("amount", "<f8"),
+    ("type", "<i4"),
+])
+
+
+def pack_record(transaction: Transaction) -> bytes:
+    """
+    Упаковать транзакцию в запись фиксированной длины
+
+    Args:
+        transaction: Транзакция
+
+    Returns:
+        Запись длиной PACKED_RECORD_DTYPE.itemsize байт
+    """
+    record = np.array(
+        [(parse_timestamp_ms(transaction.timestamp), transaction.amount, transaction.type)],
+        dtype=PACKED_RECORD_DTYPE
+    )
+    return record.tobytes()
+
+
+def unpack_records(blob: bytes) -> np.ndarray:
+    """
+    Представить blob как структурированный массив записей без копирования
+
+    Неполная запись в конце (не должна возникать при APPEND целых записей)
+    отбрасывается.
+
+    Args:
+        blob: Содержимое ключа упакованной истории
+
+    Returns:
+        Массив с полями timestamp_ms, amount, type (только для чтения)
+    """
+    if not blob:
+        return np.empty(0, dtype=PACKED_RECORD_DTYPE)
+
+    usable = len(blob) - len(blob) % PACKED_RECORD_DTYPE.itemsize
+    return np.frombuffer(blob, dtype=PACKED_RECORD_DTYPE, count=usable // PACKED_RECORD_DTYPE.itemsize)
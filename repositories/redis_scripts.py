@@ -0,0 +1,99 @@
+"""
+Lua скрипты Redis для репозитория транзакций
+"""
+
+# Атомарная запись транзакции и расчет статистики клиента за один round trip.
+#
+# KEYS[1] - история клиента (sorted set или list)
+# KEYS[2] - hash инкрементальных агрегатов
+# KEYS[3] - hash временных бакетов
+#
+# ARGV[1] - сериализованная транзакция
+# ARGV[2] - время транзакции (epoch ms)
+# ARGV[3] - сумма транзакции
+# ARGV[4] - тип транзакции
+# ARGV[5] - TTL в секундах
+# ARGV[6] - длина бакета в миллисекундах
+# ARGV[7] - тип хранилища истории (zset/list)
+# ARGV[8] - исходная временная метка транзакции
+# ARGV[9..] - длины окон в бакетах
+#
+# Возвращает {HGETALL агрегатов, {count_1, sum_1, count_2, sum_2, ...}},
+# суммы возвращаются строками, чтобы Redis не округлял их до целых.
+INGEST_SCRIPT = """
+local timestamp_ms = tonumber(ARGV[2])
+local amount = ARGV[3]
+local ttl = tonumber(ARGV[5])
+local bucket_ms = tonumber(ARGV[6])
+
+if ARGV[7] == 'zset' then
+    redis.call('ZADD', KEYS[1], timestamp_ms, ARGV[1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. string.format('%d', timestamp_ms - ttl * 1000))
+else
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+
+redis.call('HINCRBY', KEYS[2], 'count', 1)
+redis.call('HINCRBYFLOAT', KEYS[2], 'sum', amount)
+redis.call('HINCRBY', KEYS[2], 'type:' .. ARGV[4], 1)
+redis.call('HSET', KEYS[2], 'last_transaction_time', ARGV[8])
+redis.call('EXPIRE', KEYS[2], ttl)
+
+local reference_bucket = math.floor(timestamp_ms / bucket_ms)
+local bucket_field = string.format('%d', reference_bucket)
+redis.call('HINCRBY', KEYS[3], 'c:' .. bucket_field, 1)
+redis.call('HINCRBYFLOAT', KEYS[3], 's:' .. bucket_field, amount)
+redis.call('EXPIRE', KEYS[3], ttl)
+
+local spans = {}
+local horizon = 0
+for i = 9, #ARGV do
+    local span = tonumber(ARGV[i])
+    spans[#spans + 1] = span
+    if span > horizon then
+        horizon = span
+    end
+end
+
+local counts = {}
+local sums = {}
+for i = 1, #spans do
+    counts[i] = 0
+    sums[i] = 0
+end
+
+local stale = {}
+local fields = redis.call('HGETALL', KEYS[3])
+for i = 1, #fields, 2 do
+    local kind = string.sub(fields[i], 1, 1)
+    local bucket = tonumber(string.sub(fields[i], 3))
+    local value = tonumber(fields[i + 1])
+    local age = reference_bucket - bucket
+    if age >= horizon then
+        stale[#stale + 1] = fields[i]
+    elseif age >= 0 then
+        for j = 1, #spans do
+            if age < spans[j] then
+                if kind == 'c' then
+                    counts[j] = counts[j] + value
+                else
+                    sums[j] = sums[j] + value
+                end
+            end
+        end
+    end
+end
+
+if #stale > 0 then
+    redis.call('HDEL', KEYS[3], unpack(stale))
+end
+
+local windows = {}
+for j = 1, #spans do
+    windows[#windows + 1] = counts[j]
+    windows[#windows + 1] = string.format('%.17g', sums[j])
+end
+
+return {redis.call('HGETALL', KEYS[2]), windows}
+"""
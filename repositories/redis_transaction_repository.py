@@ -1,16 +1,36 @@
 """
 Redis реализация репозитория транзакций
 """
+import asyncio
 import json
+import time
 from typing import List, Dict, Optional
+import numpy as np
 import redis.asyncio as redis
+from redis.exceptions import NoScriptError, WatchError
+from models.history import TransactionRecord
 from models.transaction import Transaction
 from repositories.transaction_repository import TransactionRepository
+from repositories.redis_scripts import INGEST_SCRIPT
+from repositories.codecs import TransactionCodec, get_codec
+from repositories.packed_history import pack_record, unpack_records
+from monitoring.metrics import HISTORY_LENGTH, observe_redis
 from config.settings import settings
+from utils.time_windows import (
+    parse_timestamp_ms,
+    bucket_of,
+    summarize_windows,
+    stale_buckets,
+    window_bucket_count,
+)
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+_HISTORY_LENGTH_HISTORY = HISTORY_LENGTH.labels(source="history")
+_HISTORY_LENGTH_PACKED = HISTORY_LENGTH.labels(source="packed")
+_HISTORY_LENGTH_AGGREGATES = HISTORY_LENGTH.labels(source="aggregates")
+
 
 class RedisTransactionRepository(TransactionRepository):
     """Реализация репозитория транзакций с использованием Redis"""
@@ -20,121 +40,566 @@ class RedisTransactionRepository(TransactionRepository):
         host: str = None,
         port: int = None,
         db: int = None,
-        password: str = None
+        password: str = None,
+        statistics_mode: str = None,
+        history_storage: str = None,
+        ingest_mode: str = None,
+        codec: Optional[TransactionCodec] = None,
+        client: Optional[redis.Redis] = None
     ):
         self._host = host or settings.REDIS_HOST
         self._port = port or settings.REDIS_PORT
         self._db = db or settings.REDIS_DB
         self._password = password or settings.REDIS_PASSWORD
+        self._statistics_mode = statistics_mode or settings.STATISTICS_MODE
+        self._history_storage = history_storage or settings.HISTORY_STORAGE
+        self._ingest_mode = ingest_mode or settings.INGEST_MODE
+        self._ingest_sha: Optional[str] = None
+        self._codec = codec or get_codec()
         self._pool: Optional[redis.ConnectionPool] = None
-        self._client: Optional[redis.Redis] = None
+        self._client: Optional[redis.Redis] = client
 
-    async def _get_client(self) -> redis.Redis:
-        """Получение или создание клиента Redis с пулом соединений"""
+    @property
+    def client(self) -> redis.Redis:
+        """Клиент Redis репозитория (создается при первом обращении)"""
         if self._client is None:
-            self._pool = redis.ConnectionPool(
-                host=self._host,
-                port=self._port,
-                db=self._db,
-                password=self._password,
-                max_connections=50,
-                decode_responses=True
-            )
-            self._client = redis.Redis(connection_pool=self._pool)
+            self._create_client()
         return self._client
 
+    async def _get_client(self) -> redis.Redis:
+        """Получение или создание клиента Redis с пулом соединений"""
+        return self.client
+
+    def _create_client(self) -> None:
+        """Создание клиента Redis с пулом соединений"""
+        self._pool = redis.ConnectionPool(
+            host=self._host,
+            port=self._port,
+            db=self._db,
+            password=self._password,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            # Записи истории хранятся в бинарном формате, строки декодируются явно
+            decode_responses=False
+        )
+        self._client = redis.Redis(connection_pool=self._pool)
+
     def _transaction_key(self, customer_id: str) -> str:
         """Ключ для хранения транзакций клиента"""
         return f"transactions:{customer_id}"
 
+    def _history_key(self, customer_id: str) -> str:
+        """Ключ sorted set истории клиента (score - время транзакции в мс)"""
+        return f"history:{customer_id}"
+
+    def _packed_key(self, customer_id: str) -> str:
+        """Ключ упакованной числовой истории клиента"""
+        return f"packed:{customer_id}"
+
     def _stats_key(self, customer_id: str) -> str:
         """Ключ для хранения статистики клиента"""
         return f"stats:{customer_id}"
 
+    def _aggregates_key(self, customer_id: str) -> str:
+        """Ключ для хранения инкрементальных агрегатов клиента"""
+        return f"aggregates:{customer_id}"
+
+    def _windows_key(self, customer_id: str) -> str:
+        """Ключ для хранения временных бакетов клиента"""
+        return f"windows:{customer_id}"
+
+    @staticmethod
+    def _empty_statistics() -> Dict:
+        """Статистика по умолчанию для клиента без истории"""
+        return {
+            "total_transactions": 0,
+            "total_amount": 0.0,
+            "avg_amount": 0.0,
+            "transaction_count_by_type": {},
+            "last_transaction_time": None
+        }
+
     async def add_transaction(self, transaction: Transaction) -> None:
         """Добавить транзакцию в кэш"""
         client = await self._get_client()
-        key = self._transaction_key(transaction.customer_id)
         
-        transaction_dict = transaction.model_dump()
-        transaction_json = json.dumps(transaction_dict)
-        
-        # Добавляем в список транзакций с TTL
-        await client.rpush(key, transaction_json)
-        await client.expire(key, settings.CACHE_TTL)
+        payload = self._codec.encode(transaction)
+
+        # Запись истории и обновление агрегатов одной транзакцией MULTI/EXEC
+        async with client.pipeline(transaction=True) as pipe:
+            self._queue_history_write(pipe, transaction, payload)
+            if self._statistics_mode == "incremental":
+                self._queue_aggregates_update(pipe, transaction)
+            elif self._statistics_mode == "packed":
+                packed_key = self._packed_key(transaction.customer_id)
+                pipe.append(packed_key, pack_record(transaction))
+                pipe.expire(packed_key, settings.CACHE_TTL)
+            await observe_redis("multi_write", pipe.execute())
         
-        logger.info(
-            f"Транзакция {transaction.transaction_id} добавлена в кэш "
-            f"для клиента {transaction.customer_id}"
+        logger.debug(
+            "Транзакция {} добавлена в кэш для клиента {}",
+            transaction.transaction_id, transaction.customer_id
         )
 
-    async def get_transactions_by_customer(self, customer_id: str) -> List[Transaction]:
-        """Получить все транзакции по customer_id"""
+    async def ingest_transaction(self, transaction: Transaction) -> Dict:
+        """
+        Добавить транзакцию и вернуть статистику клиента
+
+        Режимы (settings.INGEST_MODE):
+            script - один атомарный Lua скрипт, один round trip
+            pipeline - запись и чтение одним MULTI/EXEC, для окружений без Lua
+            sequential - отдельные вызовы записи, агрегатов и окон
+        """
+        if self._ingest_mode == "script":
+            stats = await self._ingest_with_script(transaction)
+        elif self._ingest_mode == "pipeline":
+            stats = await self._ingest_with_pipeline(transaction)
+        else:
+            await self.add_transaction(transaction)
+            stats = await self.get_statistics_by_customer(transaction.customer_id)
+            stats.update(
+                await self.get_window_statistics(
+                    transaction.customer_id,
+                    parse_timestamp_ms(transaction.timestamp)
+                )
+            )
+            return stats
+
+        _HISTORY_LENGTH_AGGREGATES.observe(stats["total_transactions"])
+        logger.debug(
+            "Транзакция {} добавлена в кэш для клиента {}",
+            transaction.transaction_id, transaction.customer_id
+        )
+        return stats
+
+    async def _ingest_with_script(self, transaction: Transaction) -> Dict:
+        """
+        Запись транзакции Lua скриптом
+
+        Запись истории, обрезка старых записей, обновление агрегатов и расчет
+        окон выполняются атомарно за один round trip к Redis.
+        """
         client = await self._get_client()
-        key = self._transaction_key(customer_id)
-        
-        transactions_json = await client.lrange(key, 0, -1)
+        customer_id = transaction.customer_id
+        history_key = (
+            self._history_key(customer_id)
+            if self._history_storage == "zset"
+            else self._transaction_key(customer_id)
+        )
+        keys = [history_key, self._aggregates_key(customer_id), self._windows_key(customer_id)]
+        args = [
+            self._codec.encode(transaction),
+            parse_timestamp_ms(transaction.timestamp),
+            repr(transaction.amount),
+            transaction.type,
+            settings.CACHE_TTL,
+            settings.WINDOW_BUCKET_SECONDS * 1000,
+            self._history_storage,
+            transaction.timestamp,
+            *(window_bucket_count(hours) for hours in settings.STATISTICS_WINDOWS_HOURS),
+        ]
+
+        sha = await self._load_ingest_script(client)
+        try:
+            aggregates, windows = await observe_redis("evalsha", client.evalsha(sha, len(keys), *keys, *args))
+        except NoScriptError:
+            # Кэш скриптов Redis был сброшен (рестарт, SCRIPT FLUSH) - загружаем заново
+            self._ingest_sha = None
+            sha = await self._load_ingest_script(client)
+            aggregates, windows = await observe_redis("evalsha", client.evalsha(sha, len(keys), *keys, *args))
+
+        stats = self._parse_aggregates(dict(zip(aggregates[::2], aggregates[1::2])))
+        for index, hours in enumerate(settings.STATISTICS_WINDOWS_HOURS):
+            count = int(windows[2 * index])
+            total = float(windows[2 * index + 1])
+            stats[f"transaction_count_{hours}h"] = count
+            stats[f"total_amount_{hours}h"] = total
+            stats[f"avg_amount_{hours}h"] = total / count if count > 0 else 0.0
+
+        return stats
+
+    async def _ingest_with_pipeline(self, transaction: Transaction) -> Dict:
+        """
+        Запись транзакции одним MULTI/EXEC без Lua
+
+        Запись истории, агрегатов и бакетов, а также чтение агрегатов и бакетов
+        уходят в Redis одним pipeline. Второй round trip нужен только для
+        удаления устаревших бакетов.
+        """
+        client = await self._get_client()
+        customer_id = transaction.customer_id
+        windows_key = self._windows_key(customer_id)
+        payload = self._codec.encode(transaction)
+
+        async with client.pipeline(transaction=True) as pipe:
+            self._queue_history_write(pipe, transaction, payload)
+            self._queue_aggregates_update(pipe, transaction)
+            pipe.hgetall(self._aggregates_key(customer_id))
+            pipe.hgetall(windows_key)
+            results = await observe_redis("multi_ingest", pipe.execute())
+
+        stats = self._parse_aggregates(results[-2])
+        buckets = self._parse_buckets(results[-1])
+        reference_bucket = bucket_of(parse_timestamp_ms(transaction.timestamp))
+        await self._drop_stale_buckets(client, windows_key, buckets, reference_bucket)
+        stats.update(summarize_windows(buckets, reference_bucket))
+
+        return stats
+
+    async def ingest_batch(self, transactions: List[Transaction]) -> List[Dict]:
+        """
+        Добавить пакет транзакций одним MULTI/EXEC
+
+        Операции группируются по клиентам: для каждого клиента агрегаты и бакеты
+        читаются один раз до записи, затем ставятся в очередь все его записи.
+        Статистика на момент каждой транзакции досчитывается локально в порядке
+        пакета, поэтому результат совпадает с последовательной обработкой.
+        """
+        if not transactions:
+            return []
+
+        client = await self._get_client()
+
+        by_customer: Dict[str, List[int]] = {}
+        for index, transaction in enumerate(transactions):
+            by_customer.setdefault(transaction.customer_id, []).append(index)
+
+        async with client.pipeline(transaction=True) as pipe:
+            for customer_id in by_customer:
+                pipe.hgetall(self._aggregates_key(customer_id))
+                pipe.hgetall(self._windows_key(customer_id))
+            for indexes in by_customer.values():
+                for index in indexes:
+                    transaction = transactions[index]
+                    self._queue_history_write(pipe, transaction, self._codec.encode(transaction))
+                    self._queue_aggregates_update(pipe, transaction)
+            results = await observe_redis("multi_ingest_batch", pipe.execute())
+
+        snapshots: List[Optional[Dict]] = [None] * len(transactions)
+        for position, (customer_id, indexes) in enumerate(by_customer.items()):
+            stats = self._parse_aggregates(results[2 * position])
+            buckets = self._parse_buckets(results[2 * position + 1])
+
+            # Устаревшие бакеты отсчитываются от самой новой транзакции клиента,
+            # а не от последней по порядку в пакете
+            newest_bucket = None
+            for index in indexes:
+                transaction = transactions[index]
+                self._apply_to_statistics(stats, buckets, transaction)
+                reference_bucket = bucket_of(parse_timestamp_ms(transaction.timestamp))
+                if newest_bucket is None or reference_bucket > newest_bucket:
+                    newest_bucket = reference_bucket
+                snapshot = dict(stats)
+                snapshot["transaction_count_by_type"] = dict(stats["transaction_count_by_type"])
+                snapshot.update(summarize_windows(buckets, reference_bucket))
+                snapshots[index] = snapshot
+
+            await self._drop_stale_buckets(
+                client, self._windows_key(customer_id), buckets, newest_bucket
+            )
+
+        logger.debug(
+            "Пакет из {} транзакций добавлен в кэш для {} клиентов",
+            len(transactions), len(by_customer)
+        )
+        return snapshots
+
+    @staticmethod
+    def _apply_to_statistics(stats: Dict, buckets: Dict[int, tuple], transaction: Transaction) -> None:
+        """Учесть транзакцию в прочитанных агрегатах и бакетах (как это делает запись в Redis)"""
+        stats["total_transactions"] += 1
+        stats["total_amount"] += transaction.amount
+        stats["avg_amount"] = stats["total_amount"] / stats["total_transactions"]
+        type_counts = stats["transaction_count_by_type"]
+        type_counts[transaction.type] = type_counts.get(transaction.type, 0) + 1
+        stats["last_transaction_time"] = transaction.timestamp
+
+        bucket = bucket_of(parse_timestamp_ms(transaction.timestamp))
+        count, total = buckets.get(bucket, (0, 0.0))
+        buckets[bucket] = (count + 1, total + transaction.amount)
+
+    async def warm_up(self, connections: int = None) -> None:
+        """
+        Открыть соединения пула заранее, до первых запросов
+
+        Конкурентные PING занимают столько соединений одновременно,
+        сколько нужно открыть; после ответа соединения остаются в пуле.
+
+        Args:
+            connections: Количество соединений (по умолчанию REDIS_WARM_CONNECTIONS)
+        """
+        client = await self._get_client()
+        connections = connections or settings.REDIS_WARM_CONNECTIONS
+        await asyncio.gather(*(client.ping() for _ in range(connections)))
+        logger.info(f"Пул Redis прогрет: {connections} соединений")
+
+    async def load_scripts(self) -> None:
+        """Загрузить Lua скрипты в Redis (SCRIPT LOAD) заранее, до первых запросов"""
+        client = await self._get_client()
+        self._ingest_sha = None
+        await self._load_ingest_script(client)
+
+    async def _load_ingest_script(self, client: redis.Redis) -> str:
+        """Получить SHA скрипта записи, загрузив его при первом обращении"""
+        if self._ingest_sha is None:
+            self._ingest_sha = await observe_redis("script_load", client.script_load(INGEST_SCRIPT))
+        return self._ingest_sha
+
+    def _queue_history_write(
+        self,
+        pipe: redis.client.Pipeline,
+        transaction: Transaction,
+        payload: bytes
+    ) -> None:
+        """
+        Добавить в pipeline запись транзакции в историю клиента
+
+        Для sorted set записи старше CACHE_TTL обрезаются. Горизонт хранения
+        отсчитывается от времени самой транзакции, поэтому размер истории
+        активного клиента ограничен окном CACHE_TTL.
+        """
+        if self._history_storage == "zset":
+            key = self._history_key(transaction.customer_id)
+            timestamp_ms = parse_timestamp_ms(transaction.timestamp)
+            horizon_ms = timestamp_ms - settings.CACHE_TTL * 1000
+
+            pipe.zadd(key, {payload: timestamp_ms})
+            pipe.zremrangebyscore(key, "-inf", f"({horizon_ms}")
+        else:
+            # Добавляем в список транзакций с TTL
+            key = self._transaction_key(transaction.customer_id)
+            pipe.rpush(key, payload)
+
+        pipe.expire(key, settings.CACHE_TTL)
+
+    def _queue_aggregates_update(self, pipe: redis.client.Pipeline, transaction: Transaction) -> None:
+        """
+        Добавить в pipeline обновление агрегатов клиента (количество, сумма, счетчики по типам)
+
+        Стоимость обновления O(1) и не зависит от длины истории клиента.
+        Вместе с агрегатами обновляется временной бакет транзакции.
+        """
+        key = self._aggregates_key(transaction.customer_id)
+        windows_key = self._windows_key(transaction.customer_id)
+        bucket = bucket_of(parse_timestamp_ms(transaction.timestamp))
+
+        pipe.hincrby(key, "count", 1)
+        pipe.hincrbyfloat(key, "sum", transaction.amount)
+        pipe.hincrby(key, f"type:{transaction.type}", 1)
+        pipe.hset(key, "last_transaction_time", transaction.timestamp)
+        pipe.expire(key, settings.CACHE_TTL)
+        pipe.hincrby(windows_key, f"c:{bucket}", 1)
+        pipe.hincrbyfloat(windows_key, f"s:{bucket}", transaction.amount)
+        pipe.expire(windows_key, settings.CACHE_TTL)
+
+    @staticmethod
+    def _decode_hash(raw: Dict) -> Dict[str, str]:
+        """Декодировать поля и значения hash, полученного без decode_responses"""
+        return {
+            (field.decode() if isinstance(field, bytes) else field):
+            (value.decode() if isinstance(value, bytes) else value)
+            for field, value in raw.items()
+        }
+
+    def _parse_buckets(self, raw: Dict) -> Dict[int, tuple]:
+        """Преобразовать hash временных бакетов в словарь {бакет: (количество, сумма)}"""
+        buckets = {}
+        for field, value in self._decode_hash(raw).items():
+            kind, bucket = field.split(":", 1)
+            count, total = buckets.get(int(bucket), (0, 0.0))
+            if kind == "c":
+                count = int(value)
+            else:
+                total = float(value)
+            buckets[int(bucket)] = (count, total)
+        return buckets
+
+    async def _drop_stale_buckets(
+        self,
+        client: redis.Redis,
+        key: str,
+        buckets: Dict[int, tuple],
+        reference_bucket: int
+    ) -> None:
+        """Удалить бакеты старше самого длинного окна"""
+        expired = stale_buckets(buckets, reference_bucket)
+        if expired:
+            fields = [f"{kind}:{bucket}" for bucket in expired for kind in ("c", "s")]
+            await observe_redis("hdel", client.hdel(key, *fields))
+
+    def _parse_aggregates(self, raw: Dict) -> Dict:
+        """Преобразовать hash агрегатов Redis в словарь статистики"""
+        if not raw:
+            return self._empty_statistics()
+
+        raw = self._decode_hash(raw)
+
+        total_count = int(raw.get("count", 0))
+        total_amount = float(raw.get("sum", 0.0))
+        type_counts = {
+            int(field.split(":", 1)[1]): int(value)
+            for field, value in raw.items()
+            if field.startswith("type:")
+        }
+
+        return {
+            "total_transactions": total_count,
+            "total_amount": total_amount,
+            "avg_amount": total_amount / total_count if total_count > 0 else 0.0,
+            "transaction_count_by_type": type_counts,
+            "last_transaction_time": raw.get("last_transaction_time")
+        }
+
+    async def get_transactions_by_customer(
+        self,
+        customer_id: str,
+        since_ms: Optional[int] = None
+    ) -> List[TransactionRecord]:
+        """Получить транзакции по customer_id (начиная с since_ms, если указан)"""
+        client = await self._get_client()
+
+        if self._history_storage == "zset":
+            # Читается только нужный диапазон времени, а не вся история
+            key = self._history_key(customer_id)
+            min_score = since_ms if since_ms is not None else "-inf"
+            payloads = await observe_redis("zrangebyscore", client.zrangebyscore(key, min_score, "+inf"))
+        else:
+            key = self._transaction_key(customer_id)
+            payloads = await observe_redis("lrange", client.lrange(key, 0, -1))
         
-        transactions = []
-        for txn_json in transactions_json:
-            txn_dict = json.loads(txn_json)
-            transactions.append(Transaction(**txn_dict))
+        transactions = [self._codec.decode(payload, customer_id) for payload in payloads]
+
+        if since_ms is not None and self._history_storage != "zset":
+            transactions = [
+                txn for txn in transactions
+                if txn.timestamp_ms >= since_ms
+            ]
         
-        logger.info(
-            f"Получено {len(transactions)} транзакций для клиента {customer_id}"
-        )
+        _HISTORY_LENGTH_HISTORY.observe(len(transactions))
+        logger.debug("Получено {} транзакций для клиента {}", len(transactions), customer_id)
         return transactions
 
+    async def get_packed_history(self, customer_id: str) -> np.ndarray:
+        """
+        Получить упакованную историю клиента одним GET
+
+        Результат - представление numpy над полученными байтами, без создания
+        объекта на каждую транзакцию. Если устаревших записей накопилось больше
+        PACKED_COMPACTION_RATIO, ключ перезаписывается без них.
+        """
+        client = await self._get_client()
+        key = self._packed_key(customer_id)
+
+        records = unpack_records(await observe_redis("get", client.get(key)))
+        _HISTORY_LENGTH_PACKED.observe(len(records))
+        if len(records) == 0:
+            return records
+
+        horizon_ms = int(records["timestamp_ms"].max()) - settings.CACHE_TTL * 1000
+        expired = int(np.count_nonzero(records["timestamp_ms"] < horizon_ms))
+        if expired > len(records) * settings.PACKED_COMPACTION_RATIO:
+            await self._compact_packed_history(client, key, horizon_ms)
+            return records[records["timestamp_ms"] >= horizon_ms]
+
+        return records
+
+    async def _compact_packed_history(self, client: redis.Redis, key: str, horizon_ms: int) -> None:
+        """
+        Перезаписать упакованную историю без записей старше horizon_ms
+
+        Используется WATCH: если между чтением и записью клиент дописал
+        транзакцию, компактизация пропускается до следующего чтения.
+        """
+        async with client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                records = unpack_records(await pipe.get(key))
+                kept = records[records["timestamp_ms"] >= horizon_ms]
+                pipe.multi()
+                pipe.set(key, kept.tobytes(), ex=settings.CACHE_TTL)
+                await observe_redis("multi_compact", pipe.execute())
+            except WatchError:
+                logger.debug("Компактизация {} пропущена из-за конкурентной записи", key)
+
     async def get_statistics_by_customer(self, customer_id: str) -> Dict:
         """Получить статистику по customer_id"""
         client = await self._get_client()
+
+        if self._statistics_mode == "incremental":
+            raw = await observe_redis("hgetall", client.hgetall(self._aggregates_key(customer_id)))
+            return self._parse_aggregates(raw)
+
         key = self._stats_key(customer_id)
         
-        stats_json = await client.get(key)
+        stats_json = await observe_redis("get", client.get(key))
         
         if stats_json:
             return json.loads(stats_json)
         
         # Возвращаем статистику по умолчанию
-        return {
-            "total_transactions": 0,
-            "total_amount": 0.0,
-            "avg_amount": 0.0,
-            "transaction_count_by_type": {},
-            "last_transaction_time": None
-        }
+        return self._empty_statistics()
+
+    async def get_window_statistics(self, customer_id: str, reference_ms: int) -> Dict:
+        """
+        Получить статистику по скользящим окнам
+
+        Читает только бакеты клиента (не более 24h / WINDOW_BUCKET_SECONDS),
+        бакеты старше самого длинного окна удаляются.
+        """
+        client = await self._get_client()
+        key = self._windows_key(customer_id)
+
+        buckets = self._parse_buckets(await observe_redis("hgetall", client.hgetall(key)))
+        reference_bucket = bucket_of(reference_ms)
+        await self._drop_stale_buckets(client, key, buckets, reference_bucket)
+
+        return summarize_windows(buckets, reference_bucket)
 
     async def update_statistics(self, customer_id: str, stats: Dict) -> None:
         """Обновить статистику по customer_id"""
         client = await self._get_client()
         key = self._stats_key(customer_id)
         
-        await client.set(
+        await observe_redis("set", client.set(
             key,
             json.dumps(stats),
             ex=settings.CACHE_TTL
-        )
+        ))
         
-        logger.info(f"Статистика обновлена для клиента {customer_id}")
+        logger.debug("Статистика обновлена для клиента {}", customer_id)
 
-    async def get_cached_transaction(self, customer_id: str) -> Optional[Transaction]:
+    async def get_cached_transaction(self, customer_id: str) -> Optional[TransactionRecord]:
         """Получить последнюю транзакцию по customer_id из кэша"""
         client = await self._get_client()
-        key = self._transaction_key(customer_id)
-        
-        last_txn_json = await client.lindex(key, -1)
+
+        if self._history_storage == "zset":
+            last = await observe_redis("zrange", client.zrange(self._history_key(customer_id), -1, -1))
+            payload = last[0] if last else None
+        else:
+            key = self._transaction_key(customer_id)
+            payload = await observe_redis("lindex", client.lindex(key, -1))
         
-        if last_txn_json:
-            txn_dict = json.loads(last_txn_json)
-            return Transaction(**txn_dict)
+        if payload:
+            return self._codec.decode(payload, customer_id)
         
         return None
 
     async def delete_expired_transactions(self) -> None:
         """Удалить истекшие транзакции из кэша"""
-        # Redis автоматически удаляет ключи по TTL
-        # Этот метод можно использовать для ручной очистки при необходимости
-        logger.info("Проверка истекших транзакций (автоматически управляется Redis TTL)")
+        if self._history_storage != "zset":
+            # Redis автоматически удаляет ключи по TTL
+            # Этот метод можно использовать для ручной очистки при необходимости
+            logger.info("Проверка истекших транзакций (автоматически управляется Redis TTL)")
+            return
+
+        client = await self._get_client()
+        horizon_ms = int(time.time() * 1000) - settings.CACHE_TTL * 1000
+        removed = 0
+
+        # Обрезаем истории клиентов, которые давно не присылали транзакций
+        async for key in client.scan_iter(match=self._history_key("*"), count=500):
+            removed += await client.zremrangebyscore(key, "-inf", f"({horizon_ms}")
+
+        logger.info(f"Удалено {removed} истекших транзакций из истории")
 
     async def close(self) -> None:
         """Закрыть соединение с Redis"""
@@ -3,6 +3,8 @@
 """
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
+import numpy as np
+from models.history import TransactionRecord
 from models.transaction import Transaction
 
 class TransactionRepository(ABC):
@@ -22,15 +24,71 @@ class TransactionRepository(ABC):
         ...
 
     @abstractmethod
-    async def get_transactions_by_customer(self, customer_id: str) -> List[Transaction]:
+    async def ingest_transaction(self, transaction: Transaction) -> Dict:
         """
-        Получить все транзакции по customer_id
+        Добавить транзакцию и вернуть актуальную статистику клиента
+
+        Статистика включает инкрементальные агрегаты и окна 3h/6h/12h/24h,
+        рассчитанные на момент транзакции.
+
+        Args:
+            transaction: Транзакция для добавления
+
+        Returns:
+            Словарь со статистикой
+
+        Raises:
+            NotImplementedError: Если метод не реализован
+        """
+        ...
+
+    @abstractmethod
+    async def ingest_batch(self, transactions: List[Transaction]) -> List[Dict]:
+        """
+        Добавить пакет транзакций и вернуть статистику клиента на момент каждой из них
+
+        Args:
+            transactions: Транзакции для добавления
+
+        Returns:
+            Статистика в том же порядке, что и транзакции
+
+        Raises:
+            NotImplementedError: Если метод не реализован
+        """
+        ...
+
+    @abstractmethod
+    async def get_transactions_by_customer(
+        self,
+        customer_id: str,
+        since_ms: Optional[int] = None
+    ) -> List[TransactionRecord]:
+        """
+        Получить транзакции по customer_id
+
+        Args:
+            customer_id: ID клиента
+            since_ms: Вернуть только транзакции не старше этого момента (epoch ms)
+
+        Returns:
+            Список записей истории (без повторной валидации)
+
+        Raises:
+            NotImplementedError: Если метод не реализован
+        """
+        ...
+
+    @abstractmethod
+    async def get_packed_history(self, customer_id: str) -> np.ndarray:
+        """
+        Получить упакованную числовую историю клиента (время, сумма, тип)
 
         Args:
             customer_id: ID клиента
 
         Returns:
-            Список транзакций
+            Структурированный массив с полями timestamp_ms, amount, type
 
         Raises:
             NotImplementedError: Если метод не реализован
@@ -53,6 +111,38 @@ class TransactionRepository(ABC):
         """
         ...
 
+    @abstractmethod
+    async def get_window_statistics(self, customer_id: str, reference_ms: int) -> Dict:
+        """
+        Получить статистику по скользящим окнам (3h/6h/12h/24h)
+
+        Args:
+            customer_id: ID клиента
+            reference_ms: Момент времени (epoch ms), которым заканчиваются окна
+
+        Returns:
+            Словарь с ключами transaction_count_{N}h, total_amount_{N}h, avg_amount_{N}h
+
+        Raises:
+            NotImplementedError: Если метод не реализован
+        """
+        ...
+
+    def get_cached_statistics(self, customer_id: str) -> Optional[Dict]:
+        """
+        Получить статистику клиента из локального кэша без обращения к Redis
+
+        Используется как fallback, когда этап статистики не уложился в бюджет
+        времени. Реализация по умолчанию кэша не имеет.
+
+        Args:
+            customer_id: ID клиента
+
+        Returns:
+            Копия статистики или None
+        """
+        return None
+
     @abstractmethod
     async def update_statistics(self, customer_id: str, stats: Dict) -> None:
         """
@@ -68,7 +158,7 @@ class TransactionRepository(ABC):
         ...
 
     @abstractmethod
-    async def get_cached_transaction(self, customer_id: str) -> Optional[Transaction]:
+    async def get_cached_transaction(self, customer_id: str) -> Optional[TransactionRecord]:
         """
         Получить транзакцию по customer_id из кэша
 
@@ -76,7 +166,7 @@ class TransactionRepository(ABC):
             customer_id: ID клиента
 
         Returns:
-            Транзакция или None
+            Запись истории или None
 
         Raises:
             NotImplementedError: Если метод не реализован
@@ -0,0 +1,121 @@
+"""
+Микро-пакетная оценка транзакций
+
+Конкурентные вызовы score_transaction собираются в пакет, пока в нем не
+наберется max_batch_size транзакций или не пройдет max_wait_ms с момента
+первой транзакции. Пакет оценивается одним вызовом score_batch нижележащего
+сервиса, и каждый ожидающий вызов получает свой результат.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from models.transaction import Transaction
+from models.scoring import ModelScore
+from services.scoring_service import ScoringService
+from monitoring.metrics import SCORING_BATCH_SIZE, SCORING_BATCH_WAIT
+from config.settings import settings
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class MicroBatchingScoringService(ScoringService):
+    """Сервис оценки, группирующий конкурентные запросы в пакеты"""
+
+    def __init__(
+        self,
+        scoring_service: ScoringService,
+        max_batch_size: int = None,
+        max_wait_ms: float = None
+    ):
+        self._scoring_service = scoring_service
+        self._max_batch_size = max_batch_size or settings.SCORING_BATCH_MAX_SIZE
+        self._max_wait_ms = max_wait_ms if max_wait_ms is not None else settings.SCORING_BATCH_MAX_WAIT_MS
+        self._pending: List[Tuple[Transaction, Optional[Dict], asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    @property
+    def uses_customer_statistics(self) -> bool:
+        return self._scoring_service.uses_customer_statistics
+
+    async def score_transaction(
+        self,
+        transaction: Transaction,
+        customer_stats: Optional[Dict] = None
+    ) -> ModelScore:
+        """
+        Поставить транзакцию в текущий пакет и дождаться ее результата
+
+        Args:
+            transaction: Транзакция для оценки
+            customer_stats: Статистика клиента для признаков модели
+
+        Returns:
+            Оценка модели и флаг мошенничества
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((transaction, customer_stats, future, time.perf_counter()))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    async def score_batch(
+        self,
+        transactions: List[Transaction],
+        customer_stats: Optional[List[Optional[Dict]]] = None
+    ) -> List[ModelScore]:
+        """Готовый пакет оценивается сразу, без ожидания"""
+        SCORING_BATCH_SIZE.observe(len(transactions))
+        return await self._scoring_service.score_batch(transactions, customer_stats)
+
+    def _flush(self) -> None:
+        """Отправить накопленный пакет в модель"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run_batch(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Transaction, Optional[Dict], asyncio.Future, float]]) -> None:
+        """Оценить пакет и раздать результаты ожидающим вызовам"""
+        started = time.perf_counter()
+        for _, _, _, enqueued_at in batch:
+            SCORING_BATCH_WAIT.observe(started - enqueued_at)
+        SCORING_BATCH_SIZE.observe(len(batch))
+
+        try:
+            results = await self._scoring_service.score_batch(
+                [transaction for transaction, _, _, _ in batch],
+                [stats for _, stats, _, _ in batch]
+            )
+        except Exception as e:
+            logger.error(f"Ошибка пакетной оценки {len(batch)} транзакций: {str(e)}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future, _), result in zip(batch, results):
+            # Вызов мог быть отменен, пока пакет оценивался
+            if not future.done():
+                future.set_result(result)
+
+    async def _get_ml_model_score(self, transaction: Transaction, customer_stats: Optional[Dict] = None) -> float:
+        return await self._scoring_service._get_ml_model_score(transaction, customer_stats)
+
+    async def fallback_result(self, transaction: Transaction) -> ModelScore:
+        return await self._scoring_service.fallback_result(transaction)
+
+    async def _handle_model_timeout(self, transaction: Transaction) -> ModelScore:
+        return await self._scoring_service._handle_model_timeout(transaction)
@@ -0,0 +1,169 @@
+"""
+Сборка вектора признаков транзакции для ML модели
+
+Вектор фиксированной ширины (float32) состоит из числовых признаков
+транзакции, агрегатов клиента по окнам 3h/6h/12h/24h и one-hot кодировок
+категориальных полей. Для категориальных полей заранее построены таблицы
+"значение -> номер столбца", поэтому кодирование - один поиск в словаре
+и одна запись в массив. Значения вне словаря попадают в столбец "other".
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from models.transaction import Transaction
+from config.settings import settings
+
+FEATURE_DTYPE = np.float32
+
+# Словари категориальных полей (значения, которые встречаются в трафике)
+CURRENCIES = ("USD", "EUR", "RUB", "GBP", "JPY", "CAD", "AUD", "CHF")
+CHANNELS = ("online", "mobile", "pos", "atm")
+LOCATIONS = ("US-NY", "US-CA", "US-TX", "US-FL", "US-WA", "GB-LON", "DE-BER", "FR-PAR", "JP-TOK", "CN-BEI")
+TRANSACTION_TYPES = tuple(range(55, 91))
+CATEGORIES = ("ecommerce", "retail", "atm", "card", "mobile", "wire")
+
+# Числовые признаки транзакции в порядке столбцов
+_TRANSACTION_FEATURES = (
+    "amount",
+    "log_amount",
+    "is_velocity_alert",
+    "is_location_alert",
+    "is_device_alert",
+    "is_high_value",
+    "merchant_risk_score",
+    "card_risk_score",
+    "customer_risk_score",
+)
+
+
+class FeatureAssembler:
+    """Сборщик вектора признаков с предрасчитанной раскладкой столбцов"""
+
+    def __init__(self, windows_hours: Iterable[int] = None):
+        """
+        Args:
+            windows_hours: Окна статистики клиента (по умолчанию из настроек)
+        """
+        windows_hours = tuple(windows_hours or settings.STATISTICS_WINDOWS_HOURS)
+        names: List[str] = list(_TRANSACTION_FEATURES)
+
+        # Ключи статистики клиента; строки создаются один раз, а не на каждый запрос
+        self._window_keys: Tuple[Tuple[str, str], ...] = tuple(
+            (f"transaction_count_{hours}h", f"avg_amount_{hours}h") for hours in windows_hours
+        )
+        for hours in windows_hours:
+            names.extend((f"log_count_{hours}h", f"log_avg_amount_{hours}h"))
+        self._longest_avg_key = f"avg_amount_{max(windows_hours)}h"
+        names.append(f"amount_to_avg_{max(windows_hours)}h")
+
+        self._windows_offset = len(_TRANSACTION_FEATURES)
+        self._currency = self._lookup_table("currency", CURRENCIES, names)
+        self._channel = self._lookup_table("channel", CHANNELS, names)
+        self._location = self._lookup_table("location", LOCATIONS, names)
+        self._type = self._lookup_table("type", TRANSACTION_TYPES, names)
+        self._category = self._lookup_table("category", CATEGORIES, names)
+
+        self.feature_names: Tuple[str, ...] = tuple(names)
+        self.width = len(names)
+
+    @staticmethod
+    def _lookup_table(field: str, vocabulary: Sequence, names: List[str]) -> Tuple[Dict, int]:
+        """
+        Добавить столбцы one-hot кодировки поля и вернуть таблицу поиска
+
+        Returns:
+            (словарь значение -> номер столбца, номер столбца other)
+        """
+        table = {}
+        for value in vocabulary:
+            table[value] = len(names)
+            names.append(f"{field}={value}")
+        other = len(names)
+        names.append(f"{field}=other")
+        return table, other
+
+    def allocate(self, size: int) -> np.ndarray:
+        """Выделить матрицу признаков для пакета из size транзакций"""
+        return np.zeros((size, self.width), dtype=FEATURE_DTYPE)
+
+    def assemble(self, transaction: Transaction, customer_stats: Optional[Dict] = None) -> np.ndarray:
+        """
+        Собрать вектор признаков одной транзакции
+
+        Args:
+            transaction: Транзакция
+            customer_stats: Статистика клиента с окнами (None - нулевые агрегаты)
+
+        Returns:
+            Вектор float32 ширины self.width
+        """
+        row = np.zeros(self.width, dtype=FEATURE_DTYPE)
+        self._fill_row(row, transaction, customer_stats)
+        return row
+
+    def assemble_batch(
+        self,
+        transactions: Sequence[Transaction],
+        customer_stats: Optional[Sequence[Optional[Dict]]] = None,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Заполнить матрицу признаков пакета транзакций
+
+        Args:
+            transactions: Транзакции
+            customer_stats: Статистика клиента для каждой транзакции
+            out: Предвыделенная матрица (allocate) с не меньшим числом строк;
+                используются первые len(transactions) строк
+
+        Returns:
+            Заполненная часть матрицы формы (len(transactions), self.width)
+        """
+        size = len(transactions)
+        if out is None:
+            out = self.allocate(size)
+        elif out.shape[0] < size or out.shape[1] != self.width or out.dtype != FEATURE_DTYPE:
+            raise ValueError(f"Матрица {out.shape} {out.dtype} не подходит для {size} x {self.width}")
+
+        rows = out[:size]
+        rows.fill(0.0)
+        for index in range(size):
+            self._fill_row(
+                rows[index],
+                transactions[index],
+                customer_stats[index] if customer_stats is not None else None
+            )
+        return rows
+
+    def _fill_row(self, row: np.ndarray, transaction: Transaction, customer_stats: Optional[Dict]) -> None:
+        """Записать признаки транзакции в обнуленную строку"""
+        amount = transaction.amount
+        row[0] = amount
+        row[1] = math.log1p(max(amount, 0.0))
+        row[2] = 1.0 if transaction.is_velocity_alert else 0.0
+        row[3] = 1.0 if transaction.is_location_alert else 0.0
+        row[4] = 1.0 if transaction.is_device_alert else 0.0
+        row[5] = 1.0 if transaction.is_high_value else 0.0
+        row[6] = transaction.merchant_risk_score or 0.0
+        row[7] = transaction.card_risk_score or 0.0
+        row[8] = transaction.customer_risk_score or 0.0
+
+        if customer_stats:
+            column = self._windows_offset
+            for count_key, avg_key in self._window_keys:
+                row[column] = math.log1p(customer_stats.get(count_key, 0))
+                row[column + 1] = math.log1p(customer_stats.get(avg_key, 0.0))
+                column += 2
+            longest_avg = customer_stats.get(self._longest_avg_key, 0.0)
+            row[column] = amount / longest_avg if longest_avg > 0 else 0.0
+
+        table, other = self._currency
+        row[table.get(transaction.currency, other)] = 1.0
+        table, other = self._channel
+        row[table.get(transaction.channel, other)] = 1.0
+        table, other = self._location
+        row[table.get(transaction.location, other)] = 1.0
+        table, other = self._type
+        row[table.get(transaction.type, other)] = 1.0
+        table, other = self._category
+        row[table.get(transaction.transaction_category, other)] = 1.0
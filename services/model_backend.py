@@ -0,0 +1,256 @@
+"""
+Бэкенды ML модели для оценки транзакций
+
+Модель загружается из сериализованного артефакта (.npz с весами
+логистической регрессии) и выполняется в пуле рабочих процессов, чтобы
+вычисления модели никогда не блокировали event loop. Матрица признаков
+пакета и массив оценок передаются между процессами через
+multiprocessing.shared_memory: по каналу пула уходят только имена
+сегментов и размерности.
+"""
+import asyncio
+import multiprocessing
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from models.transaction import Transaction
+from services.feature_assembler import FEATURE_DTYPE, FeatureAssembler
+from config.settings import settings
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Признаки модели в порядке столбцов; сохраняются в артефакте
+# и сверяются при загрузке
+_feature_assembler = FeatureAssembler()
+MODEL_FEATURES = _feature_assembler.feature_names
+
+SCORE_DTYPE = np.float64
+
+
+def build_model_features(
+    transactions: Sequence[Transaction],
+    customer_stats: Optional[Sequence[Optional[Dict]]] = None
+) -> np.ndarray:
+    """
+    Собрать матрицу признаков модели для пакета транзакций
+
+    Args:
+        transactions: Транзакции для оценки
+        customer_stats: Статистика клиента для каждой транзакции
+
+    Returns:
+        Массив float32 формы (len(transactions), len(MODEL_FEATURES))
+    """
+    return _feature_assembler.assemble_batch(transactions, customer_stats)
+
+
+class LogisticModel:
+    """Логистическая регрессия, загружаемая из артефакта .npz"""
+
+    def __init__(self, weights: np.ndarray, bias: float):
+        self.weights = np.asarray(weights, dtype=SCORE_DTYPE)
+        self.bias = float(bias)
+
+    @classmethod
+    def load(cls, path: str) -> "LogisticModel":
+        """
+        Загрузить модель из артефакта
+
+        Артефакт содержит массивы weights, bias и feature_names; набор
+        признаков должен совпадать с MODEL_FEATURES.
+
+        Args:
+            path: Путь к файлу .npz
+
+        Returns:
+            Загруженная модель
+        """
+        with np.load(path, allow_pickle=False) as artifact:
+            feature_names = tuple(str(name) for name in artifact["feature_names"])
+            if feature_names != MODEL_FEATURES:
+                raise ValueError(
+                    f"Признаки модели {feature_names} не совпадают с ожидаемыми {MODEL_FEATURES}"
+                )
+            return cls(weights=artifact["weights"], bias=float(artifact["bias"]))
+
+    def save(self, path: str) -> None:
+        """Сохранить модель в артефакт .npz"""
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=np.float64(self.bias),
+            feature_names=np.array(MODEL_FEATURES)
+        )
+
+    def predict(self, features: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Рассчитать вероятности мошенничества
+
+        Args:
+            features: Матрица признаков
+            out: Массив для записи результата (по умолчанию создается новый)
+
+        Returns:
+            Оценки от 0 до 1
+        """
+        logits = features.astype(SCORE_DTYPE, copy=False) @ self.weights + self.bias
+        if out is None:
+            out = np.empty(len(features), dtype=SCORE_DTYPE)
+        np.negative(logits, out=out)
+        np.exp(out, out=out)
+        out += 1.0
+        np.reciprocal(out, out=out)
+        return out
+
+
+class ModelBackend(ABC):
+    """Абстрактный бэкенд выполнения ML модели"""
+
+    @abstractmethod
+    async def start(self) -> None:
+        """Подготовить бэкенд к работе (загрузить модель, запустить воркеры)"""
+        ...
+
+    @abstractmethod
+    async def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        Получить оценки модели для матрицы признаков
+
+        Args:
+            features: Матрица признаков формы (n, len(MODEL_FEATURES))
+
+        Returns:
+            Оценки от 0 до 1 для каждой строки
+        """
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Освободить ресурсы бэкенда"""
+        ...
+
+
+# Модель, загруженная в рабочем процессе пула
+_worker_model: Optional[LogisticModel] = None
+
+
+def _init_worker(model_path: str) -> None:
+    """Загрузить модель один раз при старте рабочего процесса"""
+    global _worker_model
+    _worker_model = LogisticModel.load(model_path)
+
+
+def _worker_ready() -> bool:
+    return _worker_model is not None
+
+
+def _predict_shared(features_name: str, shape: Tuple[int, int], scores_name: str) -> None:
+    """
+    Выполнить модель над признаками из разделяемой памяти
+
+    Результат пишется в сегмент scores_name; сегменты создает и удаляет
+    родительский процесс.
+    """
+    features_shm = shared_memory.SharedMemory(name=features_name)
+    scores_shm = shared_memory.SharedMemory(name=scores_name)
+    try:
+        features = np.ndarray(shape, dtype=FEATURE_DTYPE, buffer=features_shm.buf)
+        scores = np.ndarray((shape[0],), dtype=SCORE_DTYPE, buffer=scores_shm.buf)
+        _worker_model.predict(features, out=scores)
+        del features, scores
+    finally:
+        features_shm.close()
+        scores_shm.close()
+
+
+class ProcessPoolModelBackend(ModelBackend):
+    """Выполнение модели в пуле процессов с передачей пакетов через shared memory"""
+
+    def __init__(self, model_path: str = None, max_workers: int = None):
+        self._model_path = model_path or settings.MODEL_PATH
+        self._max_workers = max_workers or settings.MODEL_WORKERS
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def start(self) -> None:
+        """Запустить пул и дождаться загрузки модели во всех процессах"""
+        if self._executor is not None:
+            return
+
+        # Проверяем артефакт в родительском процессе, чтобы ошибка была видна при старте
+        if not os.path.exists(self._model_path):
+            raise FileNotFoundError(
+                f"Артефакт модели {self._model_path} (MODEL_PATH) не найден. Создайте его командой "
+                f"python -m services.model_export --output {self._model_path} или задайте MODEL_BACKEND=rules"
+            )
+        LogisticModel.load(self._model_path)
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._model_path,)
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _worker_ready)
+            for _ in range(self._max_workers)
+        ))
+        logger.info(
+            f"Модель {self._model_path} загружена в {self._max_workers} рабочих процессов"
+        )
+
+    async def predict(self, features: np.ndarray) -> np.ndarray:
+        if self._executor is None:
+            await self.start()
+        if len(features) == 0:
+            return np.empty(0, dtype=SCORE_DTYPE)
+
+        features = np.ascontiguousarray(features, dtype=FEATURE_DTYPE)
+        features_shm = shared_memory.SharedMemory(create=True, size=features.nbytes)
+        scores_shm = shared_memory.SharedMemory(create=True, size=len(features) * np.dtype(SCORE_DTYPE).itemsize)
+        try:
+            np.ndarray(features.shape, dtype=FEATURE_DTYPE, buffer=features_shm.buf)[:] = features
+
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self._executor,
+                _predict_shared,
+                features_shm.name,
+                features.shape,
+                scores_shm.name
+            )
+
+            return np.ndarray((len(features),), dtype=SCORE_DTYPE, buffer=scores_shm.buf).copy()
+        finally:
+            features_shm.close()
+            features_shm.unlink()
+            scores_shm.close()
+            scores_shm.unlink()
+
+    async def close(self) -> None:
+        """Остановить пул процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def create_model_backend(name: str = None) -> Optional[ModelBackend]:
+    """
+    Создать бэкенд модели по имени из настроек
+
+    Args:
+        name: Имя бэкенда (rules, process_pool)
+
+    Returns:
+        Бэкенд модели или None для эвристических правил
+    """
+    name = name or settings.MODEL_BACKEND
+    if name == "rules":
+        return None
+    if name == "process_pool":
+        return ProcessPoolModelBackend()
+    raise ValueError(f"Неизвестный бэкенд модели: {name}")
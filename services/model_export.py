@@ -0,0 +1,108 @@
+"""
+Экспорт артефакта ML модели (MODEL_PATH) для бэкенда process_pool
+
+Обученной модели в репозитории нет, поэтому экспортируется эталонная
+логистическая регрессия, воспроизводящая эвристические правила
+(services/vectorized_scoring.py): на синтетическом пакете транзакций
+оценки правил переводятся в логиты и веса подбираются методом наименьших
+квадратов. Набор признаков берется из FeatureAssembler, так что артефакт
+всегда совпадает с MODEL_FEATURES текущей версии сервиса.
+
+Запуск:
+    python -m services.model_export [--output PATH] [--samples N] [--seed S]
+"""
+import argparse
+import os
+import random
+from typing import List
+import numpy as np
+from models.transaction import Transaction
+from services.feature_assembler import CATEGORIES, CHANNELS, CURRENCIES, LOCATIONS, TRANSACTION_TYPES
+from services.model_backend import LogisticModel, build_model_features
+from services.vectorized_scoring import TransactionColumns, score_columns
+from config.settings import settings
+
+# Оценки правил 0 и 1 не имеют конечного логита
+_SCORE_EPSILON = 1e-3
+
+
+def _synthetic_transactions(samples: int, rng: random.Random) -> List[Transaction]:
+    """Транзакции со значениями из словарей признаков и случайными флагами риска"""
+    transactions = []
+    for index in range(samples):
+        transactions.append(Transaction(
+            customer_id=f"customer_{index % 1000}",
+            transaction_id=f"txn_{index}",
+            amount=round(rng.lognormvariate(5, 1.2), 2),
+            currency=rng.choice(CURRENCIES),
+            type=rng.choice(TRANSACTION_TYPES),
+            merchant_id="merchant_export",
+            card_bin="411111",
+            ip_address="192.168.1.1",
+            device_id="device_export",
+            location=rng.choice(LOCATIONS),
+            channel=rng.choice(CHANNELS),
+            timestamp="2023-01-01T10:00:00Z",
+            is_velocity_alert=rng.random() < 0.2,
+            is_location_alert=rng.random() < 0.2,
+            is_device_alert=rng.random() < 0.2,
+            transaction_category=rng.choice(CATEGORIES),
+        ))
+    return transactions
+
+
+def fit_reference_model(samples: int = 20000, seed: int = 0) -> LogisticModel:
+    """
+    Подобрать логистическую регрессию по оценкам эвристических правил
+
+    Args:
+        samples: Размер синтетического пакета
+        seed: Seed генератора транзакций
+
+    Returns:
+        Модель с признаками MODEL_FEATURES
+    """
+    transactions = _synthetic_transactions(samples, random.Random(seed))
+    features = build_model_features(transactions).astype(np.float64)
+    scores = score_columns(TransactionColumns.from_transactions(transactions), jitter=np.zeros(samples))
+    scores = np.clip(scores, _SCORE_EPSILON, 1 - _SCORE_EPSILON)
+    logits = np.log(scores / (1 - scores))
+
+    design = np.hstack([features, np.ones((samples, 1))])
+    solution, *_ = np.linalg.lstsq(design, logits, rcond=None)
+    return LogisticModel(weights=solution[:-1], bias=solution[-1])
+
+
+def export_model(path: str, samples: int = 20000, seed: int = 0) -> LogisticModel:
+    """
+    Подобрать эталонную модель и сохранить ее в артефакт
+
+    Args:
+        path: Путь к файлу .npz (каталоги создаются)
+        samples: Размер синтетического пакета
+        seed: Seed генератора транзакций
+
+    Returns:
+        Сохраненная модель
+    """
+    model = fit_reference_model(samples, seed)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    model.save(path)
+    return model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Экспорт артефакта ML модели")
+    parser.add_argument("--output", default=settings.MODEL_PATH, help="Путь артефакта (по умолчанию MODEL_PATH)")
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    export_model(args.output, args.samples, args.seed)
+    print(f"Модель сохранена в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,79 @@
 Сервис оценки транзакций с использованием ML модели
 """
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Dict, List, Optional
 from models.transaction import Transaction
-from models.scoring import ScoringResult
+from models.scoring import ModelScore
 
 class ScoringService(ABC):
     """Абстрактный базовый класс сервиса оценки"""
 
+    @property
+    def uses_customer_statistics(self) -> bool:
+        """
+        Нужна ли модели статистика клиента
+
+        Если да, оценка выполняется после расчета статистики и получает ее
+        в customer_stats; иначе оценка идет параллельно с записью.
+        """
+        return False
+
     @abstractmethod
-    async def score_transaction(self, transaction: Transaction) -> ScoringResult:
+    async def score_transaction(
+        self,
+        transaction: Transaction,
+        customer_stats: Optional[Dict] = None
+    ) -> ModelScore:
         """
         Оценить транзакцию с помощью ML модели
 
+        Args:
+            transaction: Транзакция для оценки
+            customer_stats: Статистика клиента с окнами (если она нужна модели)
+
+        Returns:
+            Оценка модели и флаг мошенничества
+
+        Raises:
+            NotImplementedError: Если метод не реализован
+        """
+        ...
+
+    async def score_batch(
+        self,
+        transactions: List[Transaction],
+        customer_stats: Optional[List[Optional[Dict]]] = None
+    ) -> List[ModelScore]:
+        """
+        Оценить пакет транзакций
+
+        Реализация по умолчанию оценивает транзакции по одной; реализации,
+        которые умеют вызывать модель пакетом, переопределяют метод.
+
+        Args:
+            transactions: Транзакции для оценки
+            customer_stats: Статистика клиента для каждой транзакции
+
+        Returns:
+            Оценки в том же порядке
+        """
+        if customer_stats is None:
+            customer_stats = [None] * len(transactions)
+        return [
+            await self.score_transaction(transaction, stats)
+            for transaction, stats in zip(transactions, customer_stats)
+        ]
+
+    @abstractmethod
+    async def fallback_result(self, transaction: Transaction) -> ModelScore:
+        """
+        Результат оценки по умолчанию, когда модель недоступна или не уложилась в бюджет
+
         Args:
             transaction: Транзакция для оценки
 
         Returns:
-            Результат оценки транзакции
+            Оценка по умолчанию
 
         Raises:
             NotImplementedError: Если метод не реализован
@@ -26,12 +82,17 @@ class ScoringService(ABC):
         ...
 
     @abstractmethod
-    async def _get_ml_model_score(self, transaction: Transaction) -> float:
+    async def _get_ml_model_score(
+        self,
+        transaction: Transaction,
+        customer_stats: Optional[Dict] = None
+    ) -> float:
         """
         Получить оценку от ML модели
 
         Args:
             transaction: Транзакция для оценки
+            customer_stats: Статистика клиента с окнами для признаков модели
 
         Returns:
             Оценка от 0 до 1
@@ -42,7 +103,7 @@ class ScoringService(ABC):
         ...
 
     @abstractmethod
-    async def _handle_model_timeout(self, transaction: Transaction) -> float:
+    async def _handle_model_timeout(self, transaction: Transaction) -> ModelScore:
         """
         Обработка таймаута модели
 
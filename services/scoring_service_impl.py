@@ -3,84 +3,203 @@
 """
 import asyncio
 import random
-from datetime import datetime
-from typing import Optional
+import time
+from typing import Dict, List, Optional
 from models.transaction import Transaction
-from models.scoring import ScoringResult
+from models.scoring import ModelScore
 from services.scoring_service import ScoringService
+from services.vectorized_scoring import score_transactions
+from services.model_backend import ModelBackend, build_model_features
+from monitoring.metrics import STAGE_LATENCY, STAGE_TIMEOUTS, STAGE_FALLBACKS
 from config.settings import settings
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+_MODEL_LATENCY = STAGE_LATENCY.labels(stage="model")
+_MODEL_BATCH_LATENCY = STAGE_LATENCY.labels(stage="model_batch")
+
 
 class ScoringServiceImpl(ScoringService):
     """Реализация сервиса оценки транзакций"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        rng: Optional[random.Random] = None,
+        model_backend: Optional[ModelBackend] = None
+    ):
         self._model_timeout_ms = settings.ML_MODEL_TIMEOUT_MS
         self._default_score = settings.DEFAULT_SCORING_VALUE
+        # Источник случайной добавки; фиксированный seed делает оценки воспроизводимыми
+        self._rng = rng or random.Random()
+        # Бэкенд модели; без него используются эвристические правила
+        self._model_backend = model_backend
+
+    @property
+    def uses_customer_statistics(self) -> bool:
+        """Признаки модели включают статистику клиента; эвристики ее не используют"""
+        return self._model_backend is not None
 
-    async def score_transaction(self, transaction: Transaction) -> ScoringResult:
+    async def score_transaction(
+        self,
+        transaction: Transaction,
+        customer_stats: Optional[Dict] = None
+    ) -> ModelScore:
         """
         Оценить транзакцию с помощью ML модели
 
         Args:
             transaction: Транзакция для оценки
+            customer_stats: Статистика клиента с окнами для признаков модели
 
         Returns:
-            Результат оценки транзакции
+            Оценка модели и флаг мошенничества
         """
-        logger.info(f"Начало оценки транзакции {transaction.transaction_id}")
+        logger.debug("Начало оценки транзакции {}", transaction.transaction_id)
 
         try:
-            # Получаем оценку от ML модели
-            score = await self._get_ml_model_score(transaction)
-
-            # Определяем is_fraud на основе порога
-            is_fraud = score > 0.7
-
-            logger.info(
-                f"Оценка транзакции {transaction.transaction_id} завершена. "
-                f"Score: {score:.4f}, Is Fraud: {is_fraud}"
+            # Получаем оценку от ML модели в пределах ML_MODEL_TIMEOUT_MS
+            started = time.perf_counter()
+            score = await asyncio.wait_for(
+                self._get_ml_model_score(transaction, customer_stats),
+                timeout=self._model_timeout_ms / 1000
             )
+            _MODEL_LATENCY.observe(time.perf_counter() - started)
+            result = self._build_score(score)
 
-            return ScoringResult(
-                customer_id=transaction.customer_id,
-                transaction_id=transaction.transaction_id,
-                scoring=score,
-                is_fraud=is_fraud,
-                processed_at=datetime.utcnow().isoformat() + "Z"
+            logger.debug(
+                "Оценка транзакции {} завершена. Score: {:.4f}, Is Fraud: {}",
+                transaction.transaction_id, score, result.is_fraud
             )
 
+            return result
+
         except asyncio.TimeoutError:
             logger.warning(
                 f"Таймаут при оценке транзакции {transaction.transaction_id}"
             )
+            STAGE_TIMEOUTS.labels(stage="model").inc()
+            STAGE_FALLBACKS.labels(stage="model").inc()
             return await self._handle_model_timeout(transaction)
         except Exception as e:
             logger.error(
                 f"Ошибка при оценке транзакции {transaction.transaction_id}: {str(e)}"
             )
+            STAGE_FALLBACKS.labels(stage="model").inc()
             return await self._handle_model_timeout(transaction)
 
-    async def _get_ml_model_score(self, transaction: Transaction) -> float:
+    async def score_batch(
+        self,
+        transactions: List[Transaction],
+        customer_stats: Optional[List[Optional[Dict]]] = None
+    ) -> List[ModelScore]:
+        """
+        Оценить пакет транзакций одним вызовом модели
+
+        Args:
+            transactions: Транзакции для оценки
+            customer_stats: Статистика клиента для каждой транзакции
+
+        Returns:
+            Оценки в том же порядке
+        """
+        if not transactions:
+            return []
+
+        try:
+            started = time.perf_counter()
+            scores = await asyncio.wait_for(
+                self._get_ml_model_scores(transactions, customer_stats),
+                timeout=self._model_timeout_ms / 1000
+            )
+            _MODEL_BATCH_LATENCY.observe(time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            logger.warning(f"Таймаут при оценке пакета из {len(transactions)} транзакций")
+            STAGE_TIMEOUTS.labels(stage="model").inc()
+            STAGE_FALLBACKS.labels(stage="model").inc(len(transactions))
+            return [await self._handle_model_timeout(transaction) for transaction in transactions]
+        except Exception as e:
+            logger.error(f"Ошибка при оценке пакета из {len(transactions)} транзакций: {str(e)}")
+            STAGE_FALLBACKS.labels(stage="model").inc(len(transactions))
+            return [await self._handle_model_timeout(transaction) for transaction in transactions]
+
+        logger.debug("Оценка пакета из {} транзакций завершена", len(transactions))
+        return [self._build_score(score) for score in scores]
+
+    def _build_score(self, score: float) -> ModelScore:
+        """Оценка модели с флагом мошенничества по порогу"""
+        return ModelScore(scoring=score, is_fraud=score > 0.7)
+
+    async def _get_ml_model_scores(
+        self,
+        transactions: List[Transaction],
+        customer_stats: Optional[List[Optional[Dict]]] = None
+    ) -> List[float]:
+        """
+        Получить оценки ML модели для пакета транзакций
+
+        Задержка вызова модели оплачивается один раз на весь пакет:
+        бэкенд модели получает одну матрицу признаков, правила применяются
+        векторно ко всему пакету.
+
+        Args:
+            transactions: Транзакции для оценки
+            customer_stats: Статистика клиента для каждой транзакции
+
+        Returns:
+            Оценки от 0 до 1 в том же порядке
+        """
+        if self._model_backend is not None:
+            scores = await self._model_backend.predict(
+                build_model_features(transactions, customer_stats)
+            )
+            return scores.tolist()
+
+        # Симуляция одного пакетного вызова ML модели
+        await asyncio.sleep(0.01)  # 10ms симуляция
+
+        return score_transactions(transactions, self._rng)
+
+    async def _get_ml_model_score(
+        self,
+        transaction: Transaction,
+        customer_stats: Optional[Dict] = None
+    ) -> float:
         """
         Получить оценку от ML модели
 
-        В реальной системе здесь будет вызов ML модели.
-        Для демонстрации используется симуляция с элементом случайности.
+        Если задан бэкенд модели, оценка рассчитывается в его рабочих
+        процессах. Иначе используется симуляция с элементом случайности.
 
         Args:
             transaction: Транзакция для оценки
+            customer_stats: Статистика клиента для признаков модели
 
         Returns:
             Оценка от 0 до 1
         """
+        if self._model_backend is not None:
+            scores = await self._model_backend.predict(
+                build_model_features([transaction], [customer_stats])
+            )
+            return float(scores[0])
+
         # Симуляция асинхронного вызова ML модели
         # В production здесь будет HTTP/gRPC вызов к ML сервису
         await asyncio.sleep(0.01)  # 10ms симуляция
 
+        return self._rule_based_score(transaction)
+
+    def _rule_based_score(self, transaction: Transaction) -> float:
+        """
+        Эвристическая оценка транзакции по ее характеристикам
+
+        Args:
+            transaction: Транзакция для оценки
+
+        Returns:
+            Оценка от 0 до 1
+        """
         # Базовый scoring на основе характеристик транзакции
         base_score = 0.3  # Базовый риск
 
@@ -103,12 +222,12 @@ class ScoringServiceImpl(ScoringService):
             base_score += 0.1
 
         # Добавляем небольшую случайность для демонстрации
-        random_factor = random.uniform(-0.05, 0.05)
+        random_factor = self._rng.uniform(-0.05, 0.05)
         final_score = min(max(base_score + random_factor, 0.0), 1.0)
 
         return final_score
 
-    async def _handle_model_timeout(self, transaction: Transaction) -> ScoringResult:
+    async def _handle_model_timeout(self, transaction: Transaction) -> ModelScore:
         """
         Обработка таймаута модели
 
@@ -116,17 +235,22 @@ class ScoringServiceImpl(ScoringService):
             transaction: Транзакция для оценки
 
         Returns:
-            Результат оценки по умолчанию
+            Оценка по умолчанию
         """
         logger.warning(
             f"Используется значение по умолчанию для транзакции "
             f"{transaction.transaction_id} из-за таймаута модели"
         )
-        
-        return ScoringResult(
-            customer_id=transaction.customer_id,
-            transaction_id=transaction.transaction_id,
-            scoring=self._default_score,
-            is_fraud=False,
-            processed_at=datetime.utcnow().isoformat() + "Z"
-        )
+        return await self.fallback_result(transaction)
+
+    async def fallback_result(self, transaction: Transaction) -> ModelScore:
+        """
+        Оценка по умолчанию
+
+        Args:
+            transaction: Транзакция для оценки
+
+        Returns:
+            Оценка по умолчанию с is_fraud=False
+        """
+        return ModelScore(scoring=self._default_score, is_fraud=False)
@@ -2,7 +2,7 @@
 Сервис обработки транзакций
 """
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional
 from models.transaction import Transaction
 from models.scoring import ScoringResult
 
@@ -25,6 +25,20 @@ class TransactionService(ABC):
         """
         ...
 
+    async def process_batch(self, transactions: List[Transaction]) -> List[ScoringResult]:
+        """
+        Обработать пакет транзакций
+
+        Реализация по умолчанию обрабатывает транзакции по одной.
+
+        Args:
+            transactions: Входящие транзакции
+
+        Returns:
+            Результаты оценки в том же порядке
+        """
+        return [await self.process_transaction(transaction) for transaction in transactions]
+
     @abstractmethod
     async def _validate_transaction(self, transaction: Transaction) -> bool:
         """
@@ -3,13 +3,23 @@
 """
 import time
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional
 from models.transaction import Transaction
-from models.scoring import ScoringResult
+from models.scoring import ModelScore, ScoringResult
 from repositories.transaction_repository import TransactionRepository
 from services.transaction_service import TransactionService
 from services.scoring_service import ScoringService
-from utils.logger import setup_logger
+from config.settings import settings
+from utils.time_windows import (
+    parse_timestamp_ms,
+    bucketize,
+    bucket_of,
+    summarize_windows,
+    summarize_packed_history,
+)
+from services.pipeline import Stage, StagePipeline
+from utils.deadline import Deadline
+from utils.logger import log_request_summary, setup_logger
 
 logger = setup_logger(__name__)
 
@@ -20,15 +30,28 @@ class TransactionServiceImpl(TransactionService):
     def __init__(
         self,
         repository: TransactionRepository,
-        scoring_service: ScoringService
+        scoring_service: ScoringService,
+        statistics_mode: str = None,
+        processing_budget_ms: float = None
     ):
         self._repository = repository
         self._scoring_service = scoring_service
+        self._statistics_mode = statistics_mode or settings.STATISTICS_MODE
+        self._processing_budget_ms = processing_budget_ms or settings.MAX_PROCESSING_TIME_MS
+        # Этап, результат которого содержит статистику клиента для ответа
+        self._statistics_stage = "ingest" if self._statistics_mode == "incremental" else "statistics"
+        self._pipeline = StagePipeline(self._build_stages())
 
     async def process_transaction(self, transaction: Transaction) -> ScoringResult:
         """
         Обработать транзакцию и вернуть результат оценки
 
+        Независимые этапы (запись с расчетом статистики и оценка, если модели
+        не нужна статистика клиента) выполняются конкурентно в пределах бюджета MAX_PROCESSING_TIME_MS.
+        Этап, не уложившийся в остаток бюджета, заменяется fallback:
+        статистикой из локального кэша (или пустой) и оценкой по умолчанию.
+        Запись в Redis по таймауту не отменяется и завершается в фоне.
+
         Args:
             transaction: Входящая транзакция
 
@@ -36,10 +59,11 @@ class TransactionServiceImpl(TransactionService):
             Результат оценки транзакции
         """
         start_time = time.time()
-        
-        logger.info(
-            f"Начало обработки транзакции {transaction.transaction_id} "
-            f"для клиента {transaction.customer_id}"
+        deadline = Deadline(self._processing_budget_ms)
+
+        logger.debug(
+            "Начало обработки транзакции {} для клиента {}",
+            transaction.transaction_id, transaction.customer_id
         )
 
         # Валидация транзакции
@@ -47,38 +71,176 @@ class TransactionServiceImpl(TransactionService):
         if not is_valid:
             logger.warning(f"Транзакция {transaction.transaction_id} не прошла валидацию")
 
-        # Сохраняем транзакцию в кэш
-        await self._repository.add_transaction(transaction)
-
-        # Расчет статистики по клиенту
-        customer_stats = await self._calculate_statistics(transaction.customer_id)
-
-        # Вызов ML сервиса для оценки
-        scoring_result = await self._scoring_service.score_transaction(transaction)
+        # Запись, статистика и оценка выполняются графом этапов (см. _build_stages)
+        pipeline_result = await self._pipeline.execute(transaction, deadline)
+        customer_stats = pipeline_result.results[self._statistics_stage]
+        model_score = pipeline_result.results["scoring"]
 
         # Расчет времени обработки
         end_time = time.time()
         processing_time_ms = await self._get_processing_time(start_time, end_time)
 
         # Формируем полный результат с статистикой
-        result = ScoringResult(
-            customer_id=transaction.customer_id,
+        result = self._build_result(transaction, model_score, customer_stats, processing_time_ms)
+
+        # Одна итоговая строка на запрос вместо строк каждого этапа
+        log_request_summary(
+            "Транзакция обработана",
+            (time.time() - start_time) * 1000,
             transaction_id=transaction.transaction_id,
-            scoring=scoring_result.scoring,
-            is_fraud=scoring_result.is_fraud,
-            processing_time_ms=processing_time_ms,
-            customer_transaction_count_24h=customer_stats.get("total_transactions", 0),
-            customer_avg_amount_24h=customer_stats.get("avg_amount", 0.0),
-            processed_at=datetime.utcnow().isoformat() + "Z"
+            customer_id=transaction.customer_id,
+            scoring=round(result.scoring, 4),
+            is_fraud=result.is_fraud,
+            **{f"{name}_ms": round(elapsed, 2) for name, elapsed in pipeline_result.timings_ms.items()}
         )
 
-        logger.info(
-            f"Обработка транзакции {transaction.transaction_id} завершена за "
-            f"{processing_time_ms}ms. Результат: scoring={result.scoring:.4f}, "
-            f"is_fraud={result.is_fraud}"
+        return result
+
+    async def process_batch(self, transactions: List[Transaction]) -> List[ScoringResult]:
+        """
+        Обработать пакет транзакций за один проход
+
+        Операции с Redis группируются по клиентам и уходят одним вызовом
+        репозитория, оценка выполняется одним пакетным вызовом модели.
+
+        Args:
+            transactions: Входящие транзакции
+
+        Returns:
+            Результаты оценки в том же порядке
+        """
+        start_time = time.time()
+
+        logger.debug("Начало обработки пакета из {} транзакций", len(transactions))
+
+        for transaction in transactions:
+            if not await self._validate_transaction(transaction):
+                logger.warning(f"Транзакция {transaction.transaction_id} не прошла валидацию")
+
+        if self._statistics_mode == "incremental":
+            customer_stats = await self._repository.ingest_batch(transactions)
+        else:
+            customer_stats = []
+            for transaction in transactions:
+                await self._repository.add_transaction(transaction)
+                customer_stats.append(
+                    await self._calculate_statistics(
+                        transaction.customer_id,
+                        reference_ms=parse_timestamp_ms(transaction.timestamp)
+                    )
+                )
+
+        model_scores = await self._scoring_service.score_batch(transactions, customer_stats)
+
+        end_time = time.time()
+        processing_time_ms = await self._get_processing_time(start_time, end_time)
+
+        log_request_summary(
+            "Пакет обработан",
+            (end_time - start_time) * 1000,
+            batch_size=len(transactions)
         )
 
-        return result
+        return [
+            self._build_result(transaction, model_score, stats, processing_time_ms)
+            for transaction, model_score, stats in zip(transactions, model_scores, customer_stats)
+        ]
+
+    def _build_stages(self) -> List[Stage]:
+        """
+        Граф этапов обработки одной транзакции
+
+        В инкрементальном режиме запись и статистика - один этап ingest,
+        в остальных режимах этап statistics рассчитывается после записи.
+        """
+        if self._statistics_mode == "incremental":
+            storage_stages = [
+                # Сохранение транзакции и статистика клиента одним вызовом репозитория
+                Stage(
+                    name="ingest",
+                    run=lambda transaction, _: self._repository.ingest_transaction(transaction),
+                    fallback=self._get_fallback_statistics,
+                    shield=True
+                ),
+            ]
+        else:
+            storage_stages = [
+                Stage(
+                    name="write",
+                    run=lambda transaction, _: self._repository.add_transaction(transaction),
+                    fallback=self._skip_stage,
+                    shield=True
+                ),
+                Stage(
+                    name="statistics",
+                    run=lambda transaction, _: self._calculate_statistics(
+                        transaction.customer_id,
+                        reference_ms=parse_timestamp_ms(transaction.timestamp)
+                    ),
+                    depends_on=("write",),
+                    fallback=self._get_fallback_statistics
+                ),
+            ]
+
+        statistics_stage = self._statistics_stage
+        if self._scoring_service.uses_customer_statistics:
+            # Признаки модели включают окна клиента: оценка ждет статистику
+            scoring_stage = Stage(
+                name="scoring",
+                run=lambda transaction, results: self._scoring_service.score_transaction(
+                    transaction,
+                    results[statistics_stage]
+                ),
+                depends_on=(statistics_stage,),
+                fallback=self._scoring_service.fallback_result
+            )
+        else:
+            # Оценка использует только поля транзакции и не ждет записи
+            scoring_stage = Stage(
+                name="scoring",
+                run=lambda transaction, _: self._scoring_service.score_transaction(transaction),
+                fallback=self._scoring_service.fallback_result
+            )
+
+        return storage_stages + [scoring_stage]
+
+    async def _get_fallback_statistics(self, transaction: Transaction) -> Dict:
+        """Статистика клиента из локального кэша или пустая, если ее нет"""
+        return self._repository.get_cached_statistics(transaction.customer_id) or {}
+
+    async def _skip_stage(self, transaction: Transaction) -> None:
+        return None
+
+    def _build_result(
+        self,
+        transaction: Transaction,
+        model_score: ModelScore,
+        customer_stats: Dict,
+        processing_time_ms: int
+    ) -> ScoringResult:
+        """
+        Сформировать полный результат оценки со статистикой клиента
+
+        Единственное создание ScoringResult на запрос: сервис оценки
+        возвращает только ModelScore. Используется обычный конструктор с
+        валидацией - в pydantic 2 model_construct для этой модели не быстрее.
+        """
+        return ScoringResult(
+            customer_id=transaction.customer_id,
+            transaction_id=transaction.transaction_id,
+            scoring=model_score.scoring,
+            is_fraud=model_score.is_fraud,
+            processing_time_ms=processing_time_ms,
+            customer_transaction_count_24h=customer_stats.get("transaction_count_24h", 0),
+            customer_avg_amount_24h=customer_stats.get("avg_amount_24h", 0.0),
+            customer_transaction_count_3h=customer_stats.get("transaction_count_3h", 0),
+            customer_avg_amount_3h=customer_stats.get("avg_amount_3h", 0.0),
+            customer_transaction_count_6h=customer_stats.get("transaction_count_6h", 0),
+            customer_avg_amount_6h=customer_stats.get("avg_amount_6h", 0.0),
+            customer_transaction_count_12h=customer_stats.get("transaction_count_12h", 0),
+            customer_avg_amount_12h=customer_stats.get("avg_amount_12h", 0.0),
+            processed_at=datetime.utcnow().isoformat() + "Z"
+        )
 
     async def _validate_transaction(self, transaction: Transaction) -> bool:
         """
@@ -105,23 +267,48 @@ class TransactionServiceImpl(TransactionService):
 
         return True
 
-    async def _calculate_statistics(self, customer_id: str) -> Dict:
+    async def _calculate_statistics(
+        self,
+        customer_id: str,
+        reference_ms: Optional[int] = None
+    ) -> Dict:
         """
         Расчет статистики по клиенту
 
         Args:
             customer_id: ID клиента
+            reference_ms: Момент времени (epoch ms), которым заканчиваются окна 3h/6h/12h/24h
 
         Returns:
             Словарь со статистикой
         """
-        # Получаем существующую статистику
-        stats = await self._repository.get_statistics_by_customer(customer_id)
+        if reference_ms is None:
+            reference_ms = int(time.time() * 1000)
+
+        if self._statistics_mode == "incremental":
+            # Агрегаты и временные бакеты обновляются репозиторием при записи
+            # транзакции, полная история клиента не читается
+            stats = await self._repository.get_statistics_by_customer(customer_id)
+            stats.update(
+                await self._repository.get_window_statistics(customer_id, reference_ms)
+            )
+            return stats
+
+        if self._statistics_mode == "packed":
+            # Векторные редукции по упакованной истории вместо цикла по объектам
+            records = await self._repository.get_packed_history(customer_id)
+            return summarize_packed_history(records, reference_ms)
 
-        # Получаем все транзакции клиента для пересчета
-        transactions = await self._repository.get_transactions_by_customer(customer_id)
+        # Получаем транзакции клиента за самое длинное окно для пересчета
+        since_ms = reference_ms - max(settings.STATISTICS_WINDOWS_HOURS) * 3600 * 1000
+        transactions = await self._repository.get_transactions_by_customer(
+            customer_id,
+            since_ms=since_ms
+        )
 
         if not transactions:
+            stats = await self._repository.get_statistics_by_customer(customer_id)
+            stats.update(summarize_windows({}, bucket_of(reference_ms)))
             return stats
 
         # Расчет статистики
@@ -145,6 +332,12 @@ class TransactionServiceImpl(TransactionService):
         # Сохраняем обновленную статистику
         await self._repository.update_statistics(customer_id, updated_stats)
 
+        # Статистика по окнам не сохраняется - она зависит от момента расчета
+        buckets = bucketize(
+            (txn.timestamp_ms, txn.amount) for txn in transactions
+        )
+        updated_stats.update(summarize_windows(buckets, bucket_of(reference_ms)))
+
         return updated_stats
 
     async def _get_processing_time(self, start_time: float, end_time: float) -> int:
@@ -0,0 +1,213 @@
+"""
+Тесты для API маршрутов
+"""
+import json
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from api.dependencies import get_transaction_service
+from api.routes.transaction import _iter_ndjson_lines, _stream_results
+from api.lifecycle import ServiceContainer
+from models.scoring import ScoringResult
+from models.transaction import Transaction
+from repositories.redis_transaction_repository import RedisTransactionRepository
+from services.scoring_service_impl import ScoringServiceImpl
+from services.transaction_service_impl import TransactionServiceImpl
+from config.settings import settings
+
+
+def _transaction_payload(**overrides) -> dict:
+    """Создать тело тестовой транзакции"""
+    payload = {
+        "customer_id": "customer_123",
+        "transaction_id": "txn_456",
+        "amount": 100.50,
+        "currency": "USD",
+        "type": 78,
+        "merchant_id": "merchant_789",
+        "card_bin": "411111",
+        "ip_address": "192.168.1.1",
+        "device_id": "device_001",
+        "location": "US-NY",
+        "channel": "online",
+        "timestamp": "2023-01-01T10:00:00Z"
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def client():
+    """Тестовый клиент с сервисом поверх in-memory Redis"""
+    service = TransactionServiceImpl(
+        repository=RedisTransactionRepository(client=fakeredis.FakeAsyncRedis()),
+        scoring_service=ScoringServiceImpl()
+    )
+    app.dependency_overrides[get_transaction_service] = lambda: service
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_score_endpoint_returns_result(client, monkeypatch, fast_json):
+    """Тест: быстрый и стандартный JSON пути отдают одинаковый ответ"""
+    monkeypatch.setattr(settings, "FAST_JSON_ENABLED", fast_json)
+
+    response = client.post("/api/v1/transactions/", json=_transaction_payload())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert body["transaction_id"] == "txn_456"
+    assert body["customer_transaction_count_24h"] == 1
+    assert body["customer_avg_amount_24h"] == pytest.approx(100.50)
+    assert set(body) == set(ScoringResult.model_fields)
+
+
+def test_score_endpoint_rejects_invalid_body(client):
+    """Тест: невалидное тело возвращает 422 с путем до поля"""
+    response = client.post("/api/v1/transactions/", json={"customer_id": "customer_123"})
+
+    assert response.status_code == 422
+    locs = [error["loc"] for error in response.json()["detail"]]
+    assert ["body", "transaction_id"] in locs
+
+
+@pytest.mark.parametrize("txn_type", [2**31, -2**31 - 1])
+def test_score_endpoint_rejects_type_out_of_int32(client, txn_type):
+    """Тест: тип вне int32 возвращает 422, а не ошибку упаковки при записи истории"""
+    response = client.post("/api/v1/transactions/", json=_transaction_payload(type=txn_type))
+
+    assert response.status_code == 422
+    assert ["body", "type"] in [error["loc"] for error in response.json()["detail"]]
+
+
+def test_score_endpoint_accepts_int32_type_bound(client):
+    """Тест: наибольший тип int32 проходит через запись истории"""
+    response = client.post("/api/v1/transactions/", json=_transaction_payload(type=2**31 - 1))
+
+    assert response.status_code == 200
+
+
+def test_batch_endpoint_preserves_order_with_item_errors(client):
+    """Тест: пакетный эндпоинт возвращает результаты по порядку и ошибки по элементам"""
+    items = [
+        _transaction_payload(transaction_id="txn_1"),
+        {"customer_id": "customer_123"},
+        _transaction_payload(transaction_id="txn_3", customer_id="customer_999"),
+    ]
+
+    response = client.post("/api/v1/transactions/batch", json=items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["index"] for item in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["result"]["transaction_id"] == "txn_1"
+    assert body["results"][1]["error"] is not None
+    assert body["results"][2]["result"]["customer_transaction_count_24h"] == 1
+    assert body["processed_count"] == 2
+    assert body["error_count"] == 1
+
+
+def test_batch_endpoint_reports_non_object_items(client):
+    """Тест: элементы, не являющиеся объектами, получают ошибку, остальные обрабатываются"""
+    items = [_transaction_payload(transaction_id="txn_1"), 5, "txn", None, [1]]
+
+    response = client.post("/api/v1/transactions/batch", json=items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["index"] for item in body["results"]] == [0, 1, 2, 3, 4]
+    assert body["results"][0]["result"]["transaction_id"] == "txn_1"
+    assert all(item["error"] is not None for item in body["results"][1:])
+    assert body["processed_count"] == 1
+    assert body["error_count"] == 4
+
+
+def test_stream_endpoint_returns_ndjson_in_order(client):
+    """Тест: потоковый эндпоинт отдает NDJSON результаты в порядке строк"""
+    lines = [
+        json.dumps(_transaction_payload(transaction_id=f"txn_{i}"))
+        for i in range(5)
+    ]
+    lines.insert(2, "not a json")
+    body = ("\n".join(lines) + "\n").encode()
+
+    response = client.post(
+        "/api/v1/transactions/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["index"] for item in items] == list(range(6))
+    assert items[2]["error"] is not None
+    assert [item["result"]["transaction_id"] for item in items if item["result"]] == [f"txn_{i}" for i in range(5)]
+    assert max(item["result"]["customer_transaction_count_24h"] for item in items if item["result"]) == 5
+
+
+class _ChunkedRequest:
+    """Запрос, тело которого приходит небольшими частями, как по сети"""
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self._chunks = [body[offset:offset + chunk_size] for offset in range(0, len(body), chunk_size)]
+
+    async def stream(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_oversized_line_once(monkeypatch):
+    """Тест: слишком длинная строка дает одну ошибку, следующие строки не сдвигаются"""
+    monkeypatch.setattr(settings, "STREAM_MAX_LINE_BYTES", 1000)
+    body = (
+        json.dumps(_transaction_payload(transaction_id="txn_0")) + "\n"
+        + "x" * 5000 + "\n"
+        + json.dumps(_transaction_payload(transaction_id="txn_2")) + "\n"
+    ).encode()
+    service = TransactionServiceImpl(
+        repository=RedisTransactionRepository(client=fakeredis.FakeAsyncRedis()),
+        scoring_service=ScoringServiceImpl()
+    )
+
+    lines = _iter_ndjson_lines(_ChunkedRequest(body, chunk_size=256))
+    items = [json.loads(line) async for line in _stream_results(lines, service)]
+
+    assert [item["index"] for item in items] == [0, 1, 2]
+    assert items[0]["result"]["transaction_id"] == "txn_0"
+    assert "длина строки" in items[1]["error"]
+    assert items[2]["result"]["transaction_id"] == "txn_2"
+
+
+@pytest.mark.asyncio
+async def test_service_container_warm_up_and_close():
+    """Тест: контейнер прогревает Redis и модель, пробная оценка не пишет в Redis"""
+    redis_client = fakeredis.FakeAsyncRedis()
+    container = ServiceContainer.create(redis_client=redis_client)
+
+    await container.warm_up()
+
+    assert await redis_client.keys("*") == []
+    result = await container.transaction_service.process_transaction(
+        Transaction(**_transaction_payload())
+    )
+    assert result.customer_transaction_count_24h == 1
+
+    await container.close()
+
+
+def test_readiness_reports_state():
+    """Тест: /ready отвечает 503, пока зависимости не прогреты"""
+    client = TestClient(app)
+
+    app.state.ready = False
+    assert client.get("/ready").status_code == 503
+
+    app.state.ready = True
+    assert client.get("/ready").json() == {"status": "ready"}
+    app.state.ready = False
@@ -0,0 +1,60 @@
+"""
+Тесты для набора бенчмарков
+"""
+import json
+import pytest
+from benchmarks.runner import QUICK_CONFIG, BenchmarkResult, build_report, compare_reports
+from benchmarks.suite import main, run_benchmarks, select_benchmarks
+
+
+def _report(**p50_by_name) -> dict:
+    return build_report(
+        [BenchmarkResult.from_samples(name, [p50 * 1000] * 5) for name, p50 in p50_by_name.items()],
+        environment={}
+    )
+
+
+def test_result_percentiles_and_throughput():
+    """Тест: перцентили и ops/sec считаются по времени вызовов"""
+    result = BenchmarkResult.from_samples("op", [1_000] * 98 + [10_000, 100_000])
+
+    assert result.iterations == 100
+    assert result.p50_us == pytest.approx(1.0)
+    assert result.p99_us > 10.0
+    assert result.max_us == pytest.approx(100.0)
+    assert result.ops_per_sec == pytest.approx(100 / (208_000 / 1e9))
+
+
+def test_compare_flags_regressions_over_threshold():
+    """Тест: ухудшение больше порога отмечается, новые бенчмарки пропускаются"""
+    baseline = _report(fast=10.0, slow=10.0)
+    current = _report(fast=11.0, slow=13.0, added=1.0)
+
+    comparisons = {item.name: item for item in compare_reports(baseline, current, threshold=0.15)}
+
+    assert set(comparisons) == {"fast", "slow"}
+    assert not comparisons["fast"].regression
+    assert comparisons["slow"].regression
+    assert comparisons["slow"].change == pytest.approx(0.3)
+
+
+def test_compare_command_exit_code(tmp_path):
+    """Тест: compare возвращает 1 при регрессии по ops/sec"""
+    baseline_path, current_path = tmp_path / "baseline.json", tmp_path / "current.json"
+    baseline_path.write_text(json.dumps(_report(op=10.0)))
+    current_path.write_text(json.dumps(_report(op=20.0)))
+
+    assert main(["compare", str(baseline_path), str(current_path), "--metric", "ops_per_sec"]) == 1
+    assert main(["compare", str(baseline_path), str(baseline_path)]) == 0
+
+
+@pytest.mark.asyncio
+async def test_suite_runs_on_fakeredis():
+    """Тест: бенчмарки репозитория и полного пути выполняются поверх fakeredis"""
+    benchmarks = select_benchmarks(["repository.ingest_transaction[script]", "service.process_transaction[incremental]"])
+
+    results, environment = await run_benchmarks(benchmarks, QUICK_CONFIG)
+
+    assert [result.name for result in results] == [benchmark.name for benchmark in benchmarks]
+    assert all(result.iterations >= QUICK_CONFIG.min_iterations for result in results)
+    assert environment["redis"].startswith("fakeredis")
@@ -0,0 +1,80 @@
+"""
+Тесты для локального L1 кэша статистики клиентов
+"""
+import pytest
+import fakeredis
+from unittest.mock import AsyncMock
+from models.transaction import Transaction
+from repositories.redis_transaction_repository import RedisTransactionRepository
+from repositories.cached_transaction_repository import CachedTransactionRepository
+from utils.lru_cache import TTLLRUCache
+
+
+def _make_transaction(**overrides) -> Transaction:
+    """Создать тестовую транзакцию"""
+    transaction_data = {
+        "customer_id": "customer_123",
+        "transaction_id": "txn_456",
+        "amount": 100.0,
+        "currency": "USD",
+        "type": 78,
+        "merchant_id": "merchant_789",
+        "card_bin": "411111",
+        "ip_address": "192.168.1.1",
+        "device_id": "device_001",
+        "location": "US-NY",
+        "channel": "online",
+        "timestamp": "2023-01-01T10:00:00Z"
+    }
+    transaction_data.update(overrides)
+    return Transaction(**transaction_data)
+
+
+def test_lru_eviction():
+    """Тест вытеснения самой давно использованной записи"""
+    evictions = []
+    cache = TTLLRUCache(max_size=2, ttl_seconds=60, on_evict=evictions.append)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert evictions == ["lru"]
+
+
+def test_ttl_expiration():
+    """Тест истечения записи по TTL"""
+    now = [0.0]
+    evictions = []
+    cache = TTLLRUCache(max_size=10, ttl_seconds=1, on_evict=evictions.append, clock=lambda: now[0])
+
+    cache.set("a", 1)
+    now[0] = 0.5
+    assert cache.get("a") == 1
+    now[0] = 1.5
+    assert cache.get("a") is None
+    assert evictions == ["ttl"]
+
+
+@pytest.mark.asyncio
+async def test_cached_ingest_skips_redis_read():
+    """Тест: для закэшированного клиента статистика обновляется локально"""
+    inner = RedisTransactionRepository(
+        client=fakeredis.FakeAsyncRedis(),
+        statistics_mode="incremental",
+        ingest_mode="script"
+    )
+    repository = CachedTransactionRepository(inner, max_size=100, ttl_ms=60000)
+
+    first = await repository.ingest_transaction(_make_transaction(transaction_id="txn_1", amount=100.0))
+    inner.ingest_transaction = AsyncMock(side_effect=AssertionError("чтение из Redis"))
+    second = await repository.ingest_transaction(_make_transaction(transaction_id="txn_2", amount=50.0))
+
+    assert first["total_transactions"] == 1
+    assert second["total_transactions"] == 2
+    assert second["transaction_count_3h"] == 2
+    assert second["avg_amount_24h"] == pytest.approx(75.0)
+    assert (await inner.get_statistics_by_customer("customer_123"))["total_transactions"] == 2
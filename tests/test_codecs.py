@@ -0,0 +1,143 @@
+"""
+Тесты для кодеков хранения транзакций
+"""
+import json
+import pytest
+from models.history import TransactionRecord
+from models.transaction import Transaction
+from repositories.codecs import (
+    BINARY_FORMAT_V1,
+    _HEADER_V1,
+    BinaryTransactionCodec,
+    JsonTransactionCodec,
+    get_codec,
+)
+
+
+def _make_transaction(**overrides) -> Transaction:
+    """Создать тестовую транзакцию"""
+    transaction_data = {
+        "customer_id": "customer_123",
+        "transaction_id": "txn_456",
+        "amount": 100.50,
+        "currency": "USD",
+        "type": 78,
+        "merchant_id": "merchant_789",
+        "card_bin": "411111",
+        "ip_address": "192.168.1.1",
+        "device_id": "device_001",
+        "location": "US-NY",
+        "channel": "online",
+        "timestamp": "2023-01-01T10:00:00Z",
+        "is_velocity_alert": True,
+        "is_location_alert": False,
+        "transaction_category": "ecommerce"
+    }
+    transaction_data.update(overrides)
+    return Transaction(**transaction_data)
+
+
+def test_binary_codec_roundtrip():
+    """Тест: бинарный кодек сохраняет поля, нужные для признаков"""
+    codec = BinaryTransactionCodec()
+    transaction = _make_transaction()
+
+    decoded = codec.decode(codec.encode(transaction), "customer_123")
+
+    assert decoded.customer_id == "customer_123"
+    assert decoded.transaction_id == "txn_456"
+    assert decoded.amount == 100.50
+    assert decoded.type == 78
+    assert decoded.currency == "USD"
+    assert decoded.channel == "online"
+    assert decoded.location == "US-NY"
+    assert decoded.transaction_category == "ecommerce"
+    assert decoded.timestamp == "2023-01-01T10:00:00.000Z"
+    assert decoded.is_velocity_alert is True
+    assert decoded.is_location_alert is False
+    assert decoded.is_device_alert is None
+
+
+@pytest.mark.parametrize("txn_type", [-2**31, 2**31 - 1])
+def test_binary_codec_roundtrip_type_bounds(txn_type):
+    """Тест: граничные значения типа (int32) сохраняются без переполнения"""
+    codec = BinaryTransactionCodec()
+
+    decoded = codec.decode(codec.encode(_make_transaction(type=txn_type)), "customer_123")
+
+    assert decoded.type == txn_type
+
+
+def test_binary_codec_reads_legacy_json():
+    """Тест: бинарный кодек читает записи в старом JSON формате"""
+    transaction = _make_transaction()
+    legacy_payload = json.dumps(transaction.model_dump())
+
+    decoded = BinaryTransactionCodec().decode(legacy_payload)
+
+    assert decoded == TransactionRecord.from_transaction(transaction)
+
+
+@pytest.mark.parametrize("codec", [JsonTransactionCodec(), BinaryTransactionCodec()])
+def test_codecs_decode_slotted_records(codec):
+    """Тест: история читается в записи со слотами без валидации pydantic"""
+    decoded = codec.decode(codec.encode(_make_transaction()), "customer_123")
+
+    assert isinstance(decoded, TransactionRecord)
+    assert not hasattr(decoded, "__dict__")
+    assert decoded.customer_id == "customer_123"
+    assert decoded.amount == 100.50
+    assert decoded.timestamp.startswith("2023-01-01T10:00:00")
+
+
+def test_binary_codec_is_compact():
+    """Тест: бинарная запись в несколько раз меньше JSON"""
+    transaction = _make_transaction()
+
+    binary_size = len(BinaryTransactionCodec().encode(transaction))
+    json_size = len(JsonTransactionCodec().encode(transaction))
+
+    assert binary_size * 5 < json_size
+
+
+def test_binary_codec_roundtrip_long_non_ascii_strings():
+    """Тест: строки длиннее 255 байт с многобайтовыми символами сохраняются без обрезки"""
+    codec = BinaryTransactionCodec()
+    transaction = _make_transaction(
+        transaction_id="txn_" + "ж" * 200,
+        location="Москва-" * 60,
+        transaction_category="категория" * 40,
+    )
+
+    decoded = codec.decode(codec.encode(transaction), "customer_123")
+
+    assert decoded.transaction_id == transaction.transaction_id
+    assert decoded.location == transaction.location
+    assert decoded.transaction_category == transaction.transaction_category
+
+
+def test_binary_codec_reads_v1_records_with_split_characters():
+    """Тест: запись v1 с разрезанным многобайтовым символом читается без ошибки"""
+    header = _HEADER_V1.pack(BINARY_FORMAT_V1, 1672567200000, 100.5, 78, 0, 0)
+    strings = b"".join(
+        bytes((len(value),)) + value
+        for value in (b"txn_1", b"USD", b"online", "ж".encode("utf-8")[:1], b"")
+    )
+
+    decoded = BinaryTransactionCodec().decode(header + strings, "customer_123")
+
+    assert decoded.transaction_id == "txn_1"
+    assert decoded.location == "�"
+    assert decoded.transaction_category is None
+
+
+def test_binary_codec_unknown_version():
+    """Тест: неизвестная версия формата приводит к ошибке"""
+    with pytest.raises(ValueError):
+        BinaryTransactionCodec().decode(b"\x7f" + b"\x00" * 32)
+
+
+def test_get_codec_unknown_name():
+    """Тест: неизвестное имя кодека"""
+    with pytest.raises(ValueError):
+        get_codec("xml")
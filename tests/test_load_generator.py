@@ -0,0 +1,127 @@
+"""
+Тесты для генератора нагрузки
+"""
+import asyncio
+import random
+import pytest
+from load_generator.histogram import LatencyHistogram
+from load_generator.open_loop import OpenLoopRunner, RateStage, format_report, parse_profile, send_offsets
+
+
+def test_histogram_percentiles_within_precision():
+    """Тест: перцентили гистограммы совпадают с точными в пределах 0.1%"""
+    rng = random.Random(7)
+    values = sorted(int(rng.lognormvariate(8, 1.5)) + 1 for _ in range(20_000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for percentile in (50, 90, 99, 99.9):
+        exact = values[round(percentile / 100 * len(values)) - 1]
+        assert histogram.value_at_percentile(percentile) == pytest.approx(exact, rel=0.001, abs=1)
+    assert histogram.max_us == values[-1]
+    assert histogram.min_us == values[0]
+    assert histogram.total_count == len(values)
+
+
+def test_histogram_merge():
+    """Тест: объединение гистограмм эквивалентно записи всех значений в одну"""
+    first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for value in range(1, 5000, 7):
+        first.record(value)
+        combined.record(value)
+    for value in range(100_000, 200_000, 997):
+        second.record(value)
+        combined.record(value)
+
+    first.merge(second)
+
+    assert first.to_dict() == combined.to_dict()
+
+
+def test_send_offsets_constant_and_ramp():
+    """Тест: расписание выдерживает постоянную скорость и линейный разгон"""
+    constant = list(send_offsets([RateStage(100, 2)], start_rps=100))
+    assert len(constant) == 200
+    assert constant[1] - constant[0] == pytest.approx(0.01)
+
+    # Разгон 0 -> 100 rps за 10 секунд: 500 запросов, половина из них в последние ~2.9 секунды
+    ramp = list(send_offsets(parse_profile("100:10")))
+    assert len(ramp) == 500
+    assert ramp == sorted(ramp)
+    assert sum(1 for offset in ramp if offset < 10 / 2 ** 0.5) == pytest.approx(250, abs=1)
+
+    with pytest.raises(ValueError):
+        parse_profile("100")
+
+
+@pytest.mark.asyncio
+async def test_open_loop_accounts_for_stalled_service():
+    """Тест: задержка считается от запланированного момента и включает ожидание за зависшим запросом"""
+    lock = asyncio.Lock()
+    calls = 0
+
+    async def send(payload):
+        # Сервис обрабатывает запросы последовательно, второй запрос зависает на 300 мс
+        nonlocal calls
+        async with lock:
+            calls += 1
+            await asyncio.sleep(0.3 if calls == 2 else 0.001)
+        return 200
+
+    runner = OpenLoopRunner(send, dict, [RateStage(100, 1)], start_rps=100)
+    report = await runner.run()
+
+    assert report["requests"] == 100
+    assert report["ok"] == 100
+    assert report["errors"] == 0
+    # Около 30 запросов, запланированных во время зависания, ждали в очереди
+    assert report["latency"]["p50_us"] < 50_000
+    assert report["latency"]["p90_us"] > 50_000
+    assert report["latency"]["max_us"] >= 290_000
+    assert report["achieved_rps"] > 70
+    assert report["dropped"] == 0
+    assert report["valid"]
+
+
+@pytest.mark.asyncio
+async def test_open_loop_counts_errors_and_timeouts():
+    """Тест: ошибки, таймауты и превышение предела запросов попадают в статусы"""
+    calls = 0
+
+    async def send(payload):
+        nonlocal calls
+        calls += 1
+        if calls % 3 == 0:
+            raise ConnectionError("connection reset")
+        if calls % 3 == 1:
+            await asyncio.sleep(1)
+        return 500
+
+    runner = OpenLoopRunner(send, dict, [RateStage(200, 0.1)], start_rps=200, timeout_s=0.05, max_in_flight=5)
+    report = await runner.run()
+
+    assert report["requests"] == 20
+    assert report["ok"] == 0
+    assert report["errors"] == 20
+    assert set(report["statuses"]) <= {"500", "error", "timeout", "dropped"}
+    assert report["statuses"]["timeout"] > 0
+    assert report["statuses"]["error"] > 0
+
+
+@pytest.mark.asyncio
+async def test_open_loop_marks_run_invalid_on_drops():
+    """Тест: запросы сверх max_in_flight не попадают в гистограмму, прогон помечается невалидным"""
+    async def send(payload):
+        await asyncio.sleep(0.2)
+        return 200
+
+    runner = OpenLoopRunner(send, dict, [RateStage(200, 0.1)], start_rps=200, max_in_flight=5)
+    report = await runner.run()
+
+    assert report["requests"] == 20
+    assert report["dropped"] == 15
+    assert report["drop_rate"] == pytest.approx(0.75)
+    assert report["latency"]["count"] == 5
+    assert not report["valid"]
+    assert "INVALID" in format_report(report)
@@ -0,0 +1,213 @@
+"""
+Тесты для метрик мониторинга
+"""
+import asyncio
+import gc
+import os
+import subprocess
+import sys
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+from prometheus_client.parser import text_string_to_metric_families
+from main import app
+from api.dependencies import get_transaction_service
+from monitoring.metrics import metrics_registry, observe_redis
+from monitoring.runtime import EventLoopLagMonitor, GCPauseMonitor
+from repositories.redis_transaction_repository import RedisTransactionRepository
+from services.scoring_service_impl import ScoringServiceImpl
+from services.transaction_service_impl import TransactionServiceImpl
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_request_records_stage_and_redis_metrics():
+    """Тест: запрос пишет метрики запроса, этапов, Redis и длины истории"""
+    service = TransactionServiceImpl(
+        repository=RedisTransactionRepository(client=fakeredis.FakeAsyncRedis()),
+        scoring_service=ScoringServiceImpl(),
+        statistics_mode="incremental"
+    )
+    app.dependency_overrides[get_transaction_service] = lambda: service
+    endpoint = "/api/v1/transactions/"
+    before = {
+        "requests": _sample(
+            "antifraud_requests_total", method="POST", endpoint=endpoint, status_code="200"
+        ),
+        "latency": _sample("antifraud_request_duration_seconds_count", method="POST", endpoint=endpoint),
+        "ingest": _sample("antifraud_stage_duration_seconds_count", stage="ingest"),
+        "scoring": _sample("antifraud_stage_duration_seconds_count", stage="scoring"),
+        "evalsha": _sample("antifraud_redis_commands_total", command="evalsha", status="ok"),
+        "history": _sample("antifraud_customer_history_length_count", source="aggregates"),
+    }
+
+    try:
+        response = TestClient(app).post(endpoint, json={
+            "customer_id": "customer_123",
+            "transaction_id": "txn_456",
+            "amount": 100.50,
+            "currency": "USD",
+            "type": 78,
+            "merchant_id": "merchant_789",
+            "card_bin": "411111",
+            "ip_address": "192.168.1.1",
+            "device_id": "device_001",
+            "location": "US-NY",
+            "channel": "online",
+            "timestamp": "2023-01-01T10:00:00Z"
+        })
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert _sample(
+        "antifraud_requests_total", method="POST", endpoint=endpoint, status_code="200"
+    ) == before["requests"] + 1
+    assert _sample(
+        "antifraud_request_duration_seconds_count", method="POST", endpoint=endpoint
+    ) == before["latency"] + 1
+    assert _sample("antifraud_stage_duration_seconds_count", stage="ingest") == before["ingest"] + 1
+    assert _sample("antifraud_stage_duration_seconds_count", stage="scoring") == before["scoring"] + 1
+    assert _sample("antifraud_redis_commands_total", command="evalsha", status="ok") == before["evalsha"] + 1
+    assert _sample("antifraud_customer_history_length_count", source="aggregates") == before["history"] + 1
+    assert _sample("antifraud_active_requests") == 0
+
+
+def test_metrics_endpoint_content_type():
+    """Тест: /metrics отдает текстовый формат Prometheus с правильным типом"""
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE_LATEST
+    assert "antifraud_stage_duration_seconds" in response.text
+
+
+# Воркер: увеличивает счетчик запросов и gauge активных запросов, печатает свой pid
+_WORKER_SCRIPT = """
+import os
+from monitoring.metrics import ACTIVE_REQUESTS, REQUEST_COUNT
+REQUEST_COUNT.labels(method="POST", endpoint="/api/v1/transactions/", status_code="200").inc()
+ACTIVE_REQUESTS.inc()
+print(os.getpid())
+"""
+
+
+def _exposed_samples(registry) -> dict:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(generate_latest(registry).decode())
+        for sample in family.samples
+    }
+
+
+def test_multiprocess_metrics_aggregate_workers(tmp_path):
+    """Тест: в многопроцессном режиме метрики суммируются по воркерам"""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    pids = [
+        int(subprocess.run(
+            [sys.executable, "-c", _WORKER_SCRIPT],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1])
+        for _ in range(2)
+    ]
+
+    samples = _exposed_samples(metrics_registry(str(tmp_path)))
+    request_key = (
+        "antifraud_requests_total",
+        (("endpoint", "/api/v1/transactions/"), ("method", "POST"), ("status_code", "200"))
+    )
+    assert samples[request_key] == 2
+    assert samples[("antifraud_active_requests", ())] == 2
+
+    # После выхода воркера его live gauge больше не учитывается, счетчики сохраняются
+    # (мастер gunicorn вызывает то же в child_exit, см. gunicorn.conf.py)
+    multiprocess.mark_process_dead(pids[0], str(tmp_path))
+    samples = _exposed_samples(metrics_registry(str(tmp_path)))
+    assert samples[request_key] == 2
+    assert samples[("antifraud_active_requests", ())] == 1
+
+
+def test_gc_pause_monitor_records_collections():
+    """Тест: пауза сборки мусора попадает в метрики поколения"""
+    monitor = GCPauseMonitor()
+    before = _sample("antifraud_gc_pause_seconds_total", generation="2")
+
+    monitor.start()
+    try:
+        gc.collect()
+    finally:
+        monitor.close()
+
+    assert _sample("antifraud_gc_pause_seconds_total", generation="2") > before
+    assert _sample("antifraud_gc_last_pause_seconds", generation="2") > 0
+
+
+@pytest.mark.asyncio
+async def test_event_loop_lag_monitor_detects_blocking():
+    """Тест: блокировка event loop видна в задержке пробуждения"""
+    monitor = EventLoopLagMonitor(interval_ms=10)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0)
+        # Синхронная работа в loop задерживает пробуждение задачи монитора
+        blocked_until = asyncio.get_running_loop().time() + 0.05
+        while asyncio.get_running_loop().time() < blocked_until:
+            pass
+        # Монитор успевает проснуться один раз, до следующего измерения
+        await asyncio.sleep(0.005)
+    finally:
+        await monitor.close()
+
+    assert _sample("antifraud_event_loop_lag_seconds") >= 0.03
+
+
+@pytest.mark.asyncio
+async def test_observe_redis_separates_cancellation_from_errors():
+    """Тест: отмена обращения по дедлайну не считается ошибкой Redis"""
+    before = {
+        status: _sample("antifraud_redis_commands_total", command="test_command", status=status)
+        for status in ("error", "cancelled")
+    }
+
+    async def failing():
+        raise ConnectionError("connection reset")
+
+    with pytest.raises(ConnectionError):
+        await observe_redis("test_command", failing())
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(observe_redis("test_command", asyncio.sleep(1)), 0.01)
+
+    assert _sample("antifraud_redis_commands_total", command="test_command", status="error") == before["error"] + 1
+    assert _sample(
+        "antifraud_redis_commands_total", command="test_command", status="cancelled"
+    ) == before["cancelled"] + 1
+
+
+# Мастер: загружает конфигурацию gunicorn и вызывает child_exit для воркера
+_MASTER_SCRIPT = """
+import runpy, sys, types
+config = runpy.run_path("gunicorn.conf.py")
+config["child_exit"](None, types.SimpleNamespace(pid={pid}))
+print("monitoring.metrics" in sys.modules)
+"""
+
+
+def test_gunicorn_child_exit_does_not_import_app_metrics(tmp_path):
+    """Тест: child_exit мастера удаляет файлы воркера, не создавая метрик приложения"""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    pid = int(subprocess.run(
+        [sys.executable, "-c", _WORKER_SCRIPT],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout.strip().splitlines()[-1])
+    assert any(str(pid) in name and name.startswith("gauge_livesum") for name in os.listdir(tmp_path))
+
+    imported = subprocess.run(
+        [sys.executable, "-c", _MASTER_SCRIPT.format(pid=pid)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout.strip().splitlines()[-1]
+
+    assert imported == "False"
+    assert not any(name.startswith("gauge_livesum") for name in os.listdir(tmp_path))
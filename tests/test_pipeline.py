@@ -0,0 +1,92 @@
+"""
+Тесты для графа этапов обработки
+"""
+import asyncio
+import time
+import pytest
+from services.pipeline import Stage, StagePipeline
+from utils.deadline import Deadline
+
+
+def _sleeping_stage(name: str, delay: float, depends_on=(), log=None) -> Stage:
+    """Этап, который ждет delay секунд и возвращает свое имя"""
+    async def run(context, dependencies):
+        if log is not None:
+            log.append((name, dict(dependencies)))
+        await asyncio.sleep(delay)
+        return name
+
+    return Stage(name=name, run=run, depends_on=depends_on)
+
+
+def test_pipeline_orders_stages_by_dependencies():
+    """Тест: этапы упорядочиваются по зависимостям независимо от порядка объявления"""
+    pipeline = StagePipeline([
+        _sleeping_stage("score", 0, depends_on=("features",)),
+        _sleeping_stage("features", 0, depends_on=("statistics",)),
+        _sleeping_stage("statistics", 0),
+    ])
+
+    assert pipeline.stage_names == ["statistics", "features", "score"]
+
+
+@pytest.mark.parametrize("stages", [
+    [_sleeping_stage("a", 0, depends_on=("b",)), _sleeping_stage("b", 0, depends_on=("a",))],
+    [_sleeping_stage("a", 0, depends_on=("missing",))],
+    [_sleeping_stage("a", 0), _sleeping_stage("a", 0)],
+])
+def test_pipeline_rejects_invalid_graph(stages):
+    """Тест: циклы, необъявленные зависимости и повторные имена отклоняются"""
+    with pytest.raises(ValueError):
+        StagePipeline(stages)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_independent_stages_concurrently():
+    """Тест: задержки независимых этапов не складываются, зависимые получают результаты"""
+    log = []
+    pipeline = StagePipeline([
+        _sleeping_stage("write", 0.05, log=log),
+        _sleeping_stage("statistics", 0.05, depends_on=("write",), log=log),
+        _sleeping_stage("scoring", 0.1, log=log),
+    ])
+
+    started = time.monotonic()
+    result = await pipeline.execute(context=None)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.15
+    assert result.results == {"write": "write", "statistics": "statistics", "scoring": "scoring"}
+    assert ("statistics", {"write": "write"}) in log
+    assert set(result.timings_ms) == {"write", "statistics", "scoring"}
+    assert result.timings_ms["scoring"] >= 100
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stage_fallback_on_deadline():
+    """Тест: этап с fallback заменяется им по истечении бюджета"""
+    async def fallback(context):
+        return f"fallback:{context}"
+
+    slow = _sleeping_stage("scoring", 1)
+    slow.fallback = fallback
+    pipeline = StagePipeline([slow])
+
+    result = await pipeline.execute(context="txn", deadline=Deadline(20))
+
+    assert result.results["scoring"] == "fallback:txn"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_error_cancels_other_stages():
+    """Тест: ошибка этапа отменяет остальные и пробрасывается"""
+    async def fail(context, dependencies):
+        raise RuntimeError("redis unavailable")
+
+    slow = _sleeping_stage("scoring", 1)
+    pipeline = StagePipeline([Stage(name="write", run=fail), slow])
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError):
+        await pipeline.execute(context=None)
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,348 @@
+"""
+Тесты для Redis репозитория (in-memory заглушка Redis через fakeredis)
+"""
+import json
+import pytest
+import fakeredis
+from unittest.mock import AsyncMock, MagicMock
+from models.transaction import Transaction
+from repositories.redis_transaction_repository import RedisTransactionRepository
+from repositories.codecs import BinaryTransactionCodec
+from services.transaction_service_impl import TransactionServiceImpl
+from utils.time_windows import bucket_of, parse_timestamp_ms, stale_buckets, summarize_packed_history
+
+
+def _make_transaction(**overrides) -> Transaction:
+    """Создать тестовую транзакцию"""
+    transaction_data = {
+        "customer_id": "customer_123",
+        "transaction_id": "txn_456",
+        "amount": 100.50,
+        "currency": "USD",
+        "type": 78,
+        "merchant_id": "merchant_789",
+        "card_bin": "411111",
+        "ip_address": "192.168.1.1",
+        "device_id": "device_001",
+        "location": "US-NY",
+        "channel": "online",
+        "timestamp": "2023-01-01T10:00:00Z"
+    }
+    transaction_data.update(overrides)
+    return Transaction(**transaction_data)
+
+
+def _make_repository(**kwargs) -> RedisTransactionRepository:
+    """Создать репозиторий поверх in-memory Redis"""
+    client = fakeredis.FakeAsyncRedis()
+    return RedisTransactionRepository(client=client, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_incremental_statistics():
+    """Тест инкрементальных агрегатов по клиенту"""
+    repository = _make_repository(statistics_mode="incremental")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_1", amount=100.0, type=78))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_2", amount=50.0, type=78))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_3", amount=30.0, type=55))
+
+    stats = await repository.get_statistics_by_customer("customer_123")
+
+    assert stats["total_transactions"] == 3
+    assert stats["total_amount"] == pytest.approx(180.0)
+    assert stats["avg_amount"] == pytest.approx(60.0)
+    assert stats["transaction_count_by_type"] == {78: 2, 55: 1}
+
+
+@pytest.mark.asyncio
+async def test_incremental_statistics_empty_customer():
+    """Тест статистики по клиенту без истории"""
+    repository = _make_repository(statistics_mode="incremental")
+
+    stats = await repository.get_statistics_by_customer("unknown")
+
+    assert stats["total_transactions"] == 0
+    assert stats["avg_amount"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_incremental_mode_does_not_read_history():
+    """Тест: в инкрементальном режиме сервис не читает историю клиента"""
+    repository = _make_repository(statistics_mode="incremental")
+    repository.get_transactions_by_customer = AsyncMock()
+    service = TransactionServiceImpl(
+        repository=repository,
+        scoring_service=MagicMock(),
+        statistics_mode="incremental"
+    )
+
+    await repository.add_transaction(_make_transaction(amount=10.0))
+    stats = await service._calculate_statistics("customer_123")
+
+    assert stats["total_transactions"] == 1
+    repository.get_transactions_by_customer.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_window_statistics():
+    """Тест статистики по окнам 3h/6h/12h/24h"""
+    repository = _make_repository(statistics_mode="incremental")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_1", amount=10.0, timestamp="2023-01-01T10:30:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_2", amount=20.0, timestamp="2023-01-01T14:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_3", amount=30.0, timestamp="2023-01-01T19:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_4", amount=40.0, timestamp="2023-01-01T21:30:00Z"))
+
+    reference_ms = parse_timestamp_ms("2023-01-01T22:00:00Z")
+    windows = await repository.get_window_statistics("customer_123", reference_ms)
+
+    assert windows["transaction_count_3h"] == 1
+    assert windows["avg_amount_3h"] == pytest.approx(40.0)
+    assert windows["transaction_count_6h"] == 2
+    assert windows["transaction_count_12h"] == 4
+    assert windows["transaction_count_24h"] == 4
+    assert windows["avg_amount_24h"] == pytest.approx(25.0)
+
+
+@pytest.mark.asyncio
+async def test_window_statistics_drop_stale_buckets():
+    """Тест: бакеты старше 24 часов не учитываются и удаляются"""
+    repository = _make_repository(statistics_mode="incremental")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_1", amount=10.0, timestamp="2023-01-01T10:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_2", amount=20.0, timestamp="2023-01-02T12:00:00Z"))
+
+    reference_ms = parse_timestamp_ms("2023-01-02T12:00:00Z")
+    windows = await repository.get_window_statistics("customer_123", reference_ms)
+
+    assert windows["transaction_count_24h"] == 1
+    assert len(await repository._client.hgetall("windows:customer_123")) == 2
+
+
+@pytest.mark.asyncio
+async def test_statistics_modes_windows_match():
+    """Тест: все режимы расчета статистики дают одинаковые окна"""
+    timestamps = ["2023-01-01T08:00:00Z", "2023-01-01T16:00:00Z", "2023-01-01T21:00:00Z"]
+    reference_ms = parse_timestamp_ms("2023-01-01T22:00:00Z")
+    results = {}
+
+    for mode in ("incremental", "recompute", "packed"):
+        repository = _make_repository(statistics_mode=mode)
+        service = TransactionServiceImpl(
+            repository=repository,
+            scoring_service=MagicMock(),
+            statistics_mode=mode
+        )
+        for index, timestamp in enumerate(timestamps):
+            await repository.add_transaction(
+                _make_transaction(transaction_id=f"txn_{index}", amount=10.0 * (index + 1), timestamp=timestamp)
+            )
+        results[mode] = await service._calculate_statistics("customer_123", reference_ms=reference_ms)
+
+    for mode in ("recompute", "packed"):
+        for hours in (3, 6, 12, 24):
+            assert results["incremental"][f"transaction_count_{hours}h"] == results[mode][f"transaction_count_{hours}h"]
+            assert results["incremental"][f"avg_amount_{hours}h"] == pytest.approx(results[mode][f"avg_amount_{hours}h"])
+
+
+@pytest.mark.asyncio
+async def test_history_zset_trims_expired_entries():
+    """Тест: записи старше CACHE_TTL обрезаются при добавлении новой транзакции"""
+    repository = _make_repository(history_storage="zset")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_old", timestamp="2023-01-01T10:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_mid", timestamp="2023-01-02T09:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_new", timestamp="2023-01-02T11:00:00Z"))
+
+    transactions = await repository.get_transactions_by_customer("customer_123")
+
+    assert [txn.transaction_id for txn in transactions] == ["txn_mid", "txn_new"]
+    last = await repository.get_cached_transaction("customer_123")
+    assert last.transaction_id == "txn_new"
+
+
+@pytest.mark.asyncio
+async def test_history_zset_range_read():
+    """Тест: чтение истории только за нужный диапазон времени"""
+    repository = _make_repository(history_storage="zset")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_1", timestamp="2023-01-01T10:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_2", timestamp="2023-01-01T12:00:00Z"))
+
+    transactions = await repository.get_transactions_by_customer(
+        "customer_123",
+        since_ms=parse_timestamp_ms("2023-01-01T11:00:00Z")
+    )
+
+    assert [txn.transaction_id for txn in transactions] == ["txn_2"]
+
+
+@pytest.mark.asyncio
+async def test_delete_expired_transactions():
+    """Тест ручной очистки истекших записей истории"""
+    repository = _make_repository(history_storage="zset")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_1", timestamp="2023-01-01T10:00:00Z"))
+    await repository.delete_expired_transactions()
+
+    assert await repository.get_transactions_by_customer("customer_123") == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ingest_mode", ["script", "pipeline"])
+@pytest.mark.parametrize("history_storage", ["zset", "list"])
+async def test_ingest_matches_sequential(ingest_mode, history_storage):
+    """Тест: Lua скрипт и pipeline возвращают ту же статистику, что и последовательные команды"""
+    transactions = [
+        _make_transaction(transaction_id="txn_1", amount=10.0, type=78, timestamp="2023-01-01T08:00:00Z"),
+        _make_transaction(transaction_id="txn_2", amount=25.5, type=55, timestamp="2023-01-01T16:00:00Z"),
+        _make_transaction(transaction_id="txn_3", amount=40.0, type=78, timestamp="2023-01-01T21:00:00Z"),
+    ]
+    results = {}
+
+    for mode in (ingest_mode, "sequential"):
+        repository = _make_repository(
+            statistics_mode="incremental",
+            history_storage=history_storage,
+            ingest_mode=mode
+        )
+        for transaction in transactions:
+            results[mode] = await repository.ingest_transaction(transaction)
+        assert len(await repository.get_transactions_by_customer("customer_123")) == 3
+
+    assert results[ingest_mode]["total_transactions"] == 3
+    assert results[ingest_mode]["transaction_count_by_type"] == {78: 2, 55: 1}
+    for key, value in results["sequential"].items():
+        if isinstance(value, float):
+            assert results[ingest_mode][key] == pytest.approx(value)
+        else:
+            assert results[ingest_mode][key] == value
+
+
+@pytest.mark.asyncio
+async def test_script_ingest_reloads_flushed_script():
+    """Тест: после SCRIPT FLUSH скрипт загружается заново"""
+    repository = _make_repository(statistics_mode="incremental", ingest_mode="script")
+
+    await repository.load_scripts()
+    await repository._client.script_flush()
+    stats = await repository.ingest_transaction(_make_transaction())
+
+    assert stats["total_transactions"] == 1
+    assert stats["transaction_count_24h"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_ingest_single_round_trip():
+    """Тест: в режиме pipeline запись и чтение уходят одним MULTI/EXEC"""
+    repository = _make_repository(statistics_mode="incremental", ingest_mode="pipeline")
+    repository._client.hgetall = AsyncMock(side_effect=AssertionError("отдельный HGETALL"))
+    repository._client.execute_command = AsyncMock(side_effect=AssertionError("отдельная команда"))
+
+    stats = await repository.ingest_transaction(_make_transaction(amount=42.0))
+
+    assert stats["total_transactions"] == 1
+    assert stats["avg_amount_3h"] == pytest.approx(42.0)
+
+
+@pytest.mark.asyncio
+async def test_history_reads_legacy_json_entries():
+    """Тест: история с JSON записями читается после перехода на бинарный кодек"""
+    repository = _make_repository(history_storage="zset", codec=BinaryTransactionCodec())
+    legacy = _make_transaction(transaction_id="txn_legacy", timestamp="2023-01-01T10:00:00Z")
+    await repository._client.zadd(
+        "history:customer_123",
+        {json.dumps(legacy.model_dump()): parse_timestamp_ms(legacy.timestamp)}
+    )
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_new", timestamp="2023-01-01T11:00:00Z"))
+    transactions = await repository.get_transactions_by_customer("customer_123")
+
+    assert [txn.transaction_id for txn in transactions] == ["txn_legacy", "txn_new"]
+
+
+@pytest.mark.asyncio
+async def test_packed_history_statistics():
+    """Тест: упакованная история читается как массив и агрегируется векторно"""
+    repository = _make_repository(statistics_mode="packed")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_1", amount=10.0, type=78, timestamp="2023-01-01T10:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_2", amount=30.0, type=55, timestamp="2023-01-01T11:00:00Z"))
+
+    records = await repository.get_packed_history("customer_123")
+    stats = summarize_packed_history(records, parse_timestamp_ms("2023-01-01T11:00:00Z"))
+
+    assert records["amount"].tolist() == [10.0, 30.0]
+    assert stats["total_transactions"] == 2
+    assert stats["avg_amount"] == pytest.approx(20.0)
+    assert stats["transaction_count_by_type"] == {55: 1, 78: 1}
+    assert stats["transaction_count_3h"] == 2
+
+
+@pytest.mark.asyncio
+async def test_packed_history_compaction():
+    """Тест: устаревшие записи упакованной истории удаляются при чтении"""
+    repository = _make_repository(statistics_mode="packed")
+
+    await repository.add_transaction(_make_transaction(transaction_id="txn_1", timestamp="2023-01-01T10:00:00Z"))
+    await repository.add_transaction(_make_transaction(transaction_id="txn_2", timestamp="2023-01-03T10:00:00Z"))
+
+    records = await repository.get_packed_history("customer_123")
+    stored = await repository._client.get("packed:customer_123")
+
+    assert len(records) == 1
+    assert len(stored) == records.itemsize
+
+
+@pytest.mark.asyncio
+async def test_ingest_batch_matches_sequential():
+    """Тест: пакетная запись дает ту же статистику, что и запись по одной транзакции"""
+    transactions = [
+        _make_transaction(customer_id="customer_a", transaction_id="txn_1", amount=10.0, timestamp="2023-01-01T08:00:00Z"),
+        _make_transaction(customer_id="customer_b", transaction_id="txn_2", amount=20.0, timestamp="2023-01-01T09:00:00Z"),
+        _make_transaction(customer_id="customer_a", transaction_id="txn_3", amount=30.0, type=55, timestamp="2023-01-01T20:00:00Z"),
+        _make_transaction(customer_id="customer_a", transaction_id="txn_4", amount=40.0, timestamp="2023-01-01T21:00:00Z"),
+    ]
+
+    batch_repository = _make_repository(statistics_mode="incremental", ingest_mode="pipeline")
+    await batch_repository.ingest_transaction(
+        _make_transaction(customer_id="customer_a", transaction_id="txn_0", amount=5.0, timestamp="2023-01-01T07:00:00Z")
+    )
+    batch = await batch_repository.ingest_batch(transactions)
+
+    sequential_repository = _make_repository(statistics_mode="incremental", ingest_mode="pipeline")
+    await sequential_repository.ingest_transaction(
+        _make_transaction(customer_id="customer_a", transaction_id="txn_0", amount=5.0, timestamp="2023-01-01T07:00:00Z")
+    )
+    sequential = [await sequential_repository.ingest_transaction(t) for t in transactions]
+
+    for batch_stats, sequential_stats in zip(batch, sequential):
+        for key, value in sequential_stats.items():
+            if isinstance(value, float):
+                assert batch_stats[key] == pytest.approx(value)
+            else:
+                assert batch_stats[key] == value
+    assert len(await batch_repository.get_transactions_by_customer("customer_a")) == 4
+
+
+@pytest.mark.asyncio
+async def test_ingest_batch_drops_stale_buckets_for_out_of_order_batch():
+    """Тест: устаревшие бакеты отсчитываются от самой новой транзакции клиента, а не от последней в пакете"""
+    newest_ms = parse_timestamp_ms("2023-01-02T12:00:00Z")
+    transactions = [
+        _make_transaction(transaction_id="txn_new", amount=10.0, timestamp="2023-01-02T12:00:00Z"),
+        # На 28 часов старше первой транзакции - вне самого длинного окна
+        _make_transaction(transaction_id="txn_old", amount=20.0, timestamp="2023-01-01T08:00:00Z"),
+    ]
+    repository = _make_repository(statistics_mode="incremental", ingest_mode="pipeline")
+
+    await repository.ingest_batch(transactions)
+
+    raw = await repository.client.hgetall(repository._windows_key("customer_123"))
+    buckets = repository._parse_buckets(raw)
+    assert bucket_of(newest_ms) in buckets
+    assert stale_buckets(buckets, bucket_of(newest_ms)) == []
+    windows = await repository.get_window_statistics("customer_123", newest_ms)
+    assert windows["transaction_count_24h"] == 1
+    assert windows["avg_amount_24h"] == pytest.approx(10.0)
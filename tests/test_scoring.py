@@ -0,0 +1,236 @@
+"""
+Тесты для сервисов оценки
+"""
+import asyncio
+import random
+import numpy as np
+import pytest
+from unittest.mock import patch
+from models.transaction import Transaction
+from services.scoring_service_impl import ScoringServiceImpl
+from services.batching_scoring_service import MicroBatchingScoringService
+from services.vectorized_scoring import TransactionColumns, score_columns, score_transactions
+from services.model_backend import MODEL_FEATURES, LogisticModel, ProcessPoolModelBackend, build_model_features
+from services.feature_assembler import FeatureAssembler
+from services.model_export import export_model
+
+
+def _make_transaction(**overrides) -> Transaction:
+    """Создать тестовую транзакцию"""
+    transaction_data = {
+        "customer_id": "customer_123",
+        "transaction_id": "txn_456",
+        "amount": 100.50,
+        "currency": "USD",
+        "type": 78,
+        "merchant_id": "merchant_789",
+        "card_bin": "411111",
+        "ip_address": "192.168.1.1",
+        "device_id": "device_001",
+        "location": "US-NY",
+        "channel": "online",
+        "timestamp": "2023-01-01T10:00:00Z"
+    }
+    transaction_data.update(overrides)
+    return Transaction(**transaction_data)
+
+
+@pytest.mark.asyncio
+async def test_score_batch_preserves_order():
+    """Тест: пакетная оценка возвращает результаты в порядке транзакций"""
+    service = ScoringServiceImpl(rng=random.Random(42))
+    transactions = [
+        _make_transaction(transaction_id=f"txn_{i}", amount=400.0 * (i + 1), is_velocity_alert=i % 2 == 0)
+        for i in range(5)
+    ]
+
+    results = await service.score_batch(transactions)
+
+    expected = score_transactions(transactions, random.Random(42))
+    assert [result.scoring for result in results] == expected
+    assert [result.is_fraud for result in results] == [score > 0.7 for score in expected]
+
+
+@pytest.mark.asyncio
+async def test_micro_batching_groups_concurrent_calls():
+    """Тест: конкурентные вызовы оцениваются одним пакетом"""
+    inner = ScoringServiceImpl()
+    service = MicroBatchingScoringService(inner, max_batch_size=4, max_wait_ms=50)
+    transactions = [_make_transaction(transaction_id=f"txn_{i}", amount=float(i + 1)) for i in range(4)]
+
+    async def model_scores(batch, customer_stats=None):
+        return [transaction.amount / 10 for transaction in batch]
+
+    with patch.object(inner, "_get_ml_model_scores", side_effect=model_scores) as model_call:
+        results = await asyncio.gather(*(service.score_transaction(t) for t in transactions))
+
+    assert model_call.call_count == 1
+    assert [result.scoring for result in results] == pytest.approx([0.1, 0.2, 0.3, 0.4])
+
+
+@pytest.mark.asyncio
+async def test_micro_batching_flushes_after_wait():
+    """Тест: неполный пакет отправляется по истечении времени ожидания"""
+    service = MicroBatchingScoringService(ScoringServiceImpl(), max_batch_size=100, max_wait_ms=1)
+
+    result = await asyncio.wait_for(service.score_transaction(_make_transaction()), timeout=1)
+
+    assert 0.0 <= result.scoring <= 1.0
+
+
+def test_vectorized_scoring_matches_scalar():
+    """Тест: векторная оценка совпадает со скалярной при одинаковом seed"""
+    transactions = [
+        _make_transaction(
+            transaction_id=f"txn_{i}",
+            amount=amount,
+            type=txn_type,
+            is_velocity_alert=velocity,
+            is_location_alert=location,
+            is_device_alert=device
+        )
+        for i, (amount, txn_type, velocity, location, device) in enumerate([
+            (100.0, 55, None, None, None),
+            (500.0, 78, True, False, None),
+            (500.01, 80, False, True, True),
+            (1000.0, 85, True, True, True),
+            (1000.01, 60, None, True, False),
+            (25000.0, 78, True, True, True),
+        ])
+    ]
+
+    scalar_service = ScoringServiceImpl(rng=random.Random(42))
+    scalar = [scalar_service._rule_based_score(t) for t in transactions]
+    vectorized = score_transactions(transactions, random.Random(42))
+
+    assert vectorized == scalar
+
+
+def test_score_columns_offline_batch():
+    """Тест: офлайн оценка колонок без объектов транзакций"""
+    columns = TransactionColumns(
+        amount=np.array([10.0, 2000.0]),
+        type=np.array([55, 78]),
+        is_velocity_alert=np.array([False, True]),
+        is_location_alert=np.array([False, True]),
+        is_device_alert=np.array([False, True]),
+    )
+
+    scores = score_columns(columns, jitter=np.zeros(2))
+
+    assert scores.tolist() == pytest.approx([0.3, 1.0])
+
+
+@pytest.mark.asyncio
+async def test_process_pool_backend_matches_model(tmp_path):
+    """Тест: оценки из пула процессов совпадают с расчетом модели в процессе"""
+    weights = np.random.default_rng(0).normal(scale=0.1, size=len(MODEL_FEATURES))
+    model = LogisticModel(weights=weights, bias=-3.0)
+    model_path = str(tmp_path / "model.npz")
+    model.save(model_path)
+
+    backend = ProcessPoolModelBackend(model_path=model_path, max_workers=1)
+    service = ScoringServiceImpl(model_backend=backend)
+    transactions = [
+        _make_transaction(transaction_id=f"txn_{i}", amount=100.0 * (i + 1), is_velocity_alert=i % 2 == 0)
+        for i in range(20)
+    ]
+
+    try:
+        await backend.start()
+        results = await service.score_batch(transactions)
+        single = await service.score_transaction(transactions[3])
+    finally:
+        await backend.close()
+
+    expected = LogisticModel.load(model_path).predict(build_model_features(transactions))
+    assert [result.scoring for result in results] == pytest.approx(expected.tolist())
+    assert single.scoring == pytest.approx(expected[3])
+
+
+def test_model_artifact_with_other_features_is_rejected(tmp_path):
+    """Тест: артефакт с другим набором признаков не загружается"""
+    model_path = str(tmp_path / "model.npz")
+    np.savez(model_path, weights=np.ones(2), bias=np.float64(0.0), feature_names=np.array(["a", "b"]))
+
+    with pytest.raises(ValueError):
+        LogisticModel.load(model_path)
+
+
+def test_feature_assembler_encodes_transaction_and_windows():
+    """Тест: вектор признаков содержит кодировки категорий и окна клиента"""
+    assembler = FeatureAssembler(windows_hours=(3, 24))
+    transaction = _make_transaction(amount=300.0, currency="EUR", channel="pos", transaction_category="wire")
+    stats = {
+        "transaction_count_3h": 2, "avg_amount_3h": 50.0,
+        "transaction_count_24h": 9, "avg_amount_24h": 150.0,
+    }
+
+    vector = assembler.assemble(transaction, stats)
+    features = dict(zip(assembler.feature_names, vector.tolist()))
+
+    assert vector.dtype == np.float32 and vector.shape == (assembler.width,)
+    assert features["currency=EUR"] == 1.0 and features["currency=USD"] == 0.0
+    assert features["channel=pos"] == 1.0
+    assert features["location=US-NY"] == 1.0
+    assert features["type=78"] == 1.0
+    assert features["category=wire"] == 1.0
+    assert features["log_count_24h"] == pytest.approx(np.log1p(9))
+    assert features["amount_to_avg_24h"] == pytest.approx(2.0)
+
+    unknown = dict(zip(assembler.feature_names, assembler.assemble(_make_transaction(currency="XYZ")).tolist()))
+    assert unknown["currency=other"] == 1.0
+    assert unknown["category=other"] == 1.0
+    assert unknown["log_count_24h"] == 0.0
+
+
+def test_feature_assembler_batch_fills_preallocated_matrix():
+    """Тест: пакетная сборка заполняет предвыделенную матрицу без остатков прошлого пакета"""
+    assembler = FeatureAssembler()
+    buffer = assembler.allocate(8)
+    buffer.fill(7.0)
+    transactions = [_make_transaction(amount=10.0 * (i + 1)) for i in range(3)]
+    stats = [{"transaction_count_24h": i} for i in range(3)]
+
+    rows = assembler.assemble_batch(transactions, stats, out=buffer)
+
+    assert rows.shape == (3, assembler.width)
+    assert np.shares_memory(rows, buffer)
+    for row, transaction, customer_stats in zip(rows, transactions, stats):
+        np.testing.assert_array_equal(row, assembler.assemble(transaction, customer_stats))
+
+    with pytest.raises(ValueError):
+        assembler.assemble_batch(transactions, out=assembler.allocate(2))
+
+
+@pytest.mark.asyncio
+async def test_exported_model_follows_rules(tmp_path):
+    """Тест: экспортированная эталонная модель загружается бэкендом и повторяет правила"""
+    model_path = str(tmp_path / "artifacts" / "model.npz")
+    export_model(model_path, samples=5000)
+
+    backend = ProcessPoolModelBackend(model_path=model_path, max_workers=1)
+    service = ScoringServiceImpl(model_backend=backend)
+    low_risk = _make_transaction(amount=20.0, type=60)
+    high_risk = _make_transaction(
+        amount=1500.0, type=78, is_velocity_alert=True, is_location_alert=True, is_device_alert=True
+    )
+
+    try:
+        await backend.start()
+        results = await service.score_batch([low_risk, high_risk])
+    finally:
+        await backend.close()
+
+    assert results[0].scoring < 0.5
+    assert results[1].scoring > 0.7
+    assert results[1].is_fraud
+
+
+@pytest.mark.asyncio
+async def test_process_pool_backend_fails_fast_without_artifact(tmp_path):
+    """Тест: без артефакта бэкенд не стартует и подсказывает команду экспорта"""
+    backend = ProcessPoolModelBackend(model_path=str(tmp_path / "missing.npz"), max_workers=1)
+
+    with pytest.raises(FileNotFoundError, match="services.model_export"):
+        await backend.start()
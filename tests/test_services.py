@@ -1,12 +1,42 @@
 """
 Тесты для сервисов
 """
+import asyncio
+import time
+import fakeredis
 import pytest
+from typing import Optional
 from unittest.mock import AsyncMock, MagicMock
 from services.transaction_service import TransactionService
 from services.scoring_service import ScoringService
+from services.scoring_service_impl import ScoringServiceImpl
+from services.transaction_service_impl import TransactionServiceImpl
+from repositories.redis_transaction_repository import RedisTransactionRepository
 from models.transaction import Transaction
-from models.scoring import ScoringResult
+from models.scoring import ModelScore, ScoringResult
+from monitoring.metrics import STAGE_TIMEOUTS
+from config.settings import settings
+from utils.logger import logger, log_request_summary
+
+
+def _make_transaction(**overrides) -> Transaction:
+    """Создать тестовую транзакцию"""
+    transaction_data = {
+        "customer_id": "customer_123",
+        "transaction_id": "txn_456",
+        "amount": 100.50,
+        "currency": "USD",
+        "type": 78,
+        "merchant_id": "merchant_789",
+        "card_bin": "411111",
+        "ip_address": "192.168.1.1",
+        "device_id": "device_001",
+        "location": "US-NY",
+        "channel": "online",
+        "timestamp": "2023-01-01T10:00:00Z"
+    }
+    transaction_data.update(overrides)
+    return Transaction(**transaction_data)
 
 
 class MockTransactionService(TransactionService):
@@ -37,20 +67,18 @@ class MockTransactionService(TransactionService):
 class MockScoringService(ScoringService):
     """Мок для тестирования ScoringService"""
 
-    async def score_transaction(self, transaction: Transaction) -> ScoringResult:
+    async def score_transaction(self, transaction: Transaction) -> ModelScore:
         # Пустая реализация для тестирования
-        return ScoringResult(
-            customer_id=transaction.customer_id,
-            transaction_id=transaction.transaction_id,
-            scoring=0.5,
-            processed_at="2023-01-01T10:00:00Z"
-        )
+        return ModelScore(scoring=0.5, is_fraud=False)
 
-    async def _get_ml_model_score(self, transaction: Transaction) -> float:
+    async def _get_ml_model_score(self, transaction: Transaction, customer_stats: Optional[dict] = None) -> float:
         return 0.5
 
-    async def _handle_model_timeout(self, transaction: Transaction) -> float:
-        return 0.5
+    async def fallback_result(self, transaction: Transaction) -> ModelScore:
+        return await self.score_transaction(transaction)
+
+    async def _handle_model_timeout(self, transaction: Transaction) -> ModelScore:
+        return ModelScore(scoring=0.5, is_fraud=False)
 
 
 @pytest.mark.asyncio
@@ -72,6 +100,7 @@ async def test_scoring_service_interface():
 
     # Проверяем, что методы существуют
     assert hasattr(service, 'score_transaction')
+    assert hasattr(service, 'fallback_result')
     assert hasattr(service, '_get_ml_model_score')
     assert hasattr(service, '_handle_model_timeout')
 
@@ -103,4 +132,123 @@ async def test_transaction_service_process():
 
     assert result.customer_id == "customer_123"
     assert result.transaction_id == "txn_456"
-    assert result.scoring == 0.5
\ No newline at end of file
+    assert result.scoring == 0.5
+
+
+@pytest.fixture
+def log_records():
+    """Записи логгера, попавшие в тестовый sink"""
+    records = []
+    handler_id = logger.add(lambda message: records.append(message.record), level="DEBUG")
+    try:
+        yield records
+    finally:
+        logger.remove(handler_id)
+
+
+def test_request_summary_sampling(monkeypatch, log_records):
+    """Тест: успешные запросы сэмплируются, медленные логируются всегда"""
+    monkeypatch.setattr(settings, "LOG_SUCCESS_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "LOG_SLOW_REQUEST_MS", 100.0)
+
+    log_request_summary("Транзакция обработана", 5.0, transaction_id="txn_fast")
+    log_request_summary("Транзакция обработана", 150.0, transaction_id="txn_slow")
+
+    assert [record["extra"]["transaction_id"] for record in log_records] == ["txn_slow"]
+    assert log_records[0]["level"].name == "WARNING"
+    assert log_records[0]["extra"]["duration_ms"] == 150.0
+
+
+def test_request_summary_is_single_structured_line(monkeypatch, log_records):
+    """Тест: итоговая строка содержит поля запроса в тексте и в extra"""
+    monkeypatch.setattr(settings, "LOG_SUCCESS_SAMPLE_RATE", 1.0)
+
+    log_request_summary("Транзакция обработана", 1.5, transaction_id="txn_456", scoring=0.42)
+
+    assert len(log_records) == 1
+    record = log_records[0]
+    assert record["level"].name == "INFO"
+    assert record["extra"] == {"transaction_id": "txn_456", "scoring": 0.42, "duration_ms": 1.5}
+    assert record["message"] == "Транзакция обработана transaction_id=txn_456 scoring=0.42 duration_ms=1.5"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fast_json", [True, False])
+async def test_build_result_sets_model_fields(monkeypatch, fast_json):
+    """Тест: поля статистики учитываются в model_fields_set на обоих путях"""
+    monkeypatch.setattr(settings, "FAST_JSON_ENABLED", fast_json)
+    transaction = _make_transaction()
+    model_score = await MockScoringService().score_transaction(transaction)
+    service = TransactionServiceImpl(repository=MagicMock(), scoring_service=MockScoringService())
+
+    result = service._build_result(transaction, model_score, {"transaction_count_24h": 3}, 12)
+
+    dumped = result.model_dump(exclude_unset=True)
+    assert dumped["customer_transaction_count_24h"] == 3
+    assert dumped["processing_time_ms"] == 12
+    assert dumped["scoring"] == 0.5
+    assert dumped["is_fraud"] is False
+
+
+@pytest.mark.asyncio
+async def test_process_transaction_falls_back_when_budget_exceeded():
+    """Тест: этап, не уложившийся в бюджет, заменяется fallback, запись завершается в фоне"""
+    repository = RedisTransactionRepository(client=fakeredis.FakeAsyncRedis())
+    ingest = repository.ingest_transaction
+
+    async def slow_ingest(transaction):
+        await asyncio.sleep(0.2)
+        return await ingest(transaction)
+
+    repository.ingest_transaction = slow_ingest
+    service = TransactionServiceImpl(
+        repository=repository,
+        scoring_service=ScoringServiceImpl(),
+        statistics_mode="incremental",
+        processing_budget_ms=50
+    )
+    timeouts_before = STAGE_TIMEOUTS.labels(stage="ingest")._value.get()
+
+    started = time.monotonic()
+    result = await service.process_transaction(_make_transaction())
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.15
+    # Оценка не зависит от записи и успевает выполниться параллельно с ней
+    assert result.scoring != settings.DEFAULT_SCORING_VALUE
+    assert result.customer_transaction_count_24h == 0
+    assert STAGE_TIMEOUTS.labels(stage="ingest")._value.get() == timeouts_before + 1
+
+    # Запись не отменяется и завершается после ответа
+    await asyncio.sleep(0.3)
+    stats = await repository.get_statistics_by_customer("customer_123")
+    assert stats["total_transactions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_process_transaction_uses_public_scoring_fallback():
+    """Тест: при таймауте оценки используется fallback_result интерфейса ScoringService"""
+    class SlowScoringService(ScoringService):
+        async def score_transaction(self, transaction, customer_stats=None):
+            await asyncio.sleep(0.2)
+
+        async def fallback_result(self, transaction):
+            return ModelScore(scoring=0.42, is_fraud=False)
+
+        async def _get_ml_model_score(self, transaction, customer_stats=None):
+            raise AssertionError("не используется")
+
+        async def _handle_model_timeout(self, transaction):
+            raise AssertionError("не используется")
+
+    service = TransactionServiceImpl(
+        repository=RedisTransactionRepository(client=fakeredis.FakeAsyncRedis()),
+        scoring_service=SlowScoringService(),
+        statistics_mode="incremental",
+        processing_budget_ms=50
+    )
+
+    result = await service.process_transaction(_make_transaction())
+
+    assert result.scoring == 0.42
+    assert result.customer_transaction_count_24h == 1
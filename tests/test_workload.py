@@ -0,0 +1,76 @@
+"""
+Тесты для профилей нагрузки генератора трафика
+"""
+from collections import Counter
+from dataclasses import replace
+from datetime import datetime, timezone
+from models.transaction import Transaction
+from load_generator.workload import PROFILES, Workload
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _stream(workload: Workload, size: int) -> list:
+    return [workload.next_transaction(NOW) for _ in range(size)]
+
+
+def test_workload_is_reproducible_from_seed():
+    """Тест: один seed дает ту же последовательность, другой - другую"""
+    first = _stream(Workload(PROFILES["realistic"], seed=42), 200)
+    second = _stream(Workload(PROFILES["realistic"], seed=42), 200)
+    other = _stream(Workload(PROFILES["realistic"], seed=43), 200)
+
+    assert first == second
+    assert first != other
+    # Транзакции проходят валидацию модели запроса
+    Transaction(**first[0])
+
+
+def test_zipf_profile_concentrates_customers():
+    """Тест: в Zipf профиле немного клиентов дают большую долю транзакций"""
+    uniform = Counter(t["customer_id"] for t in _stream(Workload(PROFILES["uniform"], seed=1), 5000))
+    skewed = Counter(t["customer_id"] for t in _stream(Workload(PROFILES["hot"], seed=1), 5000))
+
+    top_share = sum(count for _, count in skewed.most_common(10)) / 5000
+    assert top_share > 0.3
+    assert sum(count for _, count in uniform.most_common(10)) / 5000 < 0.05
+    # Самый активный клиент - первый по рангу
+    assert skewed.most_common(1)[0][0] == "customer_1"
+
+
+def test_bursts_repeat_customer_with_velocity_alert():
+    """Тест: всплеск - серия транзакций одного клиента подряд с velocity флагом"""
+    profile = replace(PROFILES["realistic"], burst_probability=1.0, burst_size=(4, 4))
+    transactions = _stream(Workload(profile, seed=3), 8)
+
+    assert len({t["customer_id"] for t in transactions[:4]}) == 1
+    assert [t["is_velocity_alert"] for t in transactions[:4]] == [False, True, True, True]
+    assert transactions[4]["is_velocity_alert"] is False
+
+
+def test_devices_and_ips_are_reused():
+    """Тест: клиент в основном использует свои постоянные устройства и IP"""
+    workload = Workload(replace(PROFILES["realistic"], customers=1), seed=5)
+    transactions = _stream(workload, 500)
+    customer = workload.customer(0)
+
+    own_devices = sum(t["device_id"] in customer.devices for t in transactions)
+    assert own_devices / len(transactions) > 0.9
+    assert {t["ip_address"] for t in transactions} >= set(customer.ips)
+    assert all(t["is_device_alert"] == (t["device_id"] not in customer.devices) for t in transactions)
+
+
+def test_history_depth_follows_profile():
+    """Тест: глубина предзаполненной истории детерминирована и ограничена профилем"""
+    workload = Workload(PROFILES["realistic"], seed=7)
+    depths = [workload.customer(index).history_depth for index in range(500)]
+
+    assert max(depths) <= PROFILES["realistic"].history_depth_max
+    assert 25 < sorted(depths)[len(depths) // 2] < 100
+
+    history = workload.history_transactions(0, NOW)
+    assert len(history) == depths[0]
+    assert [t["timestamp"] for t in history] == sorted(t["timestamp"] for t in history)
+    assert history[-1]["timestamp"] < "2024-01-01T00:00:00.000Z"
+    assert Workload(PROFILES["realistic"], seed=7).history_transactions(0, NOW) == history
+    assert Workload(PROFILES["uniform"], seed=7).history_transactions(0, NOW) == []
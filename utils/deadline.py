@@ -0,0 +1,82 @@
+"""
+Бюджет времени обработки запроса
+
+Deadline создается в начале обработки транзакции; каждый этап (запись в
+Redis, статистика, оценка) выполняется с таймаутом, равным остатку бюджета.
+Этап, не уложившийся в таймаут, отменяется и заменяется результатом
+fallback, поэтому ответ укладывается в бюджет даже при деградации
+зависимостей. Собственный лимит вызова модели (ML_MODEL_TIMEOUT_MS)
+применяет сервис оценки, так как он действует и для пакетной оценки.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Set, TypeVar
+from monitoring.metrics import STAGE_TIMEOUTS, STAGE_FALLBACKS
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Этапы, продолжающие выполняться в фоне после таймаута
+_background_tasks: Set[asyncio.Future] = set()
+
+
+class Deadline:
+    """Бюджет времени одного запроса"""
+
+    def __init__(self, budget_ms: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            budget_ms: Бюджет в миллисекундах от момента создания
+            clock: Источник монотонного времени
+        """
+        self._clock = clock
+        self._expires_at = clock() + budget_ms / 1000
+
+    def remaining_ms(self) -> float:
+        """Остаток бюджета в миллисекундах (не меньше нуля)"""
+        return max(0.0, (self._expires_at - self._clock()) * 1000)
+
+    async def run(
+        self,
+        stage: str,
+        awaitable: Awaitable[T],
+        fallback: Callable[[], Awaitable[T]],
+        shield: bool = False
+    ) -> T:
+        """
+        Выполнить этап в пределах бюджета
+
+        Args:
+            stage: Имя этапа для метрик и логов
+            awaitable: Корутина этапа
+            fallback: Фабрика корутины с результатом на случай таймаута
+            shield: Не отменять этап по таймауту, а дать ему завершиться в фоне
+                (для записей, которые нельзя терять)
+
+        Returns:
+            Результат этапа или fallback
+        """
+        timeout = self.remaining_ms() / 1000
+        task = asyncio.ensure_future(awaitable)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task) if shield else task, timeout=timeout)
+        except asyncio.TimeoutError:
+            STAGE_TIMEOUTS.labels(stage=stage).inc()
+            logger.warning(f"Этап {stage} не уложился в {timeout * 1000:.0f}ms, используется fallback")
+            if shield:
+                # Держим ссылку на задачу, пока она не завершится
+                _background_tasks.add(task)
+                task.add_done_callback(lambda done: _finish_background_stage(stage, done))
+
+        STAGE_FALLBACKS.labels(stage=stage).inc()
+        return await fallback()
+
+
+def _finish_background_stage(stage: str, task: asyncio.Future) -> None:
+    """Залогировать ошибку этапа, который завершался в фоне после таймаута"""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Ошибка этапа {stage} после таймаута: {task.exception()}")
@@ -1,31 +1,61 @@
 """
 Настройка логгирования
+
+Handler loguru настраивается один раз на процесс. По умолчанию записи
+уходят в stdout из фонового потока через очередь (LOG_ENQUEUE), поэтому
+запись в поток вывода не блокирует event loop. На каждый запрос пишется
+одна итоговая строка (log_request_summary); успешные запросы логируются
+с вероятностью LOG_SUCCESS_SAMPLE_RATE, ошибки и медленные запросы - всегда.
 """
+import random
 import sys
 from loguru import logger
 from config.settings import settings
 
+_TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+
+_configured = False
+
+
 def setup_logger(name: str, level: str = None) -> logger:
     """
     Настройка логгера
 
+    Handler добавляется только при первом вызове; повторные вызовы из других
+    модулей возвращают уже настроенный логгер.
+
     Args:
         name: Имя логгера
-        level: Уровень логирования
+        level: Уровень логирования (учитывается при первом вызове)
 
     Returns:
         Настроенный логгер
     """
+    global _configured
+    if _configured:
+        return logger
+
     # Удаляем стандартный handler
     logger.remove()
 
-    # Добавляем новый handler с форматированием
-    logger.add(
-        sys.stdout,
-        level=level or settings.LOG_LEVEL,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        colorize=True
-    )
+    if settings.LOG_FORMAT == "json":
+        logger.add(
+            sys.stdout,
+            level=level or settings.LOG_LEVEL,
+            serialize=True,
+            enqueue=settings.LOG_ENQUEUE
+        )
+    else:
+        logger.add(
+            sys.stdout,
+            level=level or settings.LOG_LEVEL,
+            format=_TEXT_FORMAT,
+            colorize=sys.stdout.isatty(),
+            enqueue=settings.LOG_ENQUEUE
+        )
 
     # Добавляем handler для файлов (если нужно)
     # logger.add(
@@ -35,4 +65,35 @@ def setup_logger(name: str, level: str = None) -> logger:
     #     format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}"
     # )
 
-    return logger
\ No newline at end of file
+    _configured = True
+    return logger
+
+
+def log_request_summary(message: str, duration_ms: float, **fields) -> None:
+    """
+    Записать итоговую строку запроса
+
+    Медленные запросы (от LOG_SLOW_REQUEST_MS) пишутся всегда с уровнем
+    WARNING, остальные - с уровнем INFO и с вероятностью
+    LOG_SUCCESS_SAMPLE_RATE. Строка собирается только если будет записана.
+    Поля передаются в extra записи (видны в LOG_FORMAT=json).
+
+    Args:
+        message: Текст записи
+        duration_ms: Время обработки запроса
+        **fields: Поля запроса (ID, результат, время этапов)
+    """
+    if duration_ms >= settings.LOG_SLOW_REQUEST_MS:
+        level = "WARNING"
+    elif random.random() < settings.LOG_SUCCESS_SAMPLE_RATE:
+        level = "INFO"
+    else:
+        return
+
+    fields["duration_ms"] = round(duration_ms, 2)
+    logger.bind(**fields).opt(depth=1).log(
+        level,
+        "{} {}",
+        message,
+        " ".join(f"{key}={value}" for key, value in fields.items())
+    )
@@ -0,0 +1,81 @@
+"""
+Ограниченный in-memory кэш с вытеснением по LRU и TTL
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLLRUCache:
+    """
+    Кэш фиксированного размера с вытеснением давно не использованных записей
+    и истечением записей по времени жизни
+
+    Не потокобезопасен: рассчитан на использование из одного event loop.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        on_evict: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_size: Максимальное количество записей
+            ttl_seconds: Время жизни записи в секундах
+            on_evict: Callback с причиной вытеснения (lru, ttl, invalidation)
+            clock: Источник монотонного времени
+        """
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._on_evict = on_evict
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получить значение или None, если записи нет или она истекла"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self._notify("ttl")
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохранить значение, вытеснив самую старую запись при переполнении"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self._entries[key] = (self._clock() + self._ttl_seconds, value)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._notify("lru")
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Удалить запись; возвращает True, если она была в кэше"""
+        if self._entries.pop(key, None) is None:
+            return False
+        self._notify("invalidation")
+        return True
+
+    def clear(self) -> None:
+        """Очистить кэш"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def _notify(self, reason: str) -> None:
+        if self._on_evict is not None:
+            self._on_evict(reason)
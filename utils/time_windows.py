@@ -0,0 +1,178 @@
+"""
+Временные окна для статистики по клиенту
+
+История клиента агрегируется в бакеты фиксированной длины
+(settings.WINDOW_BUCKET_SECONDS). Окно в N часов - это сумма последних
+N * 3600 / WINDOW_BUCKET_SECONDS бакетов, включая бакет текущей транзакции,
+поэтому стоимость расчета окон ограничена числом бакетов и не зависит
+от количества транзакций клиента.
+"""
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from config.settings import settings
+
+
+def parse_timestamp_ms(timestamp: str) -> int:
+    """
+    Преобразовать временную метку ISO 8601 в миллисекунды epoch
+
+    Args:
+        timestamp: Временная метка транзакции (например, 2023-01-01T10:00:00Z)
+
+    Returns:
+        Миллисекунды epoch; текущее время, если метку не удалось разобрать
+    """
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return int(time.time() * 1000)
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return int(parsed.timestamp() * 1000)
+
+
+def format_timestamp_ms(timestamp_ms: int) -> str:
+    """Преобразовать миллисекунды epoch в ISO 8601 с суффиксом Z"""
+    moment = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{timestamp_ms % 1000:03d}Z"
+
+
+def bucket_of(timestamp_ms: int, bucket_seconds: int = None) -> int:
+    """Номер временного бакета для метки в миллисекундах"""
+    bucket_seconds = bucket_seconds or settings.WINDOW_BUCKET_SECONDS
+    return timestamp_ms // (bucket_seconds * 1000)
+
+
+def window_bucket_count(hours: int, bucket_seconds: int = None) -> int:
+    """Количество бакетов, покрывающих окно в заданное число часов"""
+    bucket_seconds = bucket_seconds or settings.WINDOW_BUCKET_SECONDS
+    return max(1, hours * 3600 // bucket_seconds)
+
+
+def bucketize(
+    records: Iterable[Tuple[int, float]],
+    bucket_seconds: int = None
+) -> Dict[int, Tuple[int, float]]:
+    """
+    Сгруппировать записи (timestamp_ms, amount) по бакетам
+
+    Returns:
+        Словарь {номер бакета: (количество, сумма)}
+    """
+    buckets: Dict[int, Tuple[int, float]] = {}
+    for timestamp_ms, amount in records:
+        bucket = bucket_of(timestamp_ms, bucket_seconds)
+        count, total = buckets.get(bucket, (0, 0.0))
+        buckets[bucket] = (count + 1, total + amount)
+    return buckets
+
+
+def summarize_windows(
+    buckets: Dict[int, Tuple[int, float]],
+    reference_bucket: int,
+    windows_hours: Iterable[int] = None,
+    bucket_seconds: int = None
+) -> Dict:
+    """
+    Рассчитать статистику по всем окнам за один проход по бакетам
+
+    Args:
+        buckets: Словарь {номер бакета: (количество, сумма)}
+        reference_bucket: Бакет, которым заканчиваются окна
+        windows_hours: Длины окон в часах
+        bucket_seconds: Длина бакета в секундах
+
+    Returns:
+        Словарь с ключами transaction_count_{N}h, total_amount_{N}h, avg_amount_{N}h
+    """
+    windows_hours = windows_hours or settings.STATISTICS_WINDOWS_HOURS
+    spans = {hours: window_bucket_count(hours, bucket_seconds) for hours in windows_hours}
+    counts = {hours: 0 for hours in windows_hours}
+    totals = {hours: 0.0 for hours in windows_hours}
+
+    for bucket, (count, total) in buckets.items():
+        age = reference_bucket - bucket
+        if age < 0:
+            continue
+        for hours, span in spans.items():
+            if age < span:
+                counts[hours] += count
+                totals[hours] += total
+
+    result = {}
+    for hours in windows_hours:
+        result[f"transaction_count_{hours}h"] = counts[hours]
+        result[f"total_amount_{hours}h"] = totals[hours]
+        result[f"avg_amount_{hours}h"] = totals[hours] / counts[hours] if counts[hours] > 0 else 0.0
+    return result
+
+
+def stale_buckets(
+    buckets: Iterable[int],
+    reference_bucket: int,
+    windows_hours: Iterable[int] = None,
+    bucket_seconds: int = None
+) -> List[int]:
+    """Бакеты, которые старше самого длинного окна и больше не нужны"""
+    windows_hours = windows_hours or settings.STATISTICS_WINDOWS_HOURS
+    horizon = window_bucket_count(max(windows_hours), bucket_seconds)
+    return [bucket for bucket in buckets if reference_bucket - bucket >= horizon]
+
+
+def summarize_packed_history(
+    records: np.ndarray,
+    reference_ms: int,
+    windows_hours: Iterable[int] = None,
+    bucket_seconds: int = None
+) -> Dict:
+    """
+    Рассчитать агрегаты и окна по упакованной истории векторными операциями
+
+    Границы окон совпадают с бакетами summarize_windows, поэтому результат
+    совпадает с инкрементальным режимом.
+
+    Args:
+        records: Структурированный массив с полями timestamp_ms, amount, type
+        reference_ms: Момент времени (epoch ms), которым заканчиваются окна
+        windows_hours: Длины окон в часах
+        bucket_seconds: Длина бакета в секундах
+
+    Returns:
+        Словарь со статистикой в формате _calculate_statistics
+    """
+    windows_hours = windows_hours or settings.STATISTICS_WINDOWS_HOURS
+    bucket_seconds = bucket_seconds or settings.WINDOW_BUCKET_SECONDS
+
+    timestamps = records["timestamp_ms"]
+    amounts = records["amount"]
+    ages = bucket_of(reference_ms, bucket_seconds) - timestamps // (bucket_seconds * 1000)
+
+    # Агрегаты считаются по записям внутри самого длинного окна
+    in_horizon = (ages >= 0) & (ages < window_bucket_count(max(windows_hours), bucket_seconds))
+    total_count = int(np.count_nonzero(in_horizon))
+    total_amount = float(amounts[in_horizon].sum())
+    types, type_counts = np.unique(records["type"][in_horizon], return_counts=True)
+
+    stats = {
+        "total_transactions": total_count,
+        "total_amount": total_amount,
+        "avg_amount": total_amount / total_count if total_count > 0 else 0.0,
+        "transaction_count_by_type": dict(zip(types.tolist(), type_counts.tolist())),
+        "last_transaction_time": (
+            format_timestamp_ms(int(timestamps[in_horizon].max())) if total_count > 0 else None
+        ),
+    }
+
+    for hours in windows_hours:
+        mask = (ages >= 0) & (ages < window_bucket_count(hours, bucket_seconds))
+        count = int(np.count_nonzero(mask))
+        total = float(amounts[mask].sum())
+        stats[f"transaction_count_{hours}h"] = count
+        stats[f"total_amount_{hours}h"] = total
+        stats[f"avg_amount_{hours}h"] = total / count if count > 0 else 0.0
+
+    return stats